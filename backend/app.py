@@ -7,6 +7,7 @@ A professional, AI-powered business analytics platform.
 
 import os
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from logging.handlers import RotatingFileHandler
 from datetime import timedelta
 
@@ -88,6 +89,12 @@ def create_app(config_name: str = None):
     # Setup rate limiting
     setup_rate_limiting(app)
     
+    # Setup shared password hashing pool
+    setup_password_pool(app)
+    
+    # Setup shared authentication service
+    setup_auth_service(app)
+    
     # Setup security headers (production only)
     if os.getenv('FLASK_ENV') == 'production':
         setup_security_headers(app)
@@ -220,6 +227,48 @@ def setup_rate_limiting(app: Flask):
     app.logger.info('Rate limiting configured')
 
 
+def setup_password_pool(app: Flask):
+    """
+    Create the worker pool shared by all password hashing/verification.
+    
+    Register, login and change-password submit their hashing work here so
+    bursts of auth requests are bounded by the pool size instead of
+    competing for CPU on every request thread.
+    
+    Args:
+        app: Flask application instance.
+    """
+    max_workers = app.config.get('PASSWORD_POOL_WORKERS') or (os.cpu_count() or 1) * 2
+    app.extensions['password_pool'] = ThreadPoolExecutor(
+        max_workers=max_workers,
+        thread_name_prefix='password'
+    )
+    
+    app.logger.info(f'Password hashing pool configured ({max_workers} workers)')
+
+
+def setup_auth_service(app: Flask):
+    """
+    Create the authentication service shared by all requests.
+    
+    The service is stored in app.extensions and exposed as g.auth_service
+    for every request, so jwt_required never builds one per call.
+    
+    Args:
+        app: Flask application instance.
+    """
+    auth_service = AuthService(
+        secret_key=app.config['JWT_SECRET_KEY'],
+        access_token_expires=app.config.get('JWT_ACCESS_TOKEN_EXPIRES', 900),
+        refresh_token_expires=app.config.get('JWT_REFRESH_TOKEN_EXPIRES', 604800)
+    )
+    app.extensions['auth_service'] = auth_service
+    
+    @app.before_request
+    def attach_auth_service():
+        g.auth_service = auth_service
+
+
 def setup_security_headers(app: Flask):
     """
     Configure security headers for production.
@@ -75,6 +75,16 @@ class ErrorHandler:
                 }
             }), 405
         
+        @app.errorhandler(413)
+        def payload_too_large(error):
+            return jsonify({
+                'success': False,
+                'error': {
+                    'code': 'PAYLOAD_TOO_LARGE',
+                    'message': 'Request body too large'
+                }
+            }), 413
+        
         @app.errorhandler(429)
         def rate_limit_exceeded(error):
             return jsonify({
@@ -6,5 +6,7 @@ Models package containing database models and schemas.
 from .user import User
 from .upload import UploadSession
 from .sales_data import SalesData
+from .customer_segment import CustomerSegment
+from .export_job import ExportJob
 
-__all__ = ['User', 'UploadSession', 'SalesData']
+__all__ = ['User', 'UploadSession', 'SalesData', 'CustomerSegment', 'ExportJob']
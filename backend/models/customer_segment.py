@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+Customer Segment Model - MongoDB Customer Segments Collection
+
+Stores the customer -> segment assignment produced by RFM + K-Means so that
+segment member listings can be paginated with an indexed query instead of
+re-running the clustering.
+
+Each save writes a complete set of rows under a new generation id and then
+publishes it through a marker document, so readers never see a partially
+written or superseded set.
+"""
+
+from datetime import datetime
+from bson.objectid import ObjectId
+from pymongo.errors import DuplicateKeyError
+from typing import Optional, Dict, Any, List, Tuple
+import pandas as pd
+
+
+class CustomerSegment:
+    """Customer segment assignment model for MongoDB operations."""
+
+    COLLECTION_NAME = 'customer_segments'
+    MARKER_COLLECTION_NAME = 'customer_segment_generations'
+
+    # upload_id stored for assignments computed across all of a user's uploads
+    ALL_UPLOADS = '__all__'
+
+    def __init__(self, db):
+        """
+        Initialize CustomerSegment model.
+
+        Args:
+            db: MongoDB database connection.
+        """
+        self.db = db
+        self.collection = db[self.COLLECTION_NAME]
+        self.markers = db[self.MARKER_COLLECTION_NAME]
+
+        # Create indexes
+        self.collection.create_index([
+            ('user_id', 1),
+            ('upload_id', 1),
+            ('generation', 1),
+            ('segment_id', 1),
+            ('position', 1)
+        ])
+        self.markers.create_index([('user_id', 1), ('upload_id', 1)], unique=True)
+
+    def _scope(self, user_id: str, upload_id: Optional[str]) -> Dict[str, Any]:
+        """Query filter for one user's assignments at an upload scope."""
+        return {
+            'user_id': ObjectId(user_id),
+            'upload_id': upload_id or self.ALL_UPLOADS
+        }
+
+    def current_generation(
+        self,
+        user_id: str,
+        upload_id: Optional[str],
+        data_version: str
+    ) -> Optional[ObjectId]:
+        """
+        Get the published assignment generation for an upload scope.
+
+        Args:
+            user_id: User ObjectId as string.
+            upload_id: Upload identifier, or None for all uploads.
+            data_version: The user's current upload data version.
+
+        Returns:
+            ObjectId or None: Generation to read, or None if nothing was
+            published for this data version.
+        """
+        marker = self.markers.find_one(
+            self._scope(user_id, upload_id), {'generation': 1, 'data_version': 1}
+        )
+        if marker is None or marker.get('data_version') != data_version:
+            return None
+        return marker['generation']
+
+    def save_assignments(
+        self,
+        user_id: str,
+        upload_id: Optional[str],
+        segmented_df: pd.DataFrame,
+        segment_mapping: Dict[int, str],
+        data_version: str
+    ) -> Optional[ObjectId]:
+        """
+        Store a new assignment generation for an upload scope and publish it.
+
+        Rows are written under a fresh generation id before the marker is
+        flipped to it. A concurrent save that published a newer generation
+        wins, and this save's rows are dropped.
+
+        Args:
+            user_id: User ObjectId as string.
+            upload_id: Upload identifier, or None for all uploads.
+            segmented_df: RFM DataFrame with segment_id column.
+            segment_mapping: Segment name mapping.
+            data_version: Upload data version the segments were computed from.
+
+        Returns:
+            ObjectId or None: The generation now published for the scope,
+            or None if the scope was deleted meanwhile.
+        """
+        scope = self._scope(user_id, upload_id)
+        created_at = datetime.utcnow()
+        # ObjectIds increase over time, so later saves supersede earlier ones
+        generation = ObjectId()
+
+        documents = [
+            {
+                **scope,
+                'generation': generation,
+                'position': position,
+                'customer_id': str(customer_id),
+                'segment_id': int(segment_id),
+                'segment_name': segment_mapping.get(int(segment_id), f'Segment {segment_id}'),
+                'r_score': int(r_score),
+                'f_score': int(f_score),
+                'm_score': int(m_score),
+                'frequency': int(frequency),
+                'monetary': float(monetary),
+                'rfm_score': int(rfm_score),
+                'created_at': created_at
+            }
+            for position, (
+                customer_id, segment_id, r_score, f_score, m_score,
+                frequency, monetary, rfm_score
+            ) in enumerate(zip(
+                segmented_df['customer_id'], segmented_df['segment_id'],
+                segmented_df['r_score'], segmented_df['f_score'], segmented_df['m_score'],
+                segmented_df['frequency'], segmented_df['monetary'], segmented_df['rfm_score']
+            ))
+        ]
+
+        if documents:
+            self.collection.insert_many(documents, ordered=False)
+
+        if self._publish(scope, generation, data_version):
+            self.collection.delete_many({**scope, 'generation': {'$lt': generation}})
+            return generation
+
+        self.collection.delete_many({**scope, 'generation': generation})
+        marker = self.markers.find_one(scope, {'generation': 1})
+        return marker['generation'] if marker else None
+
+    def _publish(self, scope: Dict[str, Any], generation: ObjectId, data_version: str) -> bool:
+        """Point the scope's marker at a generation unless a newer one is published."""
+        fields = {
+            'generation': generation,
+            'data_version': data_version,
+            'published_at': datetime.utcnow()
+        }
+        newer_than_published = {**scope, 'generation': {'$lt': generation}}
+
+        if self.markers.update_one(newer_than_published, {'$set': fields}).matched_count:
+            return True
+        try:
+            self.markers.insert_one({**scope, **fields})
+            return True
+        except DuplicateKeyError:
+            # Another save created the marker first; take over if it is older
+            return self.markers.update_one(
+                newer_than_published, {'$set': fields}
+            ).matched_count > 0
+
+    def find_segment_customers(
+        self,
+        user_id: str,
+        upload_id: Optional[str],
+        generation: ObjectId,
+        segment_id: int,
+        page: int = 1,
+        limit: int = 50
+    ) -> Tuple[List[Dict[str, Any]], int, Optional[str]]:
+        """
+        Get one page of customers in a segment.
+
+        Args:
+            user_id: User ObjectId as string.
+            upload_id: Upload identifier, or None for all uploads.
+            generation: Published generation from current_generation.
+            segment_id: Target segment ID.
+            page: Page number (1-indexed).
+            limit: Results per page.
+
+        Returns:
+            tuple: (customer list, total count, segment name or None).
+        """
+        query = {
+            **self._scope(user_id, upload_id),
+            'generation': generation,
+            'segment_id': segment_id
+        }
+        total = self.collection.count_documents(query)
+
+        cursor = self.collection.find(query, {'_id': 0}).sort('position', 1)
+        cursor = cursor.skip(max(page - 1, 0) * limit).limit(limit)
+
+        segment_name = None
+        customers = []
+        for doc in cursor:
+            segment_name = doc['segment_name']
+            customers.append({
+                'customer_id': doc['customer_id'],
+                'rfm_scores': {
+                    'recency': doc['r_score'],
+                    'frequency': doc['f_score'],
+                    'monetary': doc['m_score']
+                },
+                'total_purchases': doc['frequency'],
+                'total_spend': doc['monetary'],
+                'rfm_score': doc['rfm_score']
+            })
+
+        if segment_name is None and total:
+            doc = self.collection.find_one(query, {'segment_name': 1})
+            segment_name = doc['segment_name']
+
+        return customers, total, segment_name
+
+    def delete_for_user(self, user_id: str, upload_id: Optional[str] = None) -> int:
+        """
+        Delete stored assignments, and their markers, that depend on a user's data.
+
+        Always removes the all-uploads scope; also removes the given upload's
+        scope when upload_id is provided.
+
+        Args:
+            user_id: User ObjectId as string.
+            upload_id: Upload identifier whose assignments to remove.
+
+        Returns:
+            int: Number of assignments deleted.
+        """
+        upload_ids = [self.ALL_UPLOADS]
+        if upload_id:
+            upload_ids.append(upload_id)
+
+        scopes = {
+            'user_id': ObjectId(user_id),
+            'upload_id': {'$in': upload_ids}
+        }
+        self.markers.delete_many(scopes)
+        result = self.collection.delete_many(scopes)
+        return result.deleted_count
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Export Job Model - MongoDB Export Jobs Collection
+
+Tracks background report builds so any worker process can answer a poll
+for a job started on another one. The built file itself lives in the
+shared export directory; only its path and the job status are stored here.
+"""
+
+from datetime import datetime, timedelta
+from bson.objectid import ObjectId
+from typing import Optional, Dict, Any
+
+
+class ExportJob:
+    """Export job model for MongoDB operations."""
+
+    COLLECTION_NAME = 'export_jobs'
+
+    # Job statuses
+    STATUS_PENDING = 'pending'
+    STATUS_COMPLETED = 'completed'
+    STATUS_NO_DATA = 'no_data'
+    STATUS_FAILED = 'failed'
+
+    # Jobs (and their files) can be polled for this many seconds
+    JOB_TTL = 600
+
+    def __init__(self, db):
+        """
+        Initialize ExportJob model.
+
+        Args:
+            db: MongoDB database connection.
+        """
+        self.db = db
+        self.collection = db[self.COLLECTION_NAME]
+
+        # Create indexes
+        self.collection.create_index('job_id', unique=True)
+        self.collection.create_index('expires_at', expireAfterSeconds=0)
+
+    def create(self, user_id: str, job_id: str) -> None:
+        """
+        Record a new pending job.
+
+        Args:
+            user_id: User ObjectId as string.
+            job_id: Unique job identifier.
+        """
+        now = datetime.utcnow()
+        self.collection.insert_one({
+            'job_id': job_id,
+            'user_id': ObjectId(user_id),
+            'status': self.STATUS_PENDING,
+            'path': None,
+            'error': None,
+            'created_at': now,
+            'updated_at': now,
+            'expires_at': now + timedelta(seconds=self.JOB_TTL)
+        })
+
+    def complete(self, job_id: str, path: Optional[str]) -> None:
+        """
+        Mark a job finished.
+
+        Args:
+            job_id: Unique job identifier.
+            path: Path of the built file, or None if there was no data.
+        """
+        status = self.STATUS_COMPLETED if path else self.STATUS_NO_DATA
+        self.collection.update_one(
+            {'job_id': job_id},
+            {'$set': {'status': status, 'path': path, 'updated_at': datetime.utcnow()}}
+        )
+
+    def fail(self, job_id: str, error: str) -> None:
+        """
+        Mark a job failed.
+
+        Args:
+            job_id: Unique job identifier.
+            error: Error description.
+        """
+        self.collection.update_one(
+            {'job_id': job_id},
+            {'$set': {'status': self.STATUS_FAILED, 'error': error, 'updated_at': datetime.utcnow()}}
+        )
+
+    def find(self, user_id: str, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a user's unexpired job.
+
+        Args:
+            user_id: User ObjectId as string.
+            job_id: Unique job identifier.
+
+        Returns:
+            dict or None: Job document if found and not expired.
+        """
+        # The TTL monitor runs periodically, so expiry is also checked here
+        return self.collection.find_one({
+            'job_id': job_id,
+            'user_id': ObjectId(user_id),
+            'expires_at': {'$gt': datetime.utcnow()}
+        })
@@ -15,6 +15,9 @@ class SalesData:
     """Sales data model for MongoDB operations."""
     
     COLLECTION_NAME = 'sales_data'
+    TRANSACTION_COLUMNS = [
+        'customer_id', 'product_name', 'date', 'units_sold', 'price', 'revenue', 'category'
+    ]
     
     def __init__(self, db):
         """
@@ -32,6 +35,9 @@ class SalesData:
         self.collection.create_index('product_name')
         self.collection.create_index('date')
         self.collection.create_index([('user_id', 1), ('date', -1)])
+        # Dashboard and analytics queries match on user (+ upload) then group by date/product
+        self.collection.create_index([('user_id', 1), ('upload_id', 1), ('date', 1)])
+        self.collection.create_index([('user_id', 1), ('upload_id', 1), ('product_name', 1)])
     
     def insert_many(
         self,
@@ -80,6 +86,71 @@ class SalesData:
         
         result = self.collection.insert_many(records)
         return len(result.inserted_ids)
+    
+    def insert_dataframe(
+        self,
+        user_id: str,
+        upload_id: str,
+        df: pd.DataFrame
+    ) -> int:
+        """
+        Insert sales records from a DataFrame, converting column-wise.
+        
+        Produces the same documents as insert_many(df.to_dict('records'))
+        without building an intermediate dict per row.
+        
+        Args:
+            user_id: User ObjectId as string.
+            upload_id: Associated upload session ID.
+            df: Sales DataFrame.
+        
+        Returns:
+            int: Number of records inserted.
+        """
+        if df.empty:
+            return 0
+        
+        n_rows = len(df)
+        
+        def column(names, default):
+            for name in names:
+                if name in df.columns:
+                    return df[name].tolist()
+            return [default] * n_rows
+        
+        units = [int(v) for v in column(['units_sold'], 0)]
+        prices = [float(v) for v in column(['price'], 0)]
+        
+        fields = {
+            'customer_id': [str(v) for v in column(['customer_id', 'Customer ID'], 'Unknown')],
+            'product_name': column(['product_name', 'Product Name'], ''),
+            'date': [self._parse_date(v) for v in column(['date', 'Date'], None)],
+            'units_sold': units,
+            'price': prices,
+            'revenue': [u * p for u, p in zip(units, prices)],
+            'category': column(['category', 'Category'], 'Uncategorized')
+        }
+        
+        # Preserve other fields (like demographics)
+        reserved = {'user_id', 'upload_id', 'created_at', *fields}
+        for name in df.columns:
+            if name not in reserved and not str(name).startswith('_'):
+                fields[name] = df[name].tolist()
+        
+        metadata = {
+            'user_id': ObjectId(user_id),
+            'upload_id': upload_id
+        }
+        created_at = datetime.utcnow()
+        names = list(fields)
+        
+        records = [
+            {**metadata, **dict(zip(names, values)), 'created_at': created_at}
+            for values in zip(*fields.values())
+        ]
+        
+        result = self.collection.insert_many(records, ordered=False)
+        return len(result.inserted_ids)
 
     def get_transactions(self, user_id: str, upload_id: Optional[str] = None) -> pd.DataFrame:
         """
@@ -174,32 +245,43 @@ class SalesData:
         result = list(self.collection.aggregate(pipeline))
         return result[0]['count'] if result else 0
     
-    def find_by_upload_id(self, upload_id: str) -> List[Dict[str, Any]]:
+    def find_by_upload_id(
+        self,
+        upload_id: str,
+        projection: Optional[Dict[str, int]] = None
+    ) -> List[Dict[str, Any]]:
         """
         Find all sales data for an upload.
         
         Args:
             upload_id: Upload session identifier.
+            projection: Optional fields to return (default: whole documents).
         
         Returns:
             list: List of sales records.
         """
-        cursor = self.collection.find({'upload_id': upload_id})
+        cursor = self.collection.find({'upload_id': upload_id}, projection)
         return list(cursor)
     
-    def find_by_user(self, user_id: str, limit: int = 10000) -> List[Dict[str, Any]]:
+    def find_by_user(
+        self,
+        user_id: str,
+        limit: int = 10000,
+        projection: Optional[Dict[str, int]] = None
+    ) -> List[Dict[str, Any]]:
         """
         Find sales data for a user.
         
         Args:
             user_id: User ObjectId as string.
             limit: Maximum number of records.
+            projection: Optional fields to return (default: whole documents).
         
         Returns:
             list: List of sales records.
         """
         cursor = self.collection.find(
-            {'user_id': ObjectId(user_id)}
+            {'user_id': ObjectId(user_id)}, projection
         ).sort('date', -1).limit(limit)
         
         return list(cursor)
@@ -310,6 +392,122 @@ class SalesData:
         
         return df[['date', 'units_sold', 'revenue']]
     
+    def get_dashboard_payload(
+        self,
+        user_id: str,
+        upload_id: Optional[str] = None,
+        include_products: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Get dashboard KPIs and chart series in a single aggregation.
+        
+        Args:
+            user_id: User ObjectId as string.
+            upload_id: Optional upload session ID to filter.
+            include_products: Return every product summary row instead of
+                only the top and bottom 10.
+        
+        Returns:
+            dict: kpis, daily (date as datetime) and either products or
+            top_products/low_products. Product rows are ordered by units sold.
+        """
+        match_stage = {'user_id': ObjectId(user_id)}
+        if upload_id:
+            match_stage['upload_id'] = upload_id
+        
+        product_group = {
+            '$group': {
+                '_id': '$product_name',
+                'units_sold': {'$sum': '$units_sold'},
+                'price': {'$avg': '$price'},
+                'revenue': {'$sum': '$revenue'}
+            }
+        }
+        
+        facets = {
+            'totals': [
+                product_group,
+                {
+                    '$group': {
+                        '_id': None,
+                        'total_revenue': {'$sum': '$revenue'},
+                        'total_units': {'$sum': '$units_sold'},
+                        'total_products': {'$sum': 1},
+                        'avg_price': {'$avg': '$price'}
+                    }
+                }
+            ],
+            'customers': [
+                {'$group': {'_id': '$customer_id'}},
+                {'$count': 'count'}
+            ],
+            'daily': [
+                {
+                    '$group': {
+                        '_id': '$date',
+                        'units_sold': {'$sum': '$units_sold'},
+                        'revenue': {'$sum': '$revenue'}
+                    }
+                },
+                {'$sort': {'_id': 1}}
+            ]
+        }
+        if include_products:
+            facets['products'] = [product_group, {'$sort': {'units_sold': -1}}]
+        else:
+            facets['top_products'] = [product_group, {'$sort': {'units_sold': -1}}, {'$limit': 10}]
+            facets['low_products'] = [product_group, {'$sort': {'units_sold': 1}}, {'$limit': 10}]
+        
+        # Every facet branch, including the distinct customer count, reads
+        # only these fields; trim documents once before they fan out
+        result = next(self.collection.aggregate([
+            {'$match': match_stage},
+            {'$project': {
+                '_id': 0, 'product_name': 1, 'units_sold': 1, 'price': 1,
+                'revenue': 1, 'date': 1, 'customer_id': 1
+            }},
+            {'$facet': facets}
+        ]), {})
+        
+        def product_rows(rows):
+            return [
+                {
+                    'product_name': row['_id'],
+                    'units_sold': int(row['units_sold']),
+                    'price': float(row['price']),
+                    'revenue': float(row['revenue'])
+                }
+                for row in rows
+            ]
+        
+        totals = result.get('totals') or [{}]
+        customers = result.get('customers') or [{}]
+        
+        payload = {
+            'kpis': {
+                'total_revenue': float(totals[0].get('total_revenue', 0)),
+                'total_units': int(totals[0].get('total_units', 0)),
+                'total_products': int(totals[0].get('total_products', 0)),
+                'total_customers': int(customers[0].get('count', 0)),
+                'avg_price': float(totals[0].get('avg_price') or 0)
+            },
+            'daily': [
+                {
+                    'date': row['_id'],
+                    'units_sold': int(row['units_sold']),
+                    'revenue': float(row['revenue'])
+                }
+                for row in result.get('daily', [])
+            ]
+        }
+        if include_products:
+            payload['products'] = product_rows(result.get('products', []))
+        else:
+            payload['top_products'] = product_rows(result.get('top_products', []))
+            payload['low_products'] = product_rows(result.get('low_products', []))
+        
+        return payload
+    
     def delete_by_upload_id(self, upload_id: str) -> int:
         """
         Delete all sales data for an upload.
@@ -323,33 +521,75 @@ class SalesData:
         result = self.collection.delete_many({'upload_id': upload_id})
         return result.deleted_count
     
-    def get_transactions(self, user_id: str, upload_id: Optional[str] = None) -> pd.DataFrame:
+    def find_for_export(
+        self,
+        user_id: str,
+        upload_id: Optional[str] = None,
+        limit: int = 10000,
+        batch_size: int = 2000
+    ):
+        """
+        Get a cursor over the raw sales fields used by CSV exports.
+        
+        Args:
+            user_id: User ObjectId as string.
+            upload_id: Optional upload session ID to filter.
+            limit: Maximum number of records when exporting all uploads.
+            batch_size: Documents fetched per round trip.
+        
+        Returns:
+            Cursor: Sales records, newest first unless filtered by upload.
+        """
+        query = {'user_id': ObjectId(user_id)}
+        projection = {
+            '_id': 0, 'product_name': 1, 'date': 1, 'units_sold': 1,
+            'price': 1, 'revenue': 1, 'category': 1
+        }
+        
+        if upload_id:
+            query['upload_id'] = upload_id
+            cursor = self.collection.find(query, projection)
+        else:
+            cursor = self.collection.find(query, projection).sort('date', -1).limit(limit)
+        
+        return cursor.batch_size(batch_size)
+    
+    def get_transactions(
+        self,
+        user_id: str,
+        upload_id: Optional[str] = None,
+        columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
         """
         Get transactions as a DataFrame for analysis.
         
         Args:
             user_id: User ObjectId as string.
             upload_id: Optional upload session ID to filter.
+            columns: Fields to load (default: TRANSACTION_COLUMNS).
         
         Returns:
-            pd.DataFrame: Transaction data with columns: customer_id, product_name, date, 
-                         units_sold, price, revenue, category.
+            pd.DataFrame: Transaction data with the requested columns, by default
+                         customer_id, product_name, date, units_sold, price, revenue, category.
         """
         match_stage = {'user_id': ObjectId(user_id)}
         if upload_id:
             match_stage['upload_id'] = upload_id
         
-        cursor = self.collection.find(match_stage).sort('date', -1)
+        # Only decode the fields we return, not ids, timestamps or extra columns
+        columns = list(columns or self.TRANSACTION_COLUMNS)
+        projection = {col: 1 for col in columns}
+        projection['_id'] = 0
+        
+        cursor = self.collection.find(match_stage, projection).sort('date', -1)
         records = list(cursor)
         
         if not records:
-            return pd.DataFrame(columns=['customer_id', 'product_name', 'date', 
-                                        'units_sold', 'price', 'revenue', 'category'])
+            return pd.DataFrame(columns=columns)
         
         df = pd.DataFrame(records)
         
-        # Select and rename relevant columns
-        columns = ['customer_id', 'product_name', 'date', 'units_sold', 'price', 'revenue', 'category']
+        # Fill in any columns missing from every record
         for col in columns:
             if col not in df.columns:
                 df[col] = None
@@ -27,6 +27,12 @@ class UploadSession:
     TYPE_API = 'api'
     TYPE_MANUAL = 'manual'
     
+    # Dashboard aggregates materialized at upload time; only read via get_dashboard_summary
+    SUMMARY_FIELD = 'dashboard_summary'
+    SUMMARY_EXCLUDED = {SUMMARY_FIELD: 0}
+    # Listings show status only; results carries the full chart data
+    LISTING_EXCLUDED = {SUMMARY_FIELD: 0, 'results': 0}
+    
     def __init__(self, db):
         """
         Initialize UploadSession model.
@@ -42,6 +48,9 @@ class UploadSession:
         self.collection.create_index('user_id')
         self.collection.create_index('status')
         self.collection.create_index('created_at')
+        self.collection.create_index([('user_id', 1), ('created_at', -1)])
+        self.collection.create_index([('user_id', 1), ('status', 1), ('created_at', -1)])
+        self.collection.create_index([('user_id', 1), ('updated_at', -1)])
     
     def create(
         self,
@@ -98,7 +107,9 @@ class UploadSession:
         Returns:
             dict or None: Session document or None if not found.
         """
-        return self.collection.find_one({'_id': ObjectId(session_id)})
+        return self.collection.find_one(
+            {'_id': ObjectId(session_id)}, self.SUMMARY_EXCLUDED
+        )
     
     def find_by_upload_id(self, upload_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -110,25 +121,36 @@ class UploadSession:
         Returns:
             dict or None: Session document or None if not found.
         """
-        session = self.collection.find_one({'upload_id': upload_id})
+        session = self.collection.find_one({'upload_id': upload_id}, self.SUMMARY_EXCLUDED)
         if session:
             return self._sanitize_upload_session(session)
         return None
     
-    def find_by_user(self, user_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+    def find_by_user(
+        self,
+        user_id: str,
+        limit: int = 50,
+        include_results: bool = True,
+        status: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
         """
         Find all upload sessions for a user.
         
         Args:
             user_id: User ObjectId as string.
             limit: Maximum number of results.
+            include_results: Whether to load each session's analysis results.
+            status: Only return sessions with this status (optional).
         
         Returns:
             list: List of session documents.
         """
-        cursor = self.collection.find(
-            {'user_id': ObjectId(user_id)}
-        ).sort('created_at', -1).limit(limit)
+        query = {'user_id': ObjectId(user_id)}
+        if status:
+            query['status'] = status
+        
+        projection = self.SUMMARY_EXCLUDED if include_results else self.LISTING_EXCLUDED
+        cursor = self.collection.find(query, projection).sort('created_at', -1).limit(limit)
         
         # Sanitize all documents to convert ObjectIds to strings
         return [self._sanitize_upload_session(session) for session in cursor]
@@ -211,6 +233,40 @@ class UploadSession:
         )
         return result.modified_count > 0
     
+    def set_dashboard_summary(self, upload_id: str, summary: Dict[str, Any]) -> bool:
+        """
+        Store the dashboard aggregates computed for an upload.
+        
+        Args:
+            upload_id: Unique upload identifier.
+            summary: Dashboard payload with kpis, products and daily series.
+        
+        Returns:
+            bool: True if successful, False otherwise.
+        """
+        result = self.collection.update_one(
+            {'upload_id': upload_id},
+            {'$set': {self.SUMMARY_FIELD: summary}}
+        )
+        return result.modified_count > 0
+    
+    def get_dashboard_summary(self, user_id: str, upload_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the stored dashboard aggregates for one of a user's uploads.
+        
+        Args:
+            user_id: User ObjectId as string.
+            upload_id: Unique upload identifier.
+        
+        Returns:
+            dict or None: Stored summary, or None if the upload has none.
+        """
+        session = self.collection.find_one(
+            {'upload_id': upload_id, 'user_id': ObjectId(user_id)},
+            {self.SUMMARY_FIELD: 1}
+        )
+        return session.get(self.SUMMARY_FIELD) if session else None
+    
     def delete(self, upload_id: str) -> bool:
         """
         Delete an upload session.
@@ -224,6 +280,32 @@ class UploadSession:
         result = self.collection.delete_one({'upload_id': upload_id})
         return result.deleted_count > 0
     
+    def get_data_version(self, user_id: str) -> str:
+        """
+        Get a token that changes whenever a user's uploads change.
+        
+        Args:
+            user_id: User ObjectId as string.
+        
+        Returns:
+            str: Upload count and latest update time.
+        """
+        # One round trip over the (user_id, updated_at) index
+        stats = next(self.collection.aggregate([
+            {'$match': {'user_id': ObjectId(user_id)}},
+            {
+                '$group': {
+                    '_id': None,
+                    'count': {'$sum': 1},
+                    'latest': {'$max': '$updated_at'}
+                }
+            }
+        ]), None)
+        if stats is None:
+            return '0:'
+        updated_at = stats['latest'].isoformat() if stats.get('latest') else ''
+        return f"{stats['count']}:{updated_at}"
+    
     def get_stats_by_user(self, user_id: str) -> Dict[str, Any]:
         """
         Get upload statistics for a user.
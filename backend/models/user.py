@@ -21,6 +21,9 @@ class User:
     ROLE_ADMIN = 'admin'
     ROLE_VIEWER = 'viewer'
     
+    # Projection for profile reads: never pull the password hash from the server
+    PROFILE_PROJECTION = {'password_hash': 0}
+    
     def __init__(self, db):
         """
         Initialize User model.
@@ -88,17 +91,18 @@ class User:
         
         return self._sanitize_user(user)
     
-    def find_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
+    def find_by_id(self, user_id: str, projection: Optional[Dict[str, int]] = None) -> Optional[Dict[str, Any]]:
         """
         Find user by ID.
         
         Args:
             user_id: User ObjectId as string.
+            projection: Optional MongoDB projection to limit returned fields.
         
         Returns:
             dict or None: User document or None if not found.
         """
-        user = self.collection.find_one({'_id': ObjectId(user_id), 'is_active': True})
+        user = self.collection.find_one({'_id': ObjectId(user_id), 'is_active': True}, projection)
         if user:
             return self._sanitize_user(user)
         return None
@@ -185,7 +189,7 @@ class User:
         filtered_updates = {k: v for k, v in updates.items() if k in allowed_fields}
         
         if not filtered_updates:
-            return self.find_by_id(user_id)
+            return self.find_by_id(user_id, projection=self.PROFILE_PROJECTION)
         
         filtered_updates['updated_at'] = datetime.utcnow()
         
@@ -194,7 +198,7 @@ class User:
             {'$set': filtered_updates}
         )
         
-        return self.find_by_id(user_id)
+        return self.find_by_id(user_id, projection=self.PROFILE_PROJECTION)
     
     def change_password(self, user_id: str, new_password: str) -> bool:
         """
@@ -218,6 +222,42 @@ class User:
         )
         return result.modified_count > 0
     
+    def verify_and_update_password(self, user_id: str, current_password: str, new_password: str) -> bool:
+        """
+        Verify the current password and replace it in one read and one write.
+        
+        The update is conditional on the hash that was verified, so a
+        concurrent password change makes this call fail instead of
+        overwriting it.
+        
+        Args:
+            user_id: User ObjectId as string.
+            current_password: Current plain text password.
+            new_password: New plain text password.
+        
+        Returns:
+            bool: True if the password was changed, False if the current
+            password is wrong or the user does not exist.
+        """
+        user = self.collection.find_one(
+            {'_id': ObjectId(user_id), 'is_active': True},
+            {'password_hash': 1}
+        )
+        
+        if not user or not check_password_hash(user['password_hash'], current_password):
+            return False
+        
+        result = self.collection.update_one(
+            {'_id': user['_id'], 'password_hash': user['password_hash']},
+            {
+                '$set': {
+                    'password_hash': generate_password_hash(new_password),
+                    'updated_at': datetime.utcnow()
+                }
+            }
+        )
+        return result.modified_count > 0
+    
     def deactivate(self, user_id: str) -> bool:
         """
         Deactivate user account.
@@ -5,16 +5,72 @@ Authentication Routes - JWT-based Authentication
 Handles user registration, login, logout, and token management.
 """
 
-from flask import Blueprint, request, jsonify, current_app, g
+from flask import Blueprint, Response, request, jsonify, current_app, g
 from bson.errors import InvalidId
 import re
+import json
+import hashlib
 
 from models.user import User
-from services.auth_service import AuthService, jwt_required
+from services.auth_service import jwt_required
 from services.auth_service import jwt_required as jwt_required_decorator
+from utils.cache import InMemoryCache
 
 auth_bp = Blueprint('auth', __name__)
 
+# Upper bounds checked before any validator or password hashing runs
+MAX_PASSWORD_LEN = 128
+MAX_USERNAME_LEN = 64
+MAX_EMAIL_LEN = 254
+
+# Auth payloads are tiny; anything larger is rejected before JSON parsing
+MAX_AUTH_BODY_BYTES = 16 * 1024
+
+# Recent password-strength verdicts, keyed by digest (see validate_password)
+PASSWORD_CHECK_TTL = 60
+_password_check_cache = InMemoryCache(max_size=256)
+
+
+def _error_body(code: str, message: str) -> bytes:
+    """Serialize a fixed error payload once, at import time."""
+    return json.dumps(
+        {'success': False, 'error': {'code': code, 'message': message}},
+        separators=(',', ':')
+    ).encode()
+
+
+def _static_error(body: bytes, status: int) -> Response:
+    """Return a pre-serialized JSON error without going through jsonify."""
+    return Response(body, status=status, mimetype='application/json')
+
+
+# Pre-serialized bodies for errors whose message never varies
+_ERR_BODY_TOO_LARGE = _error_body('PAYLOAD_TOO_LARGE', 'Request body too large')
+_ERR_NO_BODY = _error_body('INVALID_REQUEST', 'Request body required')
+_ERR_FIELD_TOO_LONG = _error_body('VALIDATION_ERROR', 'Field too long')
+_ERR_REGISTRATION_FAILED = _error_body('INTERNAL_ERROR', 'Registration failed')
+_ERR_CREDENTIALS_REQUIRED = _error_body('VALIDATION_ERROR', 'Email/username and password required')
+_ERR_INVALID_CREDENTIALS = _error_body('INVALID_CREDENTIALS', 'Invalid email/username or password')
+_ERR_LOGOUT_FAILED = _error_body('INTERNAL_ERROR', 'Logout failed')
+_ERR_REFRESH_REQUIRED = _error_body('VALIDATION_ERROR', 'Refresh token required')
+_ERR_REFRESH_INVALID = _error_body('INVALID_TOKEN', 'Invalid or expired refresh token')
+_ERR_REFRESH_FAILED = _error_body('INTERNAL_ERROR', 'Token refresh failed')
+_ERR_USER_NOT_FOUND = _error_body('USER_NOT_FOUND', 'User not found')
+_ERR_GET_USER_FAILED = _error_body('INTERNAL_ERROR', 'Failed to get user')
+_ERR_UPDATE_PROFILE_FAILED = _error_body('INTERNAL_ERROR', 'Failed to update profile')
+_ERR_PASSWORDS_REQUIRED = _error_body('VALIDATION_ERROR', 'Current and new password required')
+_ERR_INVALID_PASSWORD = _error_body('INVALID_PASSWORD', 'Current password is incorrect')
+_ERR_CHANGE_PASSWORD_FAILED = _error_body('INTERNAL_ERROR', 'Failed to change password')
+_ERR_ACCOUNT_NOT_FOUND = _error_body('NOT_FOUND', 'User not found')
+_ERR_DELETE_ACCOUNT_FAILED = _error_body('INTERNAL_ERROR', 'Failed to delete account')
+
+
+@auth_bp.before_request
+def limit_body_size():
+    """Reject oversized auth request bodies before they are parsed."""
+    if request.content_length is not None and request.content_length > MAX_AUTH_BODY_BYTES:
+        return _static_error(_ERR_BODY_TOO_LARGE, 413)
+
 
 def get_user_model():
     """Get user model from database connection."""
@@ -23,25 +79,104 @@ def get_user_model():
     return User(db)
 
 
+def run_password_task(func, *args, **kwargs):
+    """
+    Run password hashing/verification work on the shared app pool.
+    
+    Falls back to running inline when the pool has not been configured.
+    """
+    pool = current_app.extensions.get('password_pool')
+    if pool is None:
+        return func(*args, **kwargs)
+    return pool.submit(func, *args, **kwargs).result()
+
+
 def get_auth_service():
-    """Get authentication service."""
-    return AuthService(
-        secret_key=current_app.config['JWT_SECRET_KEY'],
-        access_token_expires=current_app.config.get('JWT_ACCESS_TOKEN_EXPIRES', 900),
-        refresh_token_expires=current_app.config.get('JWT_REFRESH_TOKEN_EXPIRES', 604800)
-    )
+    """Get the application's shared authentication service."""
+    return current_app.extensions['auth_service']
+
+
+def _build_email_class_table() -> bytes:
+    """
+    Build a 256-entry table mapping each ASCII byte to its email character class.
+    
+    Letters map to 'a', digits to '0', '.' and '-' to themselves, the
+    local-part-only symbols '_%+' to '_', '@' to itself and everything
+    else to '!' (invalid).
+    """
+    table = bytearray(b'!' * 256)
+    for c in b'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ':
+        table[c] = ord('a')
+    for c in b'0123456789':
+        table[c] = ord('0')
+    for c in b'_%+':
+        table[c] = ord('_')
+    for c in b'.-@':
+        table[c] = c
+    return bytes(table)
+
+
+_EMAIL_CLASS = _build_email_class_table()
 
 
 def validate_email(email: str) -> bool:
-    """Validate email format."""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
+    """
+    Validate email format.
+    
+    Accepts what ``^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\\.[a-zA-Z]{2,}$`` matches,
+    except that a trailing newline (which ``$`` tolerated) is rejected.
+    Implemented as a single table translation followed by bytes scans, so
+    there is no regex backtracking on hostile input.
+    """
+    try:
+        classes = email.encode('ascii').translate(_EMAIL_CLASS)
+    except UnicodeEncodeError:
+        return False
+    
+    at_pos = classes.find(b'@')
+    if at_pos < 1:
+        return False
+    
+    local, domain = classes[:at_pos], classes[at_pos + 1:]
+    if local.strip(b'a0.-_') or domain.strip(b'a0.-'):
+        return False
+    
+    # TLD follows the last dot: at least two letters, non-empty host before it
+    dot_pos = domain.rfind(b'.')
+    tld = domain[dot_pos + 1:]
+    return dot_pos >= 1 and len(tld) >= 2 and not tld.strip(b'a')
+
+
+def _check_password_strength(password: str) -> tuple:
+    """
+    Apply the production password strength rules.
+    
+    Returns:
+        tuple: (is_valid, error_message)
+    """
+    if len(password) < 8:
+        return False, 'Password must be at least 8 characters long'
+    
+    if not re.search(r'[a-z]', password):
+        return False, 'Password must contain at least one lowercase letter'
+    
+    if not re.search(r'[A-Z]', password):
+        return False, 'Password must contain at least one uppercase letter'
+    
+    if not re.search(r'\d', password):
+        return False, 'Password must contain at least one number'
+    
+    return True, None
 
 
 def validate_password(password: str) -> tuple:
     """
     Validate password strength.
     
+    Production verdicts are cached briefly under a short blake2b digest of
+    the candidate (never the plaintext) so that retries with the same new
+    password skip the rule scans.
+    
     Returns:
         tuple: (is_valid, error_message)
     """
@@ -55,19 +190,40 @@ def validate_password(password: str) -> tuple:
         return True, None
 
     # Production requirements
-    if len(password) < 8:
-        return False, 'Password must be at least 8 characters long'
-    
-    if not re.search(r'[a-z]', password):
-        return False, 'Password must contain at least one lowercase letter'
+    cache_key = 'pwcheck:' + hashlib.blake2b(password.encode(), digest_size=8).hexdigest()
+    result = _password_check_cache.get(cache_key)
+    if result is None:
+        result = _check_password_strength(password)
+        _password_check_cache.set(cache_key, result, ttl=PASSWORD_CHECK_TTL)
+    return result
+
+
+# Registration checks in evaluation order; only the first failure is reported
+_REGISTER_VALIDATORS = (
+    (lambda d: bool(d['username']), 'Username is required'),
+    (lambda d: len(d['username']) >= 3, 'Username must be at least 3 characters'),
+    (lambda d: bool(d['email']), 'Email is required'),
+    (lambda d: validate_email(d['email']), 'Invalid email format'),
+    (lambda d: bool(d['password']), 'Password is required'),
+)
+
+
+def _first_register_error(fields: dict) -> str:
+    """
+    Run registration checks and stop at the first failure.
     
-    if not re.search(r'[A-Z]', password):
-        return False, 'Password must contain at least one uppercase letter'
+    Args:
+        fields: Stripped username, email and password.
     
-    if not re.search(r'\d', password):
-        return False, 'Password must contain at least one number'
+    Returns:
+        str or None: Error message of the first failing check.
+    """
+    for check, message in _REGISTER_VALIDATORS:
+        if not check(fields):
+            return message
     
-    return True, None
+    is_valid, pwd_error = validate_password(fields['password'])
+    return None if is_valid else pwd_error
 
 
 @auth_bp.route('/register', methods=['POST'])
@@ -88,10 +244,7 @@ def register():
         data = request.get_json()
         
         if not data:
-            return jsonify({
-                'success': False,
-                'error': {'code': 'INVALID_REQUEST', 'message': 'Request body required'}
-            }), 400
+            return _static_error(_ERR_NO_BODY, 400)
         
         # Extract and validate fields
         username = data.get('username', '').strip()
@@ -99,35 +252,23 @@ def register():
         password = data.get('password', '')
         company_name = data.get('company_name', '').strip()
         
+        if (len(username) > MAX_USERNAME_LEN or len(email) > MAX_EMAIL_LEN
+                or len(password) > MAX_PASSWORD_LEN):
+            return _static_error(_ERR_FIELD_TOO_LONG, 400)
+        
         # Validation
-        errors = []
-        
-        if not username:
-            errors.append('Username is required')
-        elif len(username) < 3:
-            errors.append('Username must be at least 3 characters')
-        
-        if not email:
-            errors.append('Email is required')
-        elif not validate_email(email):
-            errors.append('Invalid email format')
-        
-        if not password:
-            errors.append('Password is required')
-        else:
-            is_valid, pwd_error = validate_password(password)
-            if not is_valid:
-                errors.append(pwd_error)
-        
-        if errors:
+        error = _first_register_error({'username': username, 'email': email, 'password': password})
+        
+        if error:
             return jsonify({
                 'success': False,
-                'error': {'code': 'VALIDATION_ERROR', 'message': '; '.join(errors)}
+                'error': {'code': 'VALIDATION_ERROR', 'message': error}
             }), 400
         
         # Create user
         user_model = get_user_model()
-        user = user_model.create(
+        user = run_password_task(
+            user_model.create,
             username=username,
             email=email,
             password=password,
@@ -152,10 +293,7 @@ def register():
     
     except Exception as e:
         current_app.logger.error(f'Registration error: {str(e)}')
-        return jsonify({
-            'success': False,
-            'error': {'code': 'INTERNAL_ERROR', 'message': 'Registration failed'}
-        }), 500
+        return _static_error(_ERR_REGISTRATION_FAILED, 500)
 
 
 @auth_bp.route('/login', methods=['POST'])
@@ -176,10 +314,7 @@ def login():
 
         if not data:
             current_app.logger.warning('No JSON data received in login request')
-            return jsonify({
-                'success': False,
-                'error': {'code': 'INVALID_REQUEST', 'message': 'Request body required'}
-            }), 400
+            return _static_error(_ERR_NO_BODY, 400)
 
         identifier = data.get('identifier', '').strip()
         password = data.get('password', '')
@@ -188,21 +323,18 @@ def login():
 
         if not identifier or not password:
             current_app.logger.warning('Missing credentials in login attempt')
-            return jsonify({
-                'success': False,
-                'error': {'code': 'VALIDATION_ERROR', 'message': 'Email/username and password required'}
-            }), 400
+            return _static_error(_ERR_CREDENTIALS_REQUIRED, 400)
+
+        if len(identifier) > MAX_EMAIL_LEN or len(password) > MAX_PASSWORD_LEN:
+            return _static_error(_ERR_FIELD_TOO_LONG, 400)
 
         # Authenticate
         user_model = get_user_model()
-        user = user_model.authenticate(identifier, password)
+        user = run_password_task(user_model.authenticate, identifier, password)
 
         if not user:
             current_app.logger.warning(f'Failed login attempt for identifier: {identifier[:3]}***')
-            return jsonify({
-                'success': False,
-                'error': {'code': 'INVALID_CREDENTIALS', 'message': 'Invalid email/username or password'}
-            }), 401
+            return _static_error(_ERR_INVALID_CREDENTIALS, 401)
 
         # Generate tokens
         auth_service = get_auth_service()
@@ -257,10 +389,7 @@ def logout():
         })
     except Exception as e:
         current_app.logger.error(f'Logout error: {str(e)}')
-        return jsonify({
-            'success': False,
-            'error': {'code': 'INTERNAL_ERROR', 'message': 'Logout failed'}
-        }), 500
+        return _static_error(_ERR_LOGOUT_FAILED, 500)
 
 
 @auth_bp.route('/refresh', methods=['POST'])
@@ -278,10 +407,7 @@ def refresh_token():
         data = request.get_json()
         
         if not data or not data.get('refresh_token'):
-            return jsonify({
-                'success': False,
-                'error': {'code': 'VALIDATION_ERROR', 'message': 'Refresh token required'}
-            }), 400
+            return _static_error(_ERR_REFRESH_REQUIRED, 400)
         
         refresh_token = data['refresh_token']
         auth_service = get_auth_service()
@@ -289,10 +415,7 @@ def refresh_token():
         tokens = auth_service.refresh_access_token(refresh_token)
         
         if not tokens:
-            return jsonify({
-                'success': False,
-                'error': {'code': 'INVALID_TOKEN', 'message': 'Invalid or expired refresh token'}
-            }), 401
+            return _static_error(_ERR_REFRESH_INVALID, 401)
         
         return jsonify({
             'success': True,
@@ -301,10 +424,7 @@ def refresh_token():
         
     except Exception as e:
         current_app.logger.error(f'Token refresh error: {str(e)}')
-        return jsonify({
-            'success': False,
-            'error': {'code': 'INTERNAL_ERROR', 'message': 'Token refresh failed'}
-        }), 500
+        return _static_error(_ERR_REFRESH_FAILED, 500)
 
 
 @auth_bp.route('/me', methods=['GET'])
@@ -320,13 +440,10 @@ def get_current_user():
         user_id = g.current_user.get('user_id')
         
         user_model = get_user_model()
-        user = user_model.find_by_id(user_id)
+        user = user_model.find_by_id(user_id, projection=User.PROFILE_PROJECTION)
         
         if not user:
-            return jsonify({
-                'success': False,
-                'error': {'code': 'USER_NOT_FOUND', 'message': 'User not found'}
-            }), 404
+            return _static_error(_ERR_USER_NOT_FOUND, 404)
         
         return jsonify({
             'success': True,
@@ -335,10 +452,7 @@ def get_current_user():
         
     except Exception as e:
         current_app.logger.error(f'Get user error: {str(e)}')
-        return jsonify({
-            'success': False,
-            'error': {'code': 'INTERNAL_ERROR', 'message': 'Failed to get user'}
-        }), 500
+        return _static_error(_ERR_GET_USER_FAILED, 500)
 
 
 @auth_bp.route('/me', methods=['PUT'])
@@ -358,19 +472,13 @@ def update_profile():
         data = request.get_json()
         
         if not data:
-            return jsonify({
-                'success': False,
-                'error': {'code': 'INVALID_REQUEST', 'message': 'Request body required'}
-            }), 400
+            return _static_error(_ERR_NO_BODY, 400)
         
         user_model = get_user_model()
         user = user_model.update_profile(g.current_user['user_id'], data)
         
         if not user:
-            return jsonify({
-                'success': False,
-                'error': {'code': 'USER_NOT_FOUND', 'message': 'User not found'}
-            }), 404
+            return _static_error(_ERR_USER_NOT_FOUND, 404)
         
         return jsonify({
             'success': True,
@@ -380,10 +488,7 @@ def update_profile():
         
     except Exception as e:
         current_app.logger.error(f'Update profile error: {str(e)}')
-        return jsonify({
-            'success': False,
-            'error': {'code': 'INTERNAL_ERROR', 'message': 'Failed to update profile'}
-        }), 500
+        return _static_error(_ERR_UPDATE_PROFILE_FAILED, 500)
 
 
 @auth_bp.route('/change-password', methods=['POST'])
@@ -403,19 +508,16 @@ def change_password():
         data = request.get_json()
         
         if not data:
-            return jsonify({
-                'success': False,
-                'error': {'code': 'INVALID_REQUEST', 'message': 'Request body required'}
-            }), 400
+            return _static_error(_ERR_NO_BODY, 400)
         
         current_password = data.get('current_password', '')
         new_password = data.get('new_password', '')
         
         if not current_password or not new_password:
-            return jsonify({
-                'success': False,
-                'error': {'code': 'VALIDATION_ERROR', 'message': 'Current and new password required'}
-            }), 400
+            return _static_error(_ERR_PASSWORDS_REQUIRED, 400)
+        
+        if len(current_password) > MAX_PASSWORD_LEN or len(new_password) > MAX_PASSWORD_LEN:
+            return _static_error(_ERR_FIELD_TOO_LONG, 400)
         
         # Validate new password
         is_valid, pwd_error = validate_password(new_password)
@@ -425,24 +527,17 @@ def change_password():
                 'error': {'code': 'VALIDATION_ERROR', 'message': pwd_error}
             }), 400
         
-        # Verify current password first
+        # Verify current password and change it in a single round-trip
         user_model = get_user_model()
-        user = user_model.authenticate(g.current_user['email'], current_password)
-        
-        if not user:
-            return jsonify({
-                'success': False,
-                'error': {'code': 'INVALID_PASSWORD', 'message': 'Current password is incorrect'}
-            }), 401
-        
-        # Change password
-        success = user_model.change_password(g.current_user['user_id'], new_password)
+        changed = run_password_task(
+            user_model.verify_and_update_password,
+            g.current_user['user_id'],
+            current_password,
+            new_password
+        )
         
-        if not success:
-            return jsonify({
-                'success': False,
-                'error': {'code': 'INTERNAL_ERROR', 'message': 'Failed to change password'}
-            }), 500
+        if not changed:
+            return _static_error(_ERR_INVALID_PASSWORD, 401)
         
         return jsonify({
             'success': True,
@@ -451,10 +546,7 @@ def change_password():
         
     except Exception as e:
         current_app.logger.error(f'Change password error: {str(e)}')
-        return jsonify({
-            'success': False,
-            'error': {'code': 'INTERNAL_ERROR', 'message': 'Failed to change password'}
-        }), 500
+        return _static_error(_ERR_CHANGE_PASSWORD_FAILED, 500)
 
 
 @auth_bp.route('/me', methods=['DELETE'])
@@ -472,10 +564,7 @@ def delete_account():
         success = user_model.delete(user_id)
         
         if not success:
-            return jsonify({
-                'success': False,
-                'error': {'code': 'NOT_FOUND', 'message': 'User not found'}
-            }), 404
+            return _static_error(_ERR_ACCOUNT_NOT_FOUND, 404)
             
         return jsonify({
             'success': True,
@@ -484,7 +573,4 @@ def delete_account():
         
     except Exception as e:
         current_app.logger.error(f'Delete account error: {str(e)}')
-        return jsonify({
-            'success': False,
-            'error': {'code': 'INTERNAL_ERROR', 'message': 'Failed to delete account'}
-        }), 500
+        return _static_error(_ERR_DELETE_ACCOUNT_FAILED, 500)
@@ -17,8 +17,15 @@ Example usage:
     GET /api/behavior/recommendations?upload_id=upload_123
 """
 
-from flask import Blueprint, request, jsonify, current_app, g
-from typing import Dict, Any, List
+from flask import Blueprint, request, current_app, g
+from typing import Dict, Any, List, Callable, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+import hashlib
+import threading
+import numpy as np
+import pandas as pd
 import logging
 
 from services.segmentation_service import SegmentationService
@@ -26,14 +33,29 @@ from services.affinity_service import AffinityService
 from services.sentiment_service import SentimentService
 from services.persona_service import PersonaService
 from services.recommendation_service import RecommendationService
+from services.behavior_pipeline import BehaviorPipeline, PIPELINE_VERSION
 from models.sales_data import SalesData
+from models.upload import UploadSession
+from models.customer_segment import CustomerSegment
 from routes.auth import jwt_required
-from utils.cache import cache, user_upload_key
+from utils.cache import cache, user_upload_key, SingleFlight
+from utils.helpers import ojsonify
 
 behavior_bp = Blueprint('behavior', __name__)
 
 logger = logging.getLogger(__name__)
 
+# Upper bound for client-supplied page sizes and top-N counts
+MAX_RESULTS = 500
+
+
+# Services are stateless, so one instance of each is shared by all requests
+segmentation_service = SegmentationService()
+affinity_service = AffinityService()
+sentiment_service = SentimentService()
+persona_service = PersonaService()
+recommendation_service = RecommendationService()
+
 
 def get_sales_model():
     """Get sales data model"""
@@ -41,6 +63,256 @@ def get_sales_model():
     return SalesData(db)
 
 
+def get_segment_model():
+    """Get customer segment model"""
+    db = current_app.config['MONGO_DB']
+    return CustomerSegment(db)
+
+
+def conditional_get(f):
+    """
+    Answer repeat GETs with 304 Not Modified while the user's data is unchanged
+
+    The ETag covers the user, the query string, the pipeline version and the
+    user's upload version. The version is the same one that keys the stage
+    caches the body is built from, so a body never carries a newer ETag than
+    the data behind it.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        user_id = g.current_user['user_id']
+        data_version = _data_version(user_id)
+        etag = hashlib.blake2b(
+            '|'.join([
+                request.path,
+                user_id,
+                request.query_string.decode('utf-8', 'replace'),
+                str(PIPELINE_VERSION),
+                data_version
+            ]).encode(),
+            digest_size=16
+        ).hexdigest()
+        
+        if request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+        else:
+            response = f(*args, **kwargs)
+            if response.status_code != 200:
+                return response
+        
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    
+    return decorated
+
+
+# Pipelines and cached results are keyed per (user, upload, data version), so
+# every worker process moves to fresh data as soon as the user's uploads change.
+# The upload routes also drop this process's cached results to free memory early.
+_stage_flight = SingleFlight()
+
+# Pipelines hold the transactions, basket and stage DataFrames, so only a few
+# are kept, apart from the JSON response cache. Least recently used pipelines
+# are evicted, and a new data version replaces the user/upload's older one.
+PIPELINE_CACHE_SIZE = 8
+_pipelines: 'OrderedDict[Tuple[str, str, str], BehaviorPipeline]' = OrderedDict()
+_pipelines_lock = threading.Lock()
+
+
+def _data_version(user_id: str) -> str:
+    """Get the user's upload data version, read at most once per request"""
+    version = g.get('data_version')
+    if version is None:
+        version = UploadSession(current_app.config['MONGO_DB']).get_data_version(user_id)
+        g.data_version = version
+    return version
+
+
+def _stage_key(user_id: str, upload_id: str, stage: str) -> str:
+    """Cache key for a stage at the user's current data version"""
+    return ':'.join([
+        user_upload_key(user_id, upload_id or 'default', stage),
+        _data_version(user_id)
+    ])
+
+
+def _get_pipeline(user_id: str, upload_id: str) -> BehaviorPipeline:
+    """Get the shared behavior pipeline for a user/upload"""
+    key = (user_id, upload_id or 'default', _data_version(user_id))
+    with _pipelines_lock:
+        pipeline = _pipelines.get(key)
+        if pipeline is not None:
+            _pipelines.move_to_end(key)
+            return pipeline
+    # Concurrent misses for the same key share one load
+    return _stage_flight.do(
+        ('pipeline',) + key, lambda: _build_pipeline(key, user_id, upload_id)
+    )
+
+
+def _build_pipeline(key: Tuple[str, str, str], user_id: str, upload_id: str) -> BehaviorPipeline:
+    """Load and store a pipeline unless a previous flight already did"""
+    with _pipelines_lock:
+        pipeline = _pipelines.get(key)
+    if pipeline is not None:
+        return pipeline
+    
+    pipeline = BehaviorPipeline(
+        get_sales_model().get_transactions(
+            user_id, upload_id, columns=BehaviorPipeline.COLUMNS
+        )
+    )
+    with _pipelines_lock:
+        # Older data versions of the same user/upload are no longer reachable
+        for stale in [k for k in _pipelines if k[:2] == key[:2]]:
+            del _pipelines[stale]
+        _pipelines[key] = pipeline
+        while len(_pipelines) > PIPELINE_CACHE_SIZE:
+            _pipelines.popitem(last=False)
+    return pipeline
+
+
+def _get_transactions_cached(user_id: str, upload_id: str):
+    """Get the transactions DataFrame for a user/upload"""
+    return _get_pipeline(user_id, upload_id).transactions
+
+
+def _get_rfm_cached(user_id: str, upload_id: str):
+    """Get RFM scores for a user/upload"""
+    return _get_pipeline(user_id, upload_id).rfm()
+
+
+def _get_segments_cached(user_id: str, upload_id: str, n_clusters: int = 4):
+    """Get (segmented_df, segment_mapping) for a user/upload"""
+    return _get_pipeline(user_id, upload_id).segments(n_clusters)
+
+
+def _get_itemsets_cached(user_id: str, upload_id: str, min_support: float = 0.05):
+    """Get frequent itemsets for a user/upload"""
+    return _get_pipeline(user_id, upload_id).itemsets(min_support)
+
+
+def _get_rules_cached(
+    user_id: str,
+    upload_id: str,
+    min_confidence: float = 0.3,
+    min_lift: float = 1.5
+):
+    """Get association rules for a user/upload"""
+    return _get_pipeline(user_id, upload_id).rules(
+        min_confidence=min_confidence, min_lift=min_lift
+    )
+
+
+def _get_sentiment_cached(user_id: str, upload_id: str):
+    """Get sentiment scores for a user/upload"""
+    return _get_pipeline(user_id, upload_id).sentiment()
+
+
+def _get_keywords_cached(user_id: str, upload_id: str):
+    """Get sentiment keywords for a user/upload"""
+    return _get_pipeline(user_id, upload_id).keywords()
+
+
+# Segmentation, affinity and sentiment are independent of each other and
+# their heavy pandas/sklearn work releases the GIL
+_stage_pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix='behavior')
+
+
+def _run_core_stages(pipeline: BehaviorPipeline) -> Tuple[Tuple, pd.DataFrame, pd.DataFrame]:
+    """
+    Run segmentation, association rules and sentiment concurrently
+
+    Args:
+        pipeline: Behavior pipeline for the user/upload
+
+    Returns:
+        ((segmented_df, segment_mapping), rules, sentiment_df)
+    """
+    fut_seg = _stage_pool.submit(pipeline.segments)
+    fut_aff = _stage_pool.submit(pipeline.rules)
+    fut_sent = _stage_pool.submit(pipeline.sentiment)
+    return fut_seg.result(), fut_aff.result(), fut_sent.result()
+
+
+def _make_rule(
+    antecedents: Any,
+    consequents: Any,
+    support: float,
+    confidence: float,
+    lift: float
+) -> Dict[str, Any]:
+    """Build one rule dict with a fixed key order"""
+    return {
+        'antecedents': antecedents,
+        'consequents': consequents,
+        'support': support,
+        'confidence': confidence,
+        'lift': lift
+    }
+
+
+def _make_counted_rule(
+    antecedents: Any,
+    consequents: Any,
+    support: float,
+    confidence: float,
+    lift: float,
+    transactions: int
+) -> Dict[str, Any]:
+    """Build one rule dict including its estimated transaction count"""
+    return {
+        'antecedents': antecedents,
+        'consequents': consequents,
+        'support': support,
+        'confidence': confidence,
+        'lift': lift,
+        'transactions': transactions
+    }
+
+
+def _rules_to_list(
+    rules: pd.DataFrame,
+    to_string: Optional[Callable[[Any], str]] = None,
+    n_transactions: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Convert association rules to JSON-ready dicts using column arrays
+
+    Args:
+        rules: Rules DataFrame from generate_association_rules
+        to_string: Optional converter applied to antecedents/consequents
+        n_transactions: If given, add an estimated 'transactions' count
+
+    Returns:
+        List of rule dicts
+    """
+    if rules.empty:
+        return []
+
+    antecedents = rules['antecedents'].tolist()
+    consequents = rules['consequents'].tolist()
+    if to_string is not None:
+        antecedents = list(map(to_string, antecedents))
+        consequents = list(map(to_string, consequents))
+
+    support = rules['support'].to_numpy(dtype=np.float64)
+    confidence = rules['confidence'].to_numpy(dtype=np.float64).tolist()
+    lift = rules['lift'].to_numpy(dtype=np.float64).tolist()
+
+    if n_transactions is None:
+        return list(map(
+            _make_rule, antecedents, consequents, support.tolist(), confidence, lift
+        ))
+
+    counts = (support * n_transactions).astype(np.int64).tolist()
+    return list(map(
+        _make_counted_rule,
+        antecedents, consequents, support.tolist(), confidence, lift, counts
+    ))
+
+
 @behavior_bp.route('/segments', methods=['GET'])
 @jwt_required
 def get_segments():
@@ -59,34 +331,30 @@ def get_segments():
         n_clusters = int(request.args.get('n_clusters', 4))
 
         # Try to get from cache
-        cache_key = user_upload_key(user_id, upload_id or 'default', 'segments')
+        cache_key = _stage_key(user_id, upload_id, 'segments')
         cached_result = cache.get(cache_key)
         if cached_result is not None:
             logger.debug(f'Cache HIT: segments for {user_id}:{upload_id}')
-            return jsonify({
+            return ojsonify({
                 'success': True,
                 'data': cached_result
             })
 
-        sales_model = get_sales_model()
-
-        # Get transactions
-        transactions = sales_model.get_transactions(user_id, upload_id)
+        transactions = _get_transactions_cached(user_id, upload_id)
 
         if transactions.empty:
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'error': {
                     'code': 'NO_DATA',
                     'message': 'No transaction data available'
                 }
-            }), 400
+            }, 400)
 
         # Compute segmentation
-        segmentation_service = SegmentationService()
-        rfm_df = segmentation_service.compute_rfm_scores(transactions)
-        segmented_df, segment_mapping = segmentation_service.segment_customers(
-            rfm_df, n_clusters=n_clusters
+        rfm_df = _get_rfm_cached(user_id, upload_id)
+        segmented_df, segment_mapping = _get_segments_cached(
+            user_id, upload_id, n_clusters
         )
         summaries = segmentation_service.get_segment_summary(
             segmented_df, segment_mapping
@@ -107,20 +375,36 @@ def get_segments():
         # Cache for 5 minutes
         cache.set(cache_key, result, ttl=300)
 
-        return jsonify({
+        return ojsonify({
             'success': True,
             'data': result
         })
 
     except Exception as e:
         logger.error(f'Segments error: {str(e)}')
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': {
                 'code': 'INTERNAL_ERROR',
                 'message': 'Failed to get segments'
             }
-        }), 500
+        }, 500)
+
+
+def _save_segment_assignments(
+    segment_model: CustomerSegment,
+    user_id: str,
+    upload_id: str,
+    data_version: str
+):
+    """Store segment assignments unless a previous flight already published them"""
+    generation = segment_model.current_generation(user_id, upload_id, data_version)
+    if generation is None:
+        segmented_df, segment_mapping = _get_segments_cached(user_id, upload_id)
+        generation = segment_model.save_assignments(
+            user_id, upload_id, segmented_df, segment_mapping, data_version
+        )
+    return generation
 
 
 @behavior_bp.route('/segments/<int:segment_id>/customers', methods=['GET'])
@@ -135,7 +419,7 @@ def get_segment_customers(segment_id: int):
     Query Params:
         upload_id (str, optional): Filter by upload
         page (int): Page number (default: 1)
-        limit (int): Results per page (default: 50)
+        limit (int): Results per page (default: 50, max: 500)
     
     Returns:
         JSON: Paginated list of customers in segment
@@ -143,36 +427,42 @@ def get_segment_customers(segment_id: int):
     try:
         upload_id = request.args.get('upload_id')
         page = int(request.args.get('page', 1))
-        limit = int(request.args.get('limit', 50))
+        limit = min(max(int(request.args.get('limit', 50)), 1), MAX_RESULTS)
         
         user_id = g.current_user['user_id']
-        sales_model = get_sales_model()
-        
-        # Get transactions and compute segments
-        transactions = sales_model.get_transactions(user_id, upload_id)
-        
-        if transactions.empty:
-            return jsonify({
-                'success': False,
-                'error': {'code': 'NO_DATA', 'message': 'No data'}
-            }), 400
-        
-        segmentation_service = SegmentationService()
-        rfm_df = segmentation_service.compute_rfm_scores(transactions)
-        segmented_df, segment_mapping = segmentation_service.segment_customers(
-            rfm_df, n_clusters=4
-        )
+        segment_model = get_segment_model()
+        
+        # Compute and store assignments once per data version; later pages
+        # are indexed reads of the published generation
+        data_version = _data_version(user_id)
+        generation = segment_model.current_generation(user_id, upload_id, data_version)
+        if generation is None:
+            transactions = _get_transactions_cached(user_id, upload_id)
+            
+            if transactions.empty:
+                return ojsonify({
+                    'success': False,
+                    'error': {'code': 'NO_DATA', 'message': 'No data'}
+                }, 400)
+            
+            generation = _stage_flight.do(
+                ('segment_assignments', user_id, upload_id, data_version),
+                lambda: _save_segment_assignments(segment_model, user_id, upload_id, data_version)
+            )
         
         # Get customers in segment
-        customers, total = segmentation_service.get_segment_customers(
-            segmented_df, segment_id, page, limit
-        )
-        
-        return jsonify({
+        if generation is None:
+            customers, total, segment_name = [], 0, None
+        else:
+            customers, total, segment_name = segment_model.find_segment_customers(
+                user_id, upload_id, generation, segment_id, page, limit
+            )
+        
+        return ojsonify({
             'success': True,
             'data': {
                 'customers': customers,
-                'segment_name': segment_mapping.get(segment_id, f'Segment {segment_id}'),
+                'segment_name': segment_name or f'Segment {segment_id}',
                 'pagination': {
                     'page': page,
                     'limit': limit,
@@ -184,10 +474,10 @@ def get_segment_customers(segment_id: int):
         
     except Exception as e:
         logger.error(f'Segment customers error: {str(e)}')
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': {'code': 'INTERNAL_ERROR', 'message': 'Failed'}
-        }), 500
+        }, 500)
 
 
 @behavior_bp.route('/affinity/network', methods=['GET'])
@@ -198,47 +488,42 @@ def get_affinity_network():
     
     Query Params:
         upload_id (str, optional): Filter by upload
-        top_n (int): Number of top rules (default: 50)
+        top_n (int): Number of top rules (default: 50, max: 500)
     
     Returns:
         JSON: Network data with nodes and links
     """
     try:
         upload_id = request.args.get('upload_id')
-        top_n = int(request.args.get('top_n', 50))
+        top_n = min(max(int(request.args.get('top_n', 50)), 1), MAX_RESULTS)
         
         user_id = g.current_user['user_id']
-        sales_model = get_sales_model()
-        transactions = sales_model.get_transactions(user_id, upload_id)
+        transactions = _get_transactions_cached(user_id, upload_id)
         
         if transactions.empty:
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'error': {'code': 'NO_DATA', 'message': 'No data'}
-            }), 400
+            }, 400)
         
         # Compute affinity
-        affinity_service = AffinityService()
-        basket = affinity_service.create_basket_matrix(transactions)
-        itemsets = affinity_service.find_frequent_itemsets(basket, min_support=0.05)
-        rules = affinity_service.generate_association_rules(
-            itemsets, min_confidence=0.3, min_lift=1.5
-        )
+        rules = _get_rules_cached(user_id, upload_id)
         network = affinity_service.build_affinity_network(
-            rules, transactions, top_n=top_n
+            rules, transactions, top_n=top_n,
+            product_stats=_get_pipeline(user_id, upload_id).product_stats()
         )
         
-        return jsonify({
+        return ojsonify({
             'success': True,
             'data': network
         })
         
     except Exception as e:
         logger.error(f'Affinity network error: {str(e)}')
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': {'code': 'INTERNAL_ERROR', 'message': 'Failed'}
-        }), 500
+        }, 500)
 
 
 @behavior_bp.route('/affinity/rules', methods=['GET'])
@@ -261,36 +546,27 @@ def get_affinity_rules():
         min_confidence = float(request.args.get('min_confidence', 0.3))
         
         user_id = g.current_user['user_id']
-        sales_model = get_sales_model()
-        transactions = sales_model.get_transactions(user_id, upload_id)
+        transactions = _get_transactions_cached(user_id, upload_id)
         
         if transactions.empty:
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'error': {'code': 'NO_DATA', 'message': 'No data'}
-            }), 400
+            }, 400)
         
         # Compute affinity
-        affinity_service = AffinityService()
-        basket = affinity_service.create_basket_matrix(transactions)
-        itemsets = affinity_service.find_frequent_itemsets(basket, min_support=0.05)
-        rules = affinity_service.generate_association_rules(
-            itemsets, min_confidence=min_confidence, min_lift=min_lift
+        rules = _get_rules_cached(
+            user_id, upload_id, min_confidence=min_confidence, min_lift=min_lift
         )
         
         # Convert frozensets to strings for JSON
-        rules_list = []
-        for _, rule in rules.iterrows():
-            rules_list.append({
-                'antecedents': affinity_service._frozerset_to_string(rule['antecedents']),
-                'consequents': affinity_service._frozerset_to_string(rule['consequents']),
-                'support': float(rule['support']),
-                'confidence': float(rule['confidence']),
-                'lift': float(rule['lift']),
-                'transactions': int(rule['support'] * len(transactions))
-            })
+        rules_list = _rules_to_list(
+            rules,
+            to_string=affinity_service._frozerset_to_string,
+            n_transactions=len(transactions)
+        )
         
-        return jsonify({
+        return ojsonify({
             'success': True,
             'data': {
                 'rules': rules_list,
@@ -300,10 +576,10 @@ def get_affinity_rules():
         
     except Exception as e:
         logger.error(f'Affinity rules error: {str(e)}')
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': {'code': 'INTERNAL_ERROR', 'message': 'Failed'}
-        }), 500
+        }, 500)
 
 
 @behavior_bp.route('/affinity/bundles', methods=['GET'])
@@ -324,25 +600,19 @@ def get_affinity_bundles():
         min_lift = float(request.args.get('min_lift', 2.0))
         
         user_id = g.current_user['user_id']
-        sales_model = get_sales_model()
-        transactions = sales_model.get_transactions(user_id, upload_id)
+        transactions = _get_transactions_cached(user_id, upload_id)
         
         if transactions.empty:
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'error': {'code': 'NO_DATA', 'message': 'No data'}
-            }), 400
+            }, 400)
         
         # Compute affinity
-        affinity_service = AffinityService()
-        basket = affinity_service.create_basket_matrix(transactions)
-        itemsets = affinity_service.find_frequent_itemsets(basket, min_support=0.05)
-        rules = affinity_service.generate_association_rules(
-            itemsets, min_confidence=0.3, min_lift=min_lift
-        )
+        rules = _get_rules_cached(user_id, upload_id, min_lift=min_lift)
         bundles = affinity_service.suggest_bundles(rules, min_lift=min_lift)
         
-        return jsonify({
+        return ojsonify({
             'success': True,
             'data': {
                 'bundles': bundles,
@@ -352,10 +622,10 @@ def get_affinity_bundles():
         
     except Exception as e:
         logger.error(f'Bundles error: {str(e)}')
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': {'code': 'INTERNAL_ERROR', 'message': 'Failed'}
-        }), 500
+        }, 500)
 
 
 @behavior_bp.route('/sentiment/overview', methods=['GET'])
@@ -374,22 +644,20 @@ def get_sentiment_overview():
         upload_id = request.args.get('upload_id')
         
         user_id = g.current_user['user_id']
-        sales_model = get_sales_model()
-        transactions = sales_model.get_transactions(user_id, upload_id)
+        transactions = _get_transactions_cached(user_id, upload_id)
         
         if transactions.empty:
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'error': {'code': 'NO_DATA', 'message': 'No data'}
-            }), 400
+            }, 400)
         
         # Compute sentiment
-        sentiment_service = SentimentService()
-        sentiment_df = sentiment_service.calculate_sentiment_scores(transactions)
+        sentiment_df = _get_sentiment_cached(user_id, upload_id)
         overview = sentiment_service.get_overview(sentiment_df)
         gauge_data = sentiment_service.get_sentiment_gauge_data(sentiment_df)
         
-        return jsonify({
+        return ojsonify({
             'success': True,
             'data': {
                 'overview': overview,
@@ -399,10 +667,10 @@ def get_sentiment_overview():
         
     except Exception as e:
         logger.error(f'Sentiment overview error: {str(e)}')
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': {'code': 'INTERNAL_ERROR', 'message': 'Failed'}
-        }), 500
+        }, 500)
 
 
 @behavior_bp.route('/sentiment/by-category', methods=['GET'])
@@ -421,21 +689,19 @@ def get_sentiment_by_category():
         upload_id = request.args.get('upload_id')
         
         user_id = g.current_user['user_id']
-        sales_model = get_sales_model()
-        transactions = sales_model.get_transactions(user_id, upload_id)
+        transactions = _get_transactions_cached(user_id, upload_id)
         
         if transactions.empty:
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'error': {'code': 'NO_DATA', 'message': 'No data'}
-            }), 400
+            }, 400)
         
         # Compute sentiment
-        sentiment_service = SentimentService()
-        sentiment_df = sentiment_service.calculate_sentiment_scores(transactions)
+        sentiment_df = _get_sentiment_cached(user_id, upload_id)
         by_category = sentiment_service.get_by_category(sentiment_df)
         
-        return jsonify({
+        return ojsonify({
             'success': True,
             'data': {
                 'categories': by_category
@@ -444,10 +710,10 @@ def get_sentiment_by_category():
         
     except Exception as e:
         logger.error(f'Sentiment by category error: {str(e)}')
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': {'code': 'INTERNAL_ERROR', 'message': 'Failed'}
-        }), 500
+        }, 500)
 
 
 @behavior_bp.route('/sentiment/keywords', methods=['GET'])
@@ -466,30 +732,28 @@ def get_sentiment_keywords():
         upload_id = request.args.get('upload_id')
         
         user_id = g.current_user['user_id']
-        sales_model = get_sales_model()
-        transactions = sales_model.get_transactions(user_id, upload_id)
+        transactions = _get_transactions_cached(user_id, upload_id)
         
         if transactions.empty:
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'error': {'code': 'NO_DATA', 'message': 'No data'}
-            }), 400
+            }, 400)
         
         # Extract keywords
-        sentiment_service = SentimentService()
-        keywords = sentiment_service.extract_keywords(transactions)
+        keywords = _get_keywords_cached(user_id, upload_id)
         
-        return jsonify({
+        return ojsonify({
             'success': True,
             'data': keywords
         })
         
     except Exception as e:
         logger.error(f'Sentiment keywords error: {str(e)}')
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': {'code': 'INTERNAL_ERROR', 'message': 'Failed'}
-        }), 500
+        }, 500)
 
 
 @behavior_bp.route('/personas', methods=['GET'])
@@ -509,33 +773,26 @@ def get_personas():
         
         user_id = g.current_user['user_id']
         sales_model = get_sales_model()
-        
-        # Get transactions
-        transactions = sales_model.get_transactions(user_id, upload_id)
+        transactions = _get_transactions_cached(user_id, upload_id)
         
         if transactions.empty:
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'error': {'code': 'NO_DATA', 'message': 'No data'}
-            }), 400
+            }, 400)
         
         # Get customers for demographics
         customers = sales_model.get_customers(user_id, upload_id)
         
         # Compute segmentation
-        segmentation_service = SegmentationService()
-        rfm_df = segmentation_service.compute_rfm_scores(transactions)
-        segmented_df, segment_mapping = segmentation_service.segment_customers(
-            rfm_df, n_clusters=4
-        )
+        segmented_df, segment_mapping = _get_segments_cached(user_id, upload_id)
         
         # Generate personas
-        persona_service = PersonaService()
         personas = persona_service.generate_personas(
             segmented_df, segment_mapping, customers
         )
         
-        return jsonify({
+        return ojsonify({
             'success': True,
             'data': {
                 'personas': personas,
@@ -545,14 +802,15 @@ def get_personas():
         
     except Exception as e:
         logger.error(f'Personas error: {str(e)}')
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': {'code': 'INTERNAL_ERROR', 'message': 'Failed'}
-        }), 500
+        }, 500)
 
 
 @behavior_bp.route('/recommendations', methods=['GET'])
 @jwt_required
+@conditional_get
 def get_recommendations():
     """
     Get behavioral recommendations
@@ -571,40 +829,28 @@ def get_recommendations():
         priority_filter = request.args.get('priority')
         
         user_id = g.current_user['user_id']
-        sales_model = get_sales_model()
-        transactions = sales_model.get_transactions(user_id, upload_id)
+        transactions = _get_transactions_cached(user_id, upload_id)
         
         if transactions.empty:
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'error': {'code': 'NO_DATA', 'message': 'No data'}
-            }), 400
+            }, 400)
         
-        # Compute all analytics
-        segmentation_service = SegmentationService()
-        affinity_service = AffinityService()
-        sentiment_service = SentimentService()
-        recommendation_service = RecommendationService()
+        # Run the independent stages side by side
+        (segmented_df, segment_mapping), rules, sentiment_df = _run_core_stages(
+            _get_pipeline(user_id, upload_id)
+        )
         
         # Segmentation
-        rfm_df = segmentation_service.compute_rfm_scores(transactions)
-        segmented_df, segment_mapping = segmentation_service.segment_customers(
-            rfm_df, n_clusters=4
-        )
         segments = segmentation_service.get_segment_summary(
             segmented_df, segment_mapping
         )
         
         # Affinity
-        basket = affinity_service.create_basket_matrix(transactions)
-        itemsets = affinity_service.find_frequent_itemsets(basket, min_support=0.05)
-        rules = affinity_service.generate_association_rules(
-            itemsets, min_confidence=0.3, min_lift=1.5
-        )
         bundles = affinity_service.suggest_bundles(rules)
         
         # Sentiment
-        sentiment_df = sentiment_service.calculate_sentiment_scores(transactions)
         sentiment_overview = sentiment_service.get_overview(sentiment_df)
         by_category = sentiment_service.get_by_category(sentiment_df)
         
@@ -616,15 +862,7 @@ def get_recommendations():
         }
         
         # Generate recommendations
-        rules_list = []
-        for _, rule in rules.iterrows():
-            rules_list.append({
-                'antecedents': rule['antecedents'],
-                'consequents': rule['consequents'],
-                'support': float(rule['support']),
-                'confidence': float(rule['confidence']),
-                'lift': float(rule['lift'])
-            })
+        rules_list = _rules_to_list(rules)
         
         recommendations = recommendation_service.generate_recommendations(
             segments, rules_list, sentiment_data, bundles
@@ -643,7 +881,7 @@ def get_recommendations():
         # Get summary
         summary = recommendation_service.get_recommendation_summary(recommendations)
         
-        return jsonify({
+        return ojsonify({
             'success': True,
             'data': {
                 'recommendations': recommendations,
@@ -653,14 +891,15 @@ def get_recommendations():
         
     except Exception as e:
         logger.error(f'Recommendations error: {str(e)}')
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': {'code': 'INTERNAL_ERROR', 'message': 'Failed'}
-        }), 500
+        }, 500)
 
 
 @behavior_bp.route('/insights/summary', methods=['GET'])
 @jwt_required
+@conditional_get
 def get_behavioral_insights_summary():
     """
     Get comprehensive behavioral insights summary
@@ -675,60 +914,38 @@ def get_behavioral_insights_summary():
         upload_id = request.args.get('upload_id')
         
         user_id = g.current_user['user_id']
-        sales_model = get_sales_model()
-        transactions = sales_model.get_transactions(user_id, upload_id)
+        transactions = _get_transactions_cached(user_id, upload_id)
         
         if transactions.empty:
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'error': {'code': 'NO_DATA', 'message': 'No data'}
-            }), 400
+            }, 400)
         
-        # Compute all analytics
-        segmentation_service = SegmentationService()
-        affinity_service = AffinityService()
-        sentiment_service = SentimentService()
-        persona_service = PersonaService()
-        recommendation_service = RecommendationService()
+        # Run the independent stages side by side
+        (segmented_df, segment_mapping), rules, sentiment_df = _run_core_stages(
+            _get_pipeline(user_id, upload_id)
+        )
         
         # Segmentation
-        rfm_df = segmentation_service.compute_rfm_scores(transactions)
-        segmented_df, segment_mapping = segmentation_service.segment_customers(
-            rfm_df, n_clusters=4
-        )
         segments = segmentation_service.get_segment_summary(
             segmented_df, segment_mapping
         )
         
         # Affinity
-        basket = affinity_service.create_basket_matrix(transactions)
-        itemsets = affinity_service.find_frequent_itemsets(basket, min_support=0.05)
-        rules = affinity_service.generate_association_rules(
-            itemsets, min_confidence=0.3, min_lift=1.5
-        )
         bundles = affinity_service.suggest_bundles(rules)
         
         # Sentiment
-        sentiment_df = sentiment_service.calculate_sentiment_scores(transactions)
         sentiment_overview = sentiment_service.get_overview(sentiment_df)
         
         # Personas
-        customers = sales_model.get_customers(user_id, upload_id)
+        customers = get_sales_model().get_customers(user_id, upload_id)
         personas = persona_service.generate_personas(
             segmented_df, segment_mapping, customers
         )
         
         # Recommendations
-        rules_list = [
-            {
-                'antecedents': rule['antecedents'],
-                'consequents': rule['consequents'],
-                'support': float(rule['support']),
-                'confidence': float(rule['confidence']),
-                'lift': float(rule['lift'])
-            }
-            for _, rule in rules.iterrows()
-        ]
+        rules_list = _rules_to_list(rules)
         
         sentiment_data = {
             'overall_score': sentiment_overview['overall_score'],
@@ -740,7 +957,7 @@ def get_behavioral_insights_summary():
             segments, rules_list, sentiment_data, bundles
         )
         
-        return jsonify({
+        return ojsonify({
             'success': True,
             'data': {
                 'segments': {
@@ -755,22 +972,19 @@ def get_behavioral_insights_summary():
                 'sentiment': sentiment_overview,
                 'personas': personas[:4],  # Top 4 personas
                 'recommendations': recommendations[:5],  # Top 5 recommendations
-                'summary': {
-                    'total_customers': len(rfm_df),
-                    'total_products': transactions['product_name'].nunique(),
-                    'total_transactions': len(transactions)
-                }
+                'summary': _get_pipeline(user_id, upload_id).summary_stats()
             }
         })
         
     except Exception as e:
         logger.error(f'Insights summary error: {str(e)}')
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': {'code': 'INTERNAL_ERROR', 'message': 'Failed'}
-        }), 500
+        }, 500)
 @behavior_bp.route('/tips', methods=['GET'])
 @jwt_required
+@conditional_get
 def get_tips():
     """
     Get behavioral tips (subset of recommendations)
@@ -778,34 +992,26 @@ def get_tips():
     try:
         upload_id = request.args.get('upload_id')
         user_id = g.current_user['user_id']
-        sales_model = get_sales_model()
-        transactions = sales_model.get_transactions(user_id, upload_id)
+        transactions = _get_transactions_cached(user_id, upload_id)
         
         if transactions.empty:
-            return jsonify({
+            return ojsonify({
                 'success': True,
                 'data': []
             })
             
-        # For tips, we compute the recommendations and return them
-        segmentation_service = SegmentationService()
-        affinity_service = AffinityService()
-        sentiment_service = SentimentService()
-        recommendation_service = RecommendationService()
+        # Run the independent stages side by side
+        (segmented_df, segment_mapping), rules, sentiment_df = _run_core_stages(
+            _get_pipeline(user_id, upload_id)
+        )
         
         # Segmentation
-        rfm_df = segmentation_service.compute_rfm_scores(transactions)
-        segmented_df, segment_mapping = segmentation_service.segment_customers(rfm_df)
         segments = segmentation_service.get_segment_summary(segmented_df, segment_mapping)
         
         # Affinity
-        basket = affinity_service.create_basket_matrix(transactions)
-        itemsets = affinity_service.find_frequent_itemsets(basket)
-        rules = affinity_service.generate_association_rules(itemsets)
         bundles = affinity_service.suggest_bundles(rules)
         
         # Sentiment
-        sentiment_df = sentiment_service.calculate_sentiment_scores(transactions)
         sentiment_overview = sentiment_service.get_overview(sentiment_df)
         
         sentiment_data = {
@@ -816,15 +1022,7 @@ def get_tips():
         }
         
         # Format rules for recommender
-        rules_list = []
-        for _, rule in rules.iterrows():
-            rules_list.append({
-                'antecedents': rule['antecedents'],
-                'consequents': rule['consequents'],
-                'support': float(rule['support']),
-                'confidence': float(rule['confidence']),
-                'lift': float(rule['lift'])
-            })
+        rules_list = _rules_to_list(rules)
             
         recommendations = recommendation_service.generate_recommendations(
             segments, rules_list, sentiment_data, bundles
@@ -833,14 +1031,14 @@ def get_tips():
         # Add some 'Tip' specific metadata if needed, or just return as is
         # The frontend Tips component will handle the display
         
-        return jsonify({
+        return ojsonify({
             'success': True,
             'data': recommendations
         })
         
     except Exception as e:
         logger.error(f'Tips error: {str(e)}')
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': {'code': 'INTERNAL_ERROR', 'message': 'Failed to get tips'}
-        }), 500
+        }, 500)
@@ -5,7 +5,12 @@ Dashboard Routes - Complete Dashboard Data
 Handles fetching all data needed for the dashboard in a single request.
 """
 
-from flask import Blueprint, request, jsonify, current_app, g
+from flask import Blueprint, request, current_app, g
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import wraps
+from typing import Any, Dict, List, Optional
+import numpy as np
 import pandas as pd
 
 from models.sales_data import SalesData
@@ -13,9 +18,23 @@ from models.upload import UploadSession
 from services.analytics_service import AnalyticsService
 from services.forecast_service import ForecastService
 from routes.auth import jwt_required
+from utils.helpers import ojsonify, top_k_positions
+from utils.cache import cache, SingleFlight
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
+# Runs the independent dashboard queries and analyses side by side.
+# Work submitted here must not touch g or current_app.
+_dashboard_pool = ThreadPoolExecutor(max_workers=6, thread_name_prefix='dashboard')
+
+# Serialized responses are keyed by the user's upload data version, so a new
+# or deleted upload misses the cache without waiting for the TTL
+DASHBOARD_CACHE_TTL = 120
+
+# The dashboard page requests KPIs and charts together; identical aggregations
+# already in flight are shared instead of run again
+_payload_flight = SingleFlight()
+
 
 def get_sales_data_model():
     """Get sales data model."""
@@ -29,8 +48,109 @@ def get_upload_model():
     return UploadSession(db)
 
 
+def cached_response(operation: str):
+    """
+    Cache a successful JSON response per user, query string and data version.
+    
+    Args:
+        operation: Cache key prefix for the endpoint.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            user_id = g.current_user['user_id']
+            data_version = get_upload_model().get_data_version(user_id)
+            key = ':'.join([
+                operation,
+                user_id,
+                request.query_string.decode('utf-8', 'replace'),
+                data_version
+            ])
+            
+            body = cache.get(key)
+            if body is not None:
+                return current_app.response_class(body, mimetype='application/json')
+            
+            response = current_app.make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                cache.set(key, response.get_data(), ttl=DASHBOARD_CACHE_TTL)
+            return response
+        
+        return decorated
+    return decorator
+
+
+def get_dashboard_payload(
+    sales_model: SalesData,
+    upload_model: UploadSession,
+    user_id: str,
+    upload_id: Optional[str] = None,
+    include_products: bool = False
+) -> Dict[str, Any]:
+    """
+    Get dashboard aggregates, reading the summary stored at upload time
+    when the request is scoped to one upload.
+    
+    Same shape as SalesData.get_dashboard_payload.
+    """
+    summary = upload_model.get_dashboard_summary(user_id, upload_id) if upload_id else None
+    if summary is None:
+        return _payload_flight.do(
+            (user_id, upload_id, include_products),
+            lambda: sales_model.get_dashboard_payload(user_id, upload_id, include_products)
+        )
+    
+    payload = {'kpis': summary['kpis'], 'daily': summary['daily']}
+    if include_products:
+        payload['products'] = summary['products']
+    else:
+        payload['top_products'] = summary['products'][:10]
+        payload['low_products'] = sorted(summary['products'], key=lambda p: p['units_sold'])[:10]
+    return payload
+
+
+def _product_records(
+    product_df: pd.DataFrame,
+    categories: np.ndarray,
+    positions: Optional[np.ndarray] = None
+) -> List[Dict[str, Any]]:
+    """
+    Convert product summary rows to JSON-ready dicts using column arrays.
+    
+    Args:
+        product_df: Product summary DataFrame.
+        categories: Performance category per product row, from the analysis.
+        positions: Optional row positions to convert, in output order.
+    """
+    if positions is not None:
+        product_df = product_df.iloc[positions]
+        categories = categories[positions]
+    
+    columns = {name: product_df[name].tolist() for name in product_df.columns}
+    columns['units_sold'] = product_df['units_sold'].to_numpy(dtype=np.int64).tolist()
+    columns['price'] = product_df['price'].to_numpy(dtype=np.float64).tolist()
+    columns['revenue'] = product_df['revenue'].to_numpy(dtype=np.float64).tolist()
+    columns['performance_category'] = categories.tolist()
+    
+    names = list(columns)
+    return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+
+def _format_time_series(daily: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Render daily sales rows with ISO date strings for charts."""
+    return [
+        {
+            'date': row['date'].strftime('%Y-%m-%d'),
+            'units_sold': row['units_sold'],
+            'revenue': row['revenue']
+        }
+        for row in daily
+    ]
+
+
 @dashboard_bp.route('', methods=['GET'])
 @jwt_required
+@cached_response('dashboard')
 def get_dashboard_data():
     """
     Get complete dashboard data.
@@ -43,23 +163,27 @@ def get_dashboard_data():
     """
     try:
         upload_id = request.args.get('upload_id')
+        user_id = g.current_user['user_id']
         
         sales_model = get_sales_data_model()
         upload_model = get_upload_model()
         analytics_service = AnalyticsService()
         forecast_service = ForecastService()
         
-        # Get upload history
-        uploads = upload_model.find_by_user(g.current_user['user_id'], limit=10)
+        # Upload history and the aggregated sales payload are independent
+        uploads_future = _dashboard_pool.submit(
+            upload_model.find_by_user, user_id, limit=10, include_results=False
+        )
+        payload_future = _dashboard_pool.submit(
+            get_dashboard_payload, sales_model, upload_model, user_id, upload_id,
+            include_products=True
+        )
         
-        # Get product summary
-        product_df = sales_model.get_product_summary(g.current_user['user_id'], upload_id)
+        uploads = uploads_future.result()
+        payload = payload_future.result()
         
-        # Get daily sales
-        daily_df = sales_model.get_daily_sales(g.current_user['user_id'], upload_id)
-        
-        if product_df.empty:
-            return jsonify({
+        if not payload['products']:
+            return ojsonify({
                 'success': True,
                 'data': {
                     'has_data': False,
@@ -68,67 +192,56 @@ def get_dashboard_data():
                 }
             })
         
-        # Generate analysis
-        product_analysis = analytics_service.analyze_product_performance(product_df)
-        trend_analysis = analytics_service.analyze_trends(daily_df)
-        recommendations = analytics_service.generate_recommendations(product_analysis)
+        product_df = pd.DataFrame(
+            payload['products'], columns=['product_name', 'units_sold', 'price', 'revenue']
+        )
+        daily_df = pd.DataFrame(payload['daily'], columns=['date', 'units_sold', 'revenue'])
+        daily_df['date'] = pd.to_datetime(daily_df['date'])
         
-        # Generate forecast
-        forecast = forecast_service.forecast(daily_df, periods=30)
+        # Generate analysis and forecast in parallel
+        product_future = _dashboard_pool.submit(
+            analytics_service.analyze_product_performance, product_df
+        )
+        trend_future = _dashboard_pool.submit(analytics_service.analyze_trends, daily_df)
+        forecast_future = _dashboard_pool.submit(forecast_service.forecast, daily_df, periods=30)
         
-        # Prepare chart data
-        # Top products bar chart
-        top_products = product_df.nlargest(10, 'units_sold').to_dict('records')
-        for item in top_products:
-            item['units_sold'] = int(item['units_sold'])
-            item['price'] = float(item['price'])
-            item['revenue'] = float(item['revenue'])
-        
-        # Low products bar chart
-        low_products = product_df.nsmallest(10, 'units_sold').to_dict('records')
-        for item in low_products:
-            item['units_sold'] = int(item['units_sold'])
-            item['price'] = float(item['price'])
-            item['revenue'] = float(item['revenue'])
-        
-        # Price vs volume scatter
-        price_volume = product_df.to_dict('records')
-        for item in price_volume:
-            item['units_sold'] = int(item['units_sold'])
-            item['price'] = float(item['price'])
-            item['revenue'] = float(item['revenue'])
+        product_analysis = product_future.result()
+        recommendations = analytics_service.generate_recommendations(product_analysis)
+        trend_analysis = trend_future.result()
+        forecast = forecast_future.result()
         
-        # Time series line chart
-        daily_df['date'] = pd.to_datetime(daily_df['date']).dt.strftime('%Y-%m-%d')
-        time_series = daily_df.to_dict('records')
-        for item in time_series:
-            item['units_sold'] = int(item['units_sold'])
-            item['revenue'] = float(item['revenue'])
+        # Product charts carry each product's performance category
+        categories = analytics_service.categorize_performance(product_df)
+        units = product_df['units_sold'].to_numpy()
+        top_products = _product_records(product_df, categories, top_k_positions(units, 10))
+        low_products = _product_records(
+            product_df, categories, top_k_positions(units, 10, largest=False)
+        )
+        price_volume = _product_records(product_df, categories)
         
         # KPIs
-        total_revenue = float(product_df['revenue'].sum())
-        total_units = int(product_df['units_sold'].sum())
-        total_products = len(product_df)
-        total_customers = sales_model.get_total_customers(g.current_user['user_id'], upload_id)
+        kpis = payload['kpis']
+        total_revenue = kpis['total_revenue']
+        total_units = kpis['total_units']
         avg_order_value = total_revenue / total_units if total_units > 0 else 0
         
-        return jsonify({
+        return ojsonify({
             'success': True,
             'data': {
                 'has_data': True,
                 'kpis': {
                     'total_revenue': round(total_revenue, 2),
                     'total_units': total_units,
-                    'total_products': total_products,
-                    'total_customers': total_customers,
+                    'total_products': kpis['total_products'],
+                    'total_customers': kpis['total_customers'],
                     'avg_order_value': round(avg_order_value, 2),
-                    'avg_price': round(float(product_df['price'].mean()), 2)
+                    'avg_price': round(kpis['avg_price'], 2)
                 },
                 'charts': {
                     'top_products': top_products,
                     'low_products': low_products,
                     'price_volume': price_volume,
-                    'time_series': time_series,
+                    'time_series': _format_time_series(payload['daily']),
                     'forecast': forecast.get('predictions', [])
                 },
                 'analysis': {
@@ -142,14 +255,15 @@ def get_dashboard_data():
         
     except Exception as e:
         current_app.logger.error(f'Dashboard error: {str(e)}')
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': {'code': 'INTERNAL_ERROR', 'message': 'Failed to get dashboard data'}
-        }), 500
+        }, 500)
 
 
 @dashboard_bp.route('/kpis', methods=['GET'])
 @jwt_required
+@cached_response('dashboard_kpis')
 def get_kpis():
     """
     Get KPI cards data.
@@ -163,11 +277,12 @@ def get_kpis():
     try:
         upload_id = request.args.get('upload_id')
         
-        sales_model = get_sales_data_model()
-        product_df = sales_model.get_product_summary(g.current_user['user_id'], upload_id)
+        kpis = get_dashboard_payload(
+            get_sales_data_model(), get_upload_model(), g.current_user['user_id'], upload_id
+        )['kpis']
         
-        if product_df.empty:
-            return jsonify({
+        if not kpis['total_products']:
+            return ojsonify({
                 'success': True,
                 'data': {
                     'total_revenue': 0,
@@ -179,35 +294,33 @@ def get_kpis():
                 }
             })
         
-        total_revenue = float(product_df['revenue'].sum())
-        total_units = int(product_df['units_sold'].sum())
-        total_products = len(product_df)
-        total_customers = sales_model.get_total_customers(g.current_user['user_id'], upload_id)
+        total_revenue = kpis['total_revenue']
+        total_units = kpis['total_units']
         avg_order_value = total_revenue / total_units if total_units > 0 else 0
-        avg_price = float(product_df['price'].mean())
         
-        return jsonify({
+        return ojsonify({
             'success': True,
             'data': {
                 'total_revenue': round(total_revenue, 2),
                 'total_units': total_units,
-                'total_products': total_products,
-                'total_customers': total_customers,
+                'total_products': kpis['total_products'],
+                'total_customers': kpis['total_customers'],
                 'avg_order_value': round(avg_order_value, 2),
-                'avg_price': round(avg_price, 2)
+                'avg_price': round(kpis['avg_price'], 2)
             }
         })
         
     except Exception as e:
         current_app.logger.error(f'KPIs error: {str(e)}')
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': {'code': 'INTERNAL_ERROR', 'message': 'Failed to get KPIs'}
-        }), 500
+        }, 500)
 
 
 @dashboard_bp.route('/charts', methods=['GET'])
 @jwt_required
+@cached_response('dashboard_charts')
 def get_charts():
     """
     Get chart data for dashboard.
@@ -223,57 +336,34 @@ def get_charts():
         upload_id = request.args.get('upload_id')
         days = request.args.get('days', type=int)
         
-        sales_model = get_sales_data_model()
-        product_df = sales_model.get_product_summary(g.current_user['user_id'], upload_id)
-        daily_df = sales_model.get_daily_sales(g.current_user['user_id'], upload_id)
+        payload = get_dashboard_payload(
+            get_sales_data_model(), get_upload_model(), g.current_user['user_id'], upload_id
+        )
+        daily = payload['daily']
         
-        if daily_df.empty:
-            return jsonify({
+        if not daily:
+            return ojsonify({
                 'success': True,
                 'data': {}
             })
         
         # Filter by days if specified
         if days and days > 0:
-            daily_df['date'] = pd.to_datetime(daily_df['date'])
-            cutoff_date = daily_df['date'].max() - pd.Timedelta(days=days-1)
-            daily_df = daily_df[daily_df['date'] >= cutoff_date]
-            daily_df['date'] = daily_df['date'].dt.strftime('%Y-%m-%d')
-        else:
-            daily_df['date'] = pd.to_datetime(daily_df['date']).dt.strftime('%Y-%m-%d')
-        
-        # Top products
-        top_products = product_df.nlargest(10, 'units_sold').to_dict('records')
-        for item in top_products:
-            item['units_sold'] = int(item['units_sold'])
-            item['price'] = float(item['price'])
-            item['revenue'] = float(item['revenue'])
-        
-        # Low products
-        low_products = product_df.nsmallest(10, 'units_sold').to_dict('records')
-        for item in low_products:
-            item['units_sold'] = int(item['units_sold'])
-            item['price'] = float(item['price'])
-            item['revenue'] = float(item['revenue'])
-        
-        # Time series
-        time_series = daily_df.to_dict('records')
-        for item in time_series:
-            item['units_sold'] = int(item['units_sold'])
-            item['revenue'] = float(item['revenue'])
+            cutoff_date = daily[-1]['date'] - timedelta(days=days - 1)
+            daily = [row for row in daily if row['date'] >= cutoff_date]
         
-        return jsonify({
+        return ojsonify({
             'success': True,
             'data': {
-                'top_products': top_products,
-                'low_products': low_products,
-                'time_series': time_series
+                'top_products': payload['top_products'],
+                'low_products': payload['low_products'],
+                'time_series': _format_time_series(daily)
             }
         })
         
     except Exception as e:
         current_app.logger.error(f'Charts error: {str(e)}')
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': {'code': 'INTERNAL_ERROR', 'message': 'Failed to get chart data'}
-        }), 500
+        }, 500)
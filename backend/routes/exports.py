@@ -5,17 +5,36 @@ Export Routes - Report Export Endpoints
 Handles PDF and Excel report generation and download.
 """
 
-from flask import Blueprint, request, jsonify, send_file, current_app, g
-from io import BytesIO
+from flask import Blueprint, request, send_file, current_app, g, Response, stream_with_context
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional
+import itertools
+import os
+import tempfile
+import time
+import uuid
 
 from routes.auth import jwt_required
+from utils.helpers import ojsonify
 from models.sales_data import SalesData
+from models.export_job import ExportJob
 from services.analytics_service import AnalyticsService
 from services.forecast_service import ForecastService
 from services.export_service import export_service
 
 exports_bp = Blueprint('exports', __name__)
 
+CSV_EXPORT_COLUMNS = ['product_name', 'date', 'units_sold', 'price', 'revenue', 'category']
+
+# Background Excel builds; job state is kept in Mongo so any worker can answer
+# a poll, and finished reports stay downloadable for EXPORT_JOB_TTL seconds
+EXPORT_JOB_TTL = ExportJob.JOB_TTL
+_export_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='export')
+
+# Reports are written here and sent from disk rather than held in memory
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), 'shopsense_exports')
+
 
 def get_sales_data_model():
     """Get sales data model."""
@@ -23,6 +42,157 @@ def get_sales_data_model():
     return SalesData(db)
 
 
+def get_export_job_model():
+    """Get export job model."""
+    db = current_app.config['MONGO_DB']
+    return ExportJob(db)
+
+
+def _sweep_export_files(max_age: int = EXPORT_JOB_TTL) -> None:
+    """Remove report files older than max_age seconds."""
+    cutoff = time.time() - max_age
+    try:
+        entries = list(os.scandir(EXPORT_DIR))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except OSError:
+            pass
+
+
+def build_excel_report(
+    sales_model: SalesData,
+    user_id: str,
+    upload_id: Optional[str] = None,
+    include_charts: bool = True
+) -> Optional[str]:
+    """
+    Build the analytics Excel report for a user.
+    
+    Safe to run outside a request: it only uses the given model.
+    
+    Args:
+        sales_model: Sales data model.
+        user_id: User ObjectId as string.
+        upload_id: Optional upload session ID to filter.
+        include_charts: Include chart data.
+    
+    Returns:
+        str or None: Path of the xlsx file in EXPORT_DIR, or None if there is no data.
+    """
+    analytics_service = AnalyticsService()
+    forecast_service = ForecastService()
+    
+    # Get data
+    product_df = sales_model.get_product_summary(user_id, upload_id)
+    daily_df = sales_model.get_daily_sales(user_id, upload_id)
+    
+    if product_df.empty:
+        return None
+    
+    # Generate analysis
+    product_analysis = analytics_service.analyze_product_performance(product_df)
+    trend_analysis = analytics_service.analyze_trends(daily_df)
+    recommendations = analytics_service.generate_recommendations(product_analysis)
+    
+    # Generate forecast
+    forecast = forecast_service.forecast(daily_df, periods=30)
+    
+    # Prepare export data
+    export_data = {
+        'kpis': {
+            'total_revenue': float(product_df['revenue'].sum()),
+            'total_units': int(product_df['units_sold'].sum()),
+            'total_products': len(product_df),
+            'avg_order_value': float(product_df['revenue'].sum()) / int(product_df['units_sold'].sum()) if product_df['units_sold'].sum() > 0 else 0,
+            'avg_price': float(product_df['price'].mean())
+        },
+        'charts': {
+            'top_products': product_df.assign(
+                performance_category=analytics_service.categorize_performance(product_df)
+            ).nlargest(10, 'units_sold').to_dict('records'),
+            'time_series': daily_df.to_dict('records'),
+            'forecast': forecast.get('predictions', [])
+        },
+        'analysis': {
+            'product_analysis': product_analysis,
+            'trend_analysis': trend_analysis,
+            'recommendations': recommendations
+        }
+    }
+    
+    # Convert types for JSON serialization
+    for product in export_data['charts']['top_products']:
+        product['units_sold'] = int(product['units_sold'])
+        product['price'] = float(product['price'])
+        product['revenue'] = float(product['revenue'])
+    
+    for trend in export_data['charts']['time_series']:
+        trend['date'] = str(trend['date'])
+        trend['units_sold'] = int(trend['units_sold'])
+        trend['revenue'] = float(trend['revenue'])
+    
+    # Generate Excel file
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix='.xlsx', dir=EXPORT_DIR)
+    os.close(fd)
+    try:
+        return export_service.save_excel_report(export_data, path, include_charts)
+    except BaseException:
+        os.remove(path)
+        raise
+
+
+def _send_excel(path: str, delete_after: bool = False):
+    """
+    Send an xlsx file as a timestamped download.
+    
+    The file is streamed from disk with Range and conditional request
+    support. With delete_after the file is unlinked once opened, so it is
+    removed as soon as the response closes its handle.
+    """
+    source = path
+    if delete_after:
+        source = open(path, 'rb')
+        os.remove(path)
+    
+    # Use timestamp instead of user ID for security
+    timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+    return send_file(
+        source,
+        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        as_attachment=True,
+        download_name=f'shopsense_report_{timestamp}.xlsx',
+        conditional=True
+    )
+
+
+def _run_excel_job(
+    job_model: ExportJob,
+    logger,
+    job_id: str,
+    sales_model: SalesData,
+    user_id: str,
+    upload_id: Optional[str],
+    include_charts: bool
+) -> None:
+    """
+    Build an Excel report in the background and record the job outcome.
+    
+    Runs on the export pool, outside any request context.
+    """
+    try:
+        path = build_excel_report(sales_model, user_id, upload_id, include_charts)
+    except Exception as e:
+        logger.error(f'Excel job error: {str(e)}')
+        job_model.fail(job_id, str(e))
+        return
+    job_model.complete(job_id, path)
+
+
 @exports_bp.route('/excel', methods=['POST'])
 @jwt_required
 def export_excel():
@@ -38,82 +208,116 @@ def export_excel():
     """
     try:
         data = request.get_json() or {}
-        upload_id = data.get('upload_id')
-        include_charts = data.get('include_charts', True)
-        
-        sales_model = get_sales_data_model()
-        analytics_service = AnalyticsService()
-        forecast_service = ForecastService()
         
-        # Get data
-        product_df = sales_model.get_product_summary(g.current_user['user_id'], upload_id)
-        daily_df = sales_model.get_daily_sales(g.current_user['user_id'], upload_id)
+        excel_file = build_excel_report(
+            get_sales_data_model(),
+            g.current_user['user_id'],
+            data.get('upload_id'),
+            data.get('include_charts', True)
+        )
         
-        if product_df.empty:
-            return jsonify({
+        if excel_file is None:
+            return ojsonify({
                 'success': False,
                 'error': {'code': 'NO_DATA', 'message': 'No data available for export'}
-            }), 400
-        
-        # Generate analysis
-        product_analysis = analytics_service.analyze_product_performance(product_df)
-        trend_analysis = analytics_service.analyze_trends(daily_df)
-        recommendations = analytics_service.generate_recommendations(product_analysis)
-        
-        # Generate forecast
-        forecast = forecast_service.forecast(daily_df, periods=30)
-        
-        # Prepare export data
-        export_data = {
-            'kpis': {
-                'total_revenue': float(product_df['revenue'].sum()),
-                'total_units': int(product_df['units_sold'].sum()),
-                'total_products': len(product_df),
-                'avg_order_value': float(product_df['revenue'].sum()) / int(product_df['units_sold'].sum()) if product_df['units_sold'].sum() > 0 else 0,
-                'avg_price': float(product_df['price'].mean())
-            },
-            'charts': {
-                'top_products': product_df.nlargest(10, 'units_sold').to_dict('records'),
-                'time_series': daily_df.to_dict('records'),
-                'forecast': forecast.get('predictions', [])
-            },
-            'analysis': {
-                'product_analysis': product_analysis,
-                'trend_analysis': trend_analysis,
-                'recommendations': recommendations
-            }
-        }
+            }, 400)
         
-        # Convert types for JSON serialization
-        for product in export_data['charts']['top_products']:
-            product['units_sold'] = int(product['units_sold'])
-            product['price'] = float(product['price'])
-            product['revenue'] = float(product['revenue'])
+        return _send_excel(excel_file, delete_after=True)
         
-        for trend in export_data['charts']['time_series']:
-            trend['date'] = str(trend['date'])
-            trend['units_sold'] = int(trend['units_sold'])
-            trend['revenue'] = float(trend['revenue'])
+    except Exception as e:
+        current_app.logger.error(f'Excel export error: {str(e)}')
+        return ojsonify({
+            'success': False,
+            'error': {'code': 'INTERNAL_ERROR', 'message': 'Failed to generate Excel report'}
+        }, 500)
+
+
+@exports_bp.route('/excel/jobs', methods=['POST'])
+@jwt_required
+def create_excel_job():
+    """
+    Start building an Excel report in the background.
+    
+    Request Body:
+        upload_id (str, optional): Filter by specific upload
+        include_charts (bool): Include chart data (default: True)
+    
+    Returns:
+        JSON: job_id to poll at /jobs/<job_id> (202 Accepted)
+    """
+    try:
+        data = request.get_json() or {}
+        user_id = g.current_user['user_id']
+        job_id = str(uuid.uuid4())
         
-        # Generate Excel file
-        excel_file = export_service.generate_excel_report(export_data, include_charts)
+        # Finished job files stay on disk while the job can still be polled
+        _sweep_export_files()
         
-        # Send file - use timestamp instead of user ID for security
-        from datetime import datetime
-        timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-        return send_file(
-            BytesIO(excel_file),
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=f'shopsense_report_{timestamp}.xlsx'
+        job_model = get_export_job_model()
+        job_model.create(user_id, job_id)
+        _export_pool.submit(
+            _run_excel_job,
+            job_model,
+            current_app.logger,
+            job_id,
+            get_sales_data_model(),
+            user_id,
+            data.get('upload_id'),
+            data.get('include_charts', True)
         )
         
+        return ojsonify({
+            'success': True,
+            'data': {'job_id': job_id, 'status': 'pending'}
+        }, 202)
+        
     except Exception as e:
-        current_app.logger.error(f'Excel export error: {str(e)}')
-        return jsonify({
+        current_app.logger.error(f'Excel job error: {str(e)}')
+        return ojsonify({
+            'success': False,
+            'error': {'code': 'INTERNAL_ERROR', 'message': 'Failed to start Excel report'}
+        }, 500)
+
+
+@exports_bp.route('/jobs/<job_id>', methods=['GET'])
+@jwt_required
+def get_export_job(job_id: str):
+    """
+    Poll a background export job.
+    
+    Returns:
+        JSON: Job status while pending, or File: Excel download when done
+    """
+    job = get_export_job_model().find(g.current_user['user_id'], job_id)
+    
+    # The file may also have been swept once the job aged out
+    if job is None or (
+        job['status'] == ExportJob.STATUS_COMPLETED and not os.path.exists(job['path'])
+    ):
+        return ojsonify({
+            'success': False,
+            'error': {'code': 'NOT_FOUND', 'message': 'Export job not found or expired'}
+        }, 404)
+    
+    if job['status'] == ExportJob.STATUS_PENDING:
+        return ojsonify({
+            'success': True,
+            'data': {'job_id': job_id, 'status': 'pending'}
+        }, 202)
+    
+    if job['status'] == ExportJob.STATUS_FAILED:
+        return ojsonify({
             'success': False,
             'error': {'code': 'INTERNAL_ERROR', 'message': 'Failed to generate Excel report'}
-        }), 500
+        }, 500)
+    
+    if job['status'] == ExportJob.STATUS_NO_DATA:
+        return ojsonify({
+            'success': False,
+            'error': {'code': 'NO_DATA', 'message': 'No data available for export'}
+        }, 400)
+    
+    return _send_excel(job['path'])
 
 
 @exports_bp.route('/csv', methods=['GET'])
@@ -132,45 +336,41 @@ def export_csv():
         upload_id = request.args.get('upload_id')
         
         sales_model = get_sales_data_model()
-        data = sales_model.find_by_upload_id(upload_id) if upload_id else sales_model.find_by_user(g.current_user['user_id'], limit=10000)
+        cursor = sales_model.find_for_export(g.current_user['user_id'], upload_id)
+        first = next(cursor, None)
         
-        if not data:
-            return jsonify({
+        if first is None:
+            return ojsonify({
                 'success': False,
                 'error': {'code': 'NO_DATA', 'message': 'No data available for export'}
-            }), 400
-        
-        # Convert to list of dicts
-        export_data = []
-        for record in data:
-            export_data.append({
-                'product_name': record.get('product_name', ''),
-                'date': str(record.get('date', '')),
-                'units_sold': record.get('units_sold', 0),
-                'price': record.get('price', 0),
-                'revenue': record.get('revenue', 0),
-                'category': record.get('category', 'Uncategorized')
-            })
-        
-        # Generate CSV
-        csv_file = export_service.generate_csv_export(export_data)
+            }, 400)
         
+        def rows():
+            for record in itertools.chain([first], cursor):
+                yield (
+                    record.get('product_name', ''),
+                    str(record.get('date', '')),
+                    record.get('units_sold', 0),
+                    record.get('price', 0),
+                    record.get('revenue', 0),
+                    record.get('category', 'Uncategorized')
+                )
+        
+        # Stream the CSV so memory stays flat and the first bytes go out immediately
         # Use timestamp instead of user ID for security
-        from datetime import datetime
         timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-        return send_file(
-            BytesIO(csv_file),
+        return Response(
+            stream_with_context(export_service.stream_csv(rows(), CSV_EXPORT_COLUMNS)),
             mimetype='text/csv',
-            as_attachment=True,
-            download_name=f'shopsense_data_{timestamp}.csv'
+            headers={'Content-Disposition': f'attachment; filename=shopsense_data_{timestamp}.csv'}
         )
         
     except Exception as e:
         current_app.logger.error(f'CSV export error: {str(e)}')
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': {'code': 'INTERNAL_ERROR', 'message': 'Failed to generate CSV export'}
-        }), 500
+        }, 500)
 
 
 @exports_bp.route('/products', methods=['GET'])
@@ -192,30 +392,24 @@ def export_products():
         product_df = sales_model.get_product_summary(g.current_user['user_id'], upload_id)
         
         if product_df.empty:
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'error': {'code': 'NO_DATA', 'message': 'No data available for export'}
-            }), 400
-        
-        # Convert to list of dicts
-        export_data = product_df.to_dict('records')
+            }, 400)
         
-        # Generate CSV
-        csv_file = export_service.generate_csv_export(export_data)
+        rows = product_df.itertuples(index=False, name=None)
         
         # Use timestamp instead of user ID for security
-        from datetime import datetime
         timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-        return send_file(
-            BytesIO(csv_file),
+        return Response(
+            stream_with_context(export_service.stream_csv(rows, list(product_df.columns))),
             mimetype='text/csv',
-            as_attachment=True,
-            download_name=f'shopsense_products_{timestamp}.csv'
+            headers={'Content-Disposition': f'attachment; filename=shopsense_products_{timestamp}.csv'}
         )
         
     except Exception as e:
         current_app.logger.error(f'Products export error: {str(e)}')
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': {'code': 'INTERNAL_ERROR', 'message': 'Failed to generate products export'}
-        }), 500
+        }, 500)
@@ -7,17 +7,29 @@ Handles CSV file uploads, validation, and data processing.
 
 import os
 import pandas as pd
-from flask import Blueprint, request, jsonify, current_app, g
+from flask import Blueprint, request, current_app, g
 from werkzeug.utils import secure_filename
 from datetime import datetime
 
 from models.upload import UploadSession
 from models.sales_data import SalesData
+from models.customer_segment import CustomerSegment
 from services.analytics_service import AnalyticsService
 from routes.auth import jwt_required
+from utils.helpers import ojsonify
+from utils.cache import invalidate_user_cache
+
+try:
+    import pyarrow  # noqa: F401 - enables pandas' multithreaded CSV engine
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
 
 uploads_bp = Blueprint('uploads', __name__)
 
+# Lowercase extensions accepted when the app config does not set its own
+DEFAULT_ALLOWED_EXTENSIONS = frozenset({'csv'})
+
 
 def get_upload_model():
     """Get upload session model."""
@@ -31,10 +43,71 @@ def get_sales_data_model():
     return SalesData(db)
 
 
+def get_customer_segment_model():
+    """Get customer segment model."""
+    db = current_app.config['MONGO_DB']
+    return CustomerSegment(db)
+
+
 def allowed_file(filename: str) -> bool:
     """Check if file extension is allowed."""
-    allowed_extensions = current_app.config.get('ALLOWED_EXTENSIONS', {'csv'})
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in allowed_extensions
+    allowed_extensions = current_app.config.get('ALLOWED_EXTENSIONS', DEFAULT_ALLOWED_EXTENSIONS)
+    _, dot, ext = filename.rpartition('.')
+    return bool(dot) and ext.lower() in allowed_extensions
+
+
+def store_dashboard_summary(
+    sales_model: SalesData,
+    upload_model: UploadSession,
+    user_id: str,
+    upload_id: str
+) -> pd.DataFrame:
+    """
+    Aggregate a new upload once and store the result on its session.
+    
+    Dashboard requests scoped to the upload then read the stored summary
+    instead of re-aggregating its sales records.
+    
+    Returns:
+        pd.DataFrame: Product summary for the upload.
+    """
+    summary = sales_model.get_dashboard_payload(user_id, upload_id, include_products=True)
+    upload_model.set_dashboard_summary(upload_id, summary)
+    return pd.DataFrame(
+        summary['products'], columns=['product_name', 'units_sold', 'price', 'revenue']
+    )
+
+
+def _file_size(file) -> int:
+    """
+    Size of an uploaded file in bytes, leaving the pointer at the start.
+    
+    Uses the part's Content-Length header when the client sent one; the
+    request's own content_length covers the whole multipart body, so it is
+    not used. Otherwise seeks the spooled stream without reading it.
+    """
+    if file.content_length:
+        return file.content_length
+    stream = file.stream
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    return size
+
+
+def read_csv_upload(file) -> pd.DataFrame:
+    """
+    Parse an uploaded CSV file.
+    
+    Uses the multithreaded pyarrow engine when available and falls back to
+    the default parser for files it rejects.
+    """
+    if PYARROW_AVAILABLE:
+        try:
+            return pd.read_csv(file.stream, engine='pyarrow')
+        except Exception:
+            file.stream.seek(0)
+    return pd.read_csv(file.stream)
 
 
 def validate_csv_structure(df: pd.DataFrame) -> tuple:
@@ -79,24 +152,24 @@ def upload_file():
     try:
         # Check if file is present
         if 'file' not in request.files:
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'error': {'code': 'NO_FILE', 'message': 'No file provided'}
-            }), 400
+            }, 400)
         
         file = request.files['file']
         
         if file.filename == '':
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'error': {'code': 'EMPTY_FILENAME', 'message': 'No file selected'}
-            }), 400
+            }, 400)
         
         if not allowed_file(file.filename):
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'error': {'code': 'INVALID_TYPE', 'message': 'Only CSV files are allowed'}
-            }), 400
+            }, 400)
         
         # Create upload session
         upload_model = get_upload_model()
@@ -104,25 +177,22 @@ def upload_file():
             user_id=g.current_user['user_id'],
             filename=secure_filename(file.filename),
             file_type='csv',
-            file_size=len(file.read())
+            file_size=_file_size(file)
         )
         
-        # Reset file pointer
-        file.seek(0)
-        
         # Read and validate CSV
         try:
-            df = pd.read_csv(file)
+            df = read_csv_upload(file)
         except Exception as e:
             upload_model.update_status(
                 upload_session['upload_id'],
                 UploadSession.STATUS_FAILED,
                 error_message=f'Failed to read CSV: {str(e)}'
             )
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'error': {'code': 'PARSE_ERROR', 'message': f'Failed to read CSV: {str(e)}'}
-            }), 400
+            }, 400)
         
         # Validate structure
         is_valid, error_message = validate_csv_structure(df)
@@ -132,17 +202,18 @@ def upload_file():
                 UploadSession.STATUS_FAILED,
                 error_message=error_message
             )
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'error': {'code': 'VALIDATION_ERROR', 'message': error_message}
-            }), 400
+            }, 400)
         
         # Clean data
         df = df.dropna(subset=['product_name', 'date', 'units_sold', 'price'])
         df['date'] = pd.to_datetime(df['date'], errors='coerce')
         df = df.dropna(subset=['date']) # Remove rows with invalid dates
-        df['units_sold'] = pd.to_numeric(df['units_sold'], errors='coerce').fillna(0).astype(int)
-        df['price'] = pd.to_numeric(df['price'], errors='coerce').fillna(0)
+        # validate_csv_structure guarantees numeric units_sold/price and the dropna
+        # above removed missing values, so coercion reduces to an integer cast
+        df['units_sold'] = df['units_sold'].astype(int)
         
         if df.empty:
             upload_model.update_status(
@@ -150,24 +221,24 @@ def upload_file():
                 UploadSession.STATUS_FAILED,
                 error_message='No valid data rows after cleaning'
             )
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'error': {'code': 'NO_DATA', 'message': 'No valid data rows after cleaning'}
-            }), 400
+            }, 400)
         
         # Store sales data
         sales_model = get_sales_data_model()
-        data_records = df.to_dict('records')
-        inserted_count = sales_model.insert_many(
+        inserted_count = sales_model.insert_dataframe(
             user_id=g.current_user['user_id'],
             upload_id=upload_session['upload_id'],
-            data=data_records
+            df=df
         )
         
         # Generate initial analytics and chart data
         analytics_service = AnalyticsService()
-        product_df = sales_model.get_product_summary(g.current_user['user_id'], upload_session['upload_id'])
-        daily_df = sales_model.get_daily_sales(g.current_user['user_id'], upload_session['upload_id'])
+        product_df = store_dashboard_summary(
+            sales_model, upload_model, g.current_user['user_id'], upload_session['upload_id']
+        )
         
         analysis = analytics_service.analyze_product_performance(product_df)
         recommendations = analytics_service.generate_recommendations(analysis)
@@ -178,6 +249,10 @@ def upload_file():
         # Merge analysis with chart data
         analysis_with_charts = {**analysis, **chart_data}
         
+        # Dates are non-null here; the product summary already has one row per product
+        dates = df['date'].to_numpy()
+        products_count = len(product_df)
+        
         # Update session with chart data
         upload_model.update_row_count(upload_session['upload_id'], len(df))
         upload_model.update_status(
@@ -185,34 +260,38 @@ def upload_file():
             UploadSession.STATUS_COMPLETED,
             results={
                 'rows_processed': inserted_count,
-                'products': df['product_name'].nunique(),
+                'products': products_count,
                 'date_range': {
-                    'start': df['date'].min(),
-                    'end': df['date'].max()
+                    'start': pd.Timestamp(dates.min()),
+                    'end': pd.Timestamp(dates.max())
                 },
                 **chart_data  # Include chart data in results
             }
         )
+
+        # Analytics caches are keyed by data version; drop this process's stale entries early
+        invalidate_user_cache(g.current_user['user_id'])
+        get_customer_segment_model().delete_for_user(g.current_user['user_id'])
         
-        return jsonify({
+        return ojsonify({
             'success': True,
             'message': 'File uploaded and processed successfully',
             'data': {
                 'upload_id': upload_session['upload_id'],
                 'filename': upload_session['filename'],
                 'rows_processed': inserted_count,
-                'products_count': df['product_name'].nunique(),
+                'products_count': products_count,
                 'analysis': analysis_with_charts,
                 'recommendations': recommendations
             }
-        }), 201
+        }, 201)
         
     except Exception as e:
         current_app.logger.error(f'Upload error: {str(e)}')
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': {'code': 'INTERNAL_ERROR', 'message': f'Upload failed: {str(e)}'}
-        }), 500
+        }, 500)
 
 
 @uploads_bp.route('/manual', methods=['POST'])
@@ -227,17 +306,17 @@ def manual_entry():
     try:
         data = request.get_json()
         if not data or 'records' not in data:
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'error': {'code': 'INVALID_REQUEST', 'message': 'Records list is required'}
-            }), 400
+            }, 400)
         
         records = data['records']
         if not records:
-             return jsonify({
+             return ojsonify({
                 'success': False,
                 'error': {'code': 'NO_DATA', 'message': 'At least one record is required'}
-            }), 400
+            }, 400)
 
         # Create upload session
         upload_model = get_upload_model()
@@ -258,7 +337,9 @@ def manual_entry():
         
         # Generate initial analytics
         analytics_service = AnalyticsService()
-        product_df = sales_model.get_product_summary(g.current_user['user_id'], upload_session['upload_id'])
+        product_df = store_dashboard_summary(
+            sales_model, upload_model, g.current_user['user_id'], upload_session['upload_id']
+        )
         analysis = analytics_service.analyze_product_performance(product_df)
         chart_data = analytics_service._generate_chart_data(product_df)
         recommendations = analytics_service.generate_recommendations(analysis)
@@ -273,8 +354,10 @@ def manual_entry():
                 **chart_data
             }
         )
+        invalidate_user_cache(g.current_user['user_id'])
+        get_customer_segment_model().delete_for_user(g.current_user['user_id'])
         
-        return jsonify({
+        return ojsonify({
             'success': True,
             'message': 'Manual data processed successfully',
             'data': {
@@ -283,14 +366,14 @@ def manual_entry():
                 'analysis': {**analysis, **chart_data},
                 'recommendations': recommendations
             }
-        }), 201
+        }, 201)
         
     except Exception as e:
         current_app.logger.error(f'Manual entry error: {str(e)}')
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': {'code': 'INTERNAL_ERROR', 'message': f'Processing failed: {str(e)}'}
-        }), 500
+        }, 500)
 
 
 @uploads_bp.route('', methods=['GET'])
@@ -312,24 +395,21 @@ def list_uploads():
         
         upload_model = get_upload_model()
         
-        if status:
-            # Filter by status
-            uploads = upload_model.find_by_user(g.current_user['user_id'], limit)
-            uploads = [u for u in uploads if u.get('status') == status]
-        else:
-            uploads = upload_model.find_by_user(g.current_user['user_id'], limit)
+        uploads = upload_model.find_by_user(
+            g.current_user['user_id'], limit, include_results=False, status=status
+        )
         
-        return jsonify({
+        return ojsonify({
             'success': True,
             'data': uploads
         })
         
     except Exception as e:
         current_app.logger.error(f'List uploads error: {str(e)}')
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': {'code': 'INTERNAL_ERROR', 'message': 'Failed to list uploads'}
-        }), 500
+        }, 500)
 
 
 @uploads_bp.route('/<upload_id>', methods=['GET'])
@@ -349,29 +429,29 @@ def get_upload(upload_id: str):
         upload = upload_model.find_by_upload_id(upload_id)
         
         if not upload:
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'error': {'code': 'NOT_FOUND', 'message': 'Upload not found'}
-            }), 404
+            }, 404)
         
         # Verify ownership
         if str(upload['user_id']) != g.current_user['user_id']:
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'error': {'code': 'FORBIDDEN', 'message': 'Access denied'}
-            }), 403
+            }, 403)
         
-        return jsonify({
+        return ojsonify({
             'success': True,
             'data': upload
         })
         
     except Exception as e:
         current_app.logger.error(f'Get upload error: {str(e)}')
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': {'code': 'INTERNAL_ERROR', 'message': 'Failed to get upload'}
-        }), 500
+        }, 500)
 
 
 @uploads_bp.route('/<upload_id>', methods=['DELETE'])
@@ -393,35 +473,37 @@ def delete_upload(upload_id: str):
         upload = upload_model.find_by_upload_id(upload_id)
         
         if not upload:
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'error': {'code': 'NOT_FOUND', 'message': 'Upload not found'}
-            }), 404
+            }, 404)
         
         # Verify ownership
         if str(upload['user_id']) != g.current_user['user_id']:
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'error': {'code': 'FORBIDDEN', 'message': 'Access denied'}
-            }), 403
+            }, 403)
         
         # Delete sales data first
         sales_model.delete_by_upload_id(upload_id)
         
         # Delete upload session
         upload_model.delete(upload_id)
+        invalidate_user_cache(g.current_user['user_id'])
+        get_customer_segment_model().delete_for_user(g.current_user['user_id'], upload_id)
         
-        return jsonify({
+        return ojsonify({
             'success': True,
             'message': 'Upload deleted successfully'
         })
         
     except Exception as e:
         current_app.logger.error(f'Delete upload error: {str(e)}')
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': {'code': 'INTERNAL_ERROR', 'message': 'Failed to delete upload'}
-        }), 500
+        }, 500)
 
 
 @uploads_bp.route('/<upload_id>/data', methods=['GET'])
@@ -443,22 +525,22 @@ def get_upload_data(upload_id: str):
         # Verify upload exists and user has access
         upload = upload_model.find_by_upload_id(upload_id)
         if not upload or str(upload['user_id']) != g.current_user['user_id']:
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'error': {'code': 'NOT_FOUND', 'message': 'Upload not found'}
-            }), 404
+            }, 404)
         
         # Get data
         data = sales_model.find_by_upload_id(upload_id)
         
-        return jsonify({
+        return ojsonify({
             'success': True,
             'data': data
         })
         
     except Exception as e:
         current_app.logger.error(f'Get upload data error: {str(e)}')
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': {'code': 'INTERNAL_ERROR', 'message': 'Failed to get data'}
-        }), 500
+        }, 500)
@@ -9,14 +9,27 @@ and security utilities for the application.
 import os
 import secrets
 import logging
-from typing import Optional, List
+from typing import List
 from dotenv import load_dotenv
-from functools import wraps
+from werkzeug.utils import secure_filename
+from functools import wraps, lru_cache
+
+logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
 
-logger = logging.getLogger(__name__)
+
+def _parse_bool(value: str) -> bool:
+    return value.lower() == 'true'
+
+
+def _parse_list(value: str) -> List[str]:
+    return [item.strip() for item in value.split(',')]
+
+
+def _parse_extensions(value: str) -> frozenset:
+    return frozenset(ext.strip().lower() for ext in value.split(','))
 
 
 class SecurityConfig:
@@ -33,6 +46,9 @@ class SecurityConfig:
         'JWT_SECRET_KEY',
     ]
     
+    # Placeholder prefixes from .env.example that must be replaced
+    INSECURE_PREFIXES = ('CHANGE_THIS', 'REPLACE', 'YOUR_')
+    
     # Optional environment variables with defaults
     DEFAULTS = {
         'FLASK_ENV': 'development',
@@ -50,6 +66,31 @@ class SecurityConfig:
         'SESSION_COOKIE_SAMESITE': 'Lax',
     }
     
+    # attribute -> (default, parser) read by _load_config from the environment
+    # variable of the same name; a parser of None keeps the raw string
+    SETTINGS = {
+        'FLASK_ENV': (DEFAULTS['FLASK_ENV'], None),
+        'FLASK_DEBUG': (DEFAULTS['FLASK_DEBUG'], _parse_bool),
+        'SECRET_KEY': (None, None),
+        'JWT_SECRET_KEY': (None, None),
+        'MONGO_URI': (None, None),
+        'GEMINI_API_KEY': (None, None),
+        'JWT_ACCESS_TOKEN_EXPIRES': (DEFAULTS['JWT_ACCESS_TOKEN_EXPIRES'], int),
+        'JWT_REFRESH_TOKEN_EXPIRES': (DEFAULTS['JWT_REFRESH_TOKEN_EXPIRES'], int),
+        'MAX_UPLOAD_SIZE_MB': (DEFAULTS['MAX_UPLOAD_SIZE_MB'], int),
+        'UPLOAD_FOLDER': ('./uploads', None),
+        'ALLOWED_EXTENSIONS': ('csv', _parse_extensions),
+        'RATE_LIMIT_DEFAULT': (DEFAULTS['RATE_LIMIT_DEFAULT'], None),
+        'RATE_LIMIT_AUTH': (DEFAULTS['RATE_LIMIT_AUTH'], None),
+        'RATE_LIMIT_UPLOAD': (DEFAULTS['RATE_LIMIT_UPLOAD'], None),
+        'CORS_ORIGINS': (DEFAULTS['CORS_ORIGINS'], _parse_list),
+        'SESSION_COOKIE_SECURE': (DEFAULTS['SESSION_COOKIE_SECURE'], _parse_bool),
+        'SESSION_COOKIE_HTTPONLY': (DEFAULTS['SESSION_COOKIE_HTTPONLY'], _parse_bool),
+        'SESSION_COOKIE_SAMESITE': (DEFAULTS['SESSION_COOKIE_SAMESITE'], None),
+        'LOG_LEVEL': (DEFAULTS['LOG_LEVEL'], None),
+        'LOG_FILE': ('./logs/shopsense.log', None),
+    }
+    
     def __init__(self):
         """Initialize and validate security configuration."""
         self._validate_required_vars()
@@ -70,7 +111,7 @@ class SecurityConfig:
             
             if value is None:
                 missing_vars.append(var)
-            elif value.startswith('CHANGE_THIS') or value.startswith('REPLACE') or value.startswith('YOUR_'):
+            elif value.startswith(self.INSECURE_PREFIXES):
                 insecure_defaults.append(var)
         
         if missing_vars:
@@ -91,53 +132,24 @@ class SecurityConfig:
     
     def _load_config(self) -> None:
         """Load configuration from environment variables."""
-        # Application settings
-        self.FLASK_ENV = os.getenv('FLASK_ENV', self.DEFAULTS['FLASK_ENV'])
-        self.FLASK_DEBUG = os.getenv('FLASK_DEBUG', self.DEFAULTS['FLASK_DEBUG']).lower() == 'true'
-        
-        # Security keys
-        self.SECRET_KEY = os.getenv('SECRET_KEY')
-        self.JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY')
-        
-        # Database
-        self.MONGO_URI = os.getenv('MONGO_URI')
+        env = os.environ
+        for attribute, (default, parser) in self.SETTINGS.items():
+            value = env.get(attribute, default)
+            if parser is not None and value is not None:
+                value = parser(value)
+            setattr(self, attribute, value)
         
-        # Google Gemini AI
-        self.GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
-        
-        # JWT settings
-        self.JWT_ACCESS_TOKEN_EXPIRES = int(os.getenv('JWT_ACCESS_TOKEN_EXPIRES', self.DEFAULTS['JWT_ACCESS_TOKEN_EXPIRES']))
-        self.JWT_REFRESH_TOKEN_EXPIRES = int(os.getenv('JWT_REFRESH_TOKEN_EXPIRES', self.DEFAULTS['JWT_REFRESH_TOKEN_EXPIRES']))
-        
-        # Upload settings
-        self.MAX_UPLOAD_SIZE_MB = int(os.getenv('MAX_UPLOAD_SIZE_MB', self.DEFAULTS['MAX_UPLOAD_SIZE_MB']))
-        self.UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', './uploads')
-        self.ALLOWED_EXTENSIONS = set(os.getenv('ALLOWED_EXTENSIONS', 'csv').split(','))
-        
-        # Rate limiting
-        self.RATE_LIMIT_DEFAULT = os.getenv('RATE_LIMIT_DEFAULT', self.DEFAULTS['RATE_LIMIT_DEFAULT'])
-        self.RATE_LIMIT_AUTH = os.getenv('RATE_LIMIT_AUTH', self.DEFAULTS['RATE_LIMIT_AUTH'])
-        self.RATE_LIMIT_UPLOAD = os.getenv('RATE_LIMIT_UPLOAD', self.DEFAULTS['RATE_LIMIT_UPLOAD'])
-        
-        # CORS
-        self.CORS_ORIGINS = self._parse_cors_origins(os.getenv('CORS_ORIGINS', self.DEFAULTS['CORS_ORIGINS']))
-        
-        # Session settings
-        self.SESSION_COOKIE_SECURE = os.getenv('SESSION_COOKIE_SECURE', self.DEFAULTS['SESSION_COOKIE_SECURE']).lower() == 'true'
-        self.SESSION_COOKIE_HTTPONLY = os.getenv('SESSION_COOKIE_HTTPONLY', self.DEFAULTS['SESSION_COOKIE_HTTPONLY']).lower() == 'true'
-        self.SESSION_COOKIE_SAMESITE = os.getenv('SESSION_COOKIE_SAMESITE', self.DEFAULTS['SESSION_COOKIE_SAMESITE'])
-        
-        # Logging
-        self.LOG_LEVEL = os.getenv('LOG_LEVEL', self.DEFAULTS['LOG_LEVEL'])
-        self.LOG_FILE = os.getenv('LOG_FILE', './logs/shopsense.log')
+        # Environment checks used on hot paths are computed once
+        self.is_production = self.FLASK_ENV == 'production'
+        self.is_development = self.FLASK_ENV == 'development'
         
         # Validate production security settings
-        if self.FLASK_ENV == 'production':
+        if self.is_production:
             self._validate_production_security()
     
     def _parse_cors_origins(self, cors_string: str) -> List[str]:
         """Parse comma-separated CORS origins into a list."""
-        return [origin.strip() for origin in cors_string.split(',')]
+        return _parse_list(cors_string)
     
     def _validate_production_security(self) -> None:
         """
@@ -167,16 +179,6 @@ class SecurityConfig:
             logger.error(error_msg)
             raise EnvironmentError(error_msg)
     
-    @property
-    def is_production(self) -> bool:
-        """Check if running in production environment."""
-        return self.FLASK_ENV == 'production'
-    
-    @property
-    def is_development(self) -> bool:
-        """Check if running in development environment."""
-        return self.FLASK_ENV == 'development'
-    
     def get_flask_config(self) -> dict:
         """
         Get Flask application configuration dictionary.
@@ -271,32 +273,25 @@ def sanitize_filename(filename: str) -> str:
     Returns:
         str: Sanitized filename.
     """
-    from werkzeug.utils import secure_filename
     return secure_filename(filename)
 
 
-def validate_file_extension(filename: str, allowed_extensions: set) -> bool:
+def validate_file_extension(filename: str, allowed_extensions: frozenset) -> bool:
     """
     Validate that a file has an allowed extension.
     
     Args:
         filename: Name of the file to validate.
-        allowed_extensions: Set of allowed extensions.
+        allowed_extensions: Set of allowed lowercase extensions.
     
     Returns:
         bool: True if extension is allowed, False otherwise.
     """
-    if '.' not in filename:
-        return False
-    
-    ext = filename.rsplit('.', 1)[1].lower()
-    return ext in allowed_extensions
-
-
-# Create global config instance (lazy initialization)
-_config: Optional[SecurityConfig] = None
+    _, dot, ext = filename.rpartition('.')
+    return bool(dot) and ext.lower() in allowed_extensions
 
 
+@lru_cache(maxsize=1)
 def get_security_config() -> SecurityConfig:
     """
     Get or create the global security configuration instance.
@@ -304,10 +299,12 @@ def get_security_config() -> SecurityConfig:
     Returns:
         SecurityConfig: Global configuration instance.
     """
-    global _config
-    if _config is None:
-        _config = SecurityConfig()
-    return _config
+    return SecurityConfig()
+
+
+def reset_security_config() -> None:
+    """Drop the cached configuration so the next access re-reads the environment."""
+    get_security_config.cache_clear()
 
 
 # Convenience functions
@@ -1,10 +1,29 @@
 # ShopSense AI - Services Package
 """
 Services package containing business logic and external integrations.
+
+Service classes are imported on first access, so importing one service
+module does not load pandas or numpy for the others.
 """
 
-from .auth_service import AuthService
-from .analytics_service import AnalyticsService
-from .forecast_service import ForecastService
+import importlib
+
+_LAZY_EXPORTS = {
+    'AuthService': '.auth_service',
+    'AnalyticsService': '.analytics_service',
+    'ForecastService': '.forecast_service',
+}
+
+__all__ = list(_LAZY_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        value = getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
-__all__ = ['AuthService', 'AnalyticsService', 'ForecastService']
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -3,7 +3,7 @@
 Product Affinity Service - Market Basket Analysis
 
 This module implements product affinity analysis using:
-1. Apriori algorithm for frequent itemset mining
+1. FP-Growth (or Apriori) for frequent itemset mining
 2. Association rules for product relationships
 3. Affinity network generation for visualization
 
@@ -17,18 +17,32 @@ Example usage:
     network = service.build_affinity_network(rules, transactions)
 """
 
+import math
 import pandas as pd
 import numpy as np
-from mlxtend.frequent_patterns import apriori, association_rules, fpgrowth
+from scipy import sparse
 from typing import Dict, Any, List, Tuple, Optional
+from functools import lru_cache
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=4096)
+def _itemset_label(itemset: frozenset) -> str:
+    """Sorted, comma-joined item names; rules repeat the same itemsets"""
+    if len(itemset) == 1:
+        return str(next(iter(itemset)))
+    return ', '.join(sorted(map(str, itemset)))
+
+
 class AffinityService:
     """Product affinity and market basket analysis"""
     
+    # Node colors from low to high revenue share, split at 25/50/75%
+    COLOR_PALETTE = np.array(['#0066FF', '#FF00AA', '#7000FF', '#00F0FF'])
+    DEFAULT_COLOR = '#7000FF'
+    
     def __init__(self):
         """Initialize affinity service"""
         pass
@@ -48,27 +62,42 @@ class AffinityService:
             level: 'product' or 'category'
             
         Returns:
-            Binary basket matrix (customers x items)
+            Sparse boolean basket matrix (customers x items), sorted by
+            customer and item
             Example:
                          Wireless Headphones  Phone Case  Laptop
-                C001                      1           1       0
-                C002                      0           1       1
-                C003                      1           0       0
+                C001                   True        True   False
+                C002                  False        True    True
+                C003                   True       False   False
         """
         logger.info(f"Creating basket matrix at {level} level")
         
+        if transactions_df.empty:
+            return pd.DataFrame()
+        
         if level == 'product':
             group_col = 'product_name'
         else:  # category
             group_col = 'category'
         
-        # Group by customer and item, count purchases
-        basket = transactions_df.groupby(
-            ['customer_id', group_col]
-        ).size().unstack(fill_value=0)
-        
-        # Convert to binary (1 if purchased, 0 otherwise)
-        basket_binary = basket.applymap(lambda x: 1 if x > 0 else 0)
+        # Baskets are mostly empty, so store only the purchased (row, col) cells
+        customer_col = transactions_df['customer_id']
+        item_col = transactions_df[group_col]
+        present = (customer_col.notna() & item_col.notna()).to_numpy()
+        rows, customers = pd.factorize(customer_col[present], sort=True)
+        cols, items = pd.factorize(item_col[present], sort=True)
+        
+        # Repeat purchases collapse into one boolean cell on the integer codes
+        matrix = sparse.coo_matrix(
+            (np.ones(len(rows), dtype=bool), (rows, cols)),
+            shape=(len(customers), len(items))
+        ).tocsr().astype(np.uint8)
+        
+        basket_binary = pd.DataFrame.sparse.from_spmatrix(
+            matrix,
+            index=pd.Index(customers, name='customer_id'),
+            columns=pd.Index(items, name=group_col)
+        ).astype(pd.SparseDtype(bool, False))
         
         logger.info(
             f"Created basket matrix: {basket_binary.shape[0]} customers x "
@@ -81,7 +110,7 @@ class AffinityService:
         self,
         basket_df: pd.DataFrame,
         min_support: float = 0.05,
-        method: str = 'apriori',
+        method: str = 'fpgrowth',
         max_len: int = 2
     ) -> pd.DataFrame:
         """
@@ -90,7 +119,7 @@ class AffinityService:
         Args:
             basket_df: Binary basket matrix
             min_support: Minimum support threshold (default: 0.05 = 5%)
-            method: 'apriori' or 'fpgrowth'
+            method: 'fpgrowth' (default) or 'apriori'
             max_len: Maximum itemset size (default: 2 for pairs)
             
         Returns:
@@ -109,15 +138,35 @@ class AffinityService:
         )
         
         try:
-            if method == 'fpgrowth':
-                frequent_itemsets = fpgrowth(
+            if len(basket_df) and min_support > 0:
+                matrix = self._item_matrix(basket_df)
+                
+                # Items below min_support cannot appear in any frequent itemset
+                keep = np.diff(matrix.indptr) / len(basket_df) >= min_support
+                
+                # Singles and pairs come straight from item co-occurrence counts
+                if method != 'apriori' and max_len in (1, 2):
+                    frequent_itemsets = self._frequent_pairs(
+                        matrix[:, keep], basket_df.columns[keep], min_support, max_len
+                    )
+                    logger.info(f"Found {len(frequent_itemsets)} frequent itemsets")
+                    return frequent_itemsets
+                
+                basket_df = basket_df.loc[:, keep]
+            
+            # mlxtend is only needed once mining actually runs
+            from mlxtend.frequent_patterns import apriori, fpgrowth
+            
+            if method == 'apriori':
+                frequent_itemsets = apriori(
                     basket_df,
                     min_support=min_support,
                     use_colnames=True,
-                    max_len=max_len
+                    max_len=max_len,
+                    low_memory=True
                 )
-            else:  # apriori
-                frequent_itemsets = apriori(
+            else:  # fpgrowth, no candidate generation
+                frequent_itemsets = fpgrowth(
                     basket_df,
                     min_support=min_support,
                     use_colnames=True,
@@ -132,6 +181,43 @@ class AffinityService:
             # Return empty DataFrame with expected columns
             return pd.DataFrame(columns=['support', 'itemsets'])
     
+    def _item_matrix(self, basket_df: pd.DataFrame) -> sparse.csc_matrix:
+        """Basket as a boolean baskets x items matrix, without densifying sparse baskets"""
+        if all(isinstance(dtype, pd.SparseDtype) for dtype in basket_df.dtypes):
+            return (basket_df.sparse.to_coo() != 0).tocsc()
+        return sparse.csc_matrix(basket_df.to_numpy() != 0)
+    
+    def _frequent_pairs(
+        self,
+        matrix: sparse.csc_matrix,
+        items: pd.Index,
+        min_support: float,
+        max_len: int
+    ) -> pd.DataFrame:
+        """
+        Frequent itemsets of up to two items from a pruned basket matrix
+        
+        Same itemsets and supports as fpgrowth(max_len<=2): every column of
+        matrix is a frequent item, and a pair is frequent when its
+        co-occurrence count reaches ceil(min_support * baskets).
+        """
+        n_baskets = matrix.shape[0]
+        supports = (np.diff(matrix.indptr) / n_baskets).tolist()
+        itemsets = [frozenset([item]) for item in items]
+        
+        if max_len == 2 and len(items) > 1:
+            counts = matrix.astype(np.int64)
+            pairs = sparse.triu(counts.T @ counts, k=1).tocoo()
+            frequent = pairs.data >= math.ceil(min_support * n_baskets)
+            
+            supports.extend((pairs.data[frequent] / n_baskets).tolist())
+            itemsets.extend(
+                frozenset([items[i], items[j]])
+                for i, j in zip(pairs.row[frequent].tolist(), pairs.col[frequent].tolist())
+            )
+        
+        return pd.DataFrame({'support': supports, 'itemsets': itemsets})
+    
     def generate_association_rules(
         self,
         frequent_itemsets: pd.DataFrame,
@@ -172,6 +258,8 @@ class AffinityService:
         )
         
         try:
+            from mlxtend.frequent_patterns import association_rules
+            
             rules = association_rules(
                 frequent_itemsets,
                 metric=metric,
@@ -193,11 +281,25 @@ class AffinityService:
             logger.error(f"Error generating association rules: {e}")
             return pd.DataFrame()
     
+    def compute_product_stats(self, transactions_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Revenue and transaction count per product, for network nodes
+        
+        Returns:
+            DataFrame indexed by product_name with revenue and customer_id
+            (transaction count) columns
+        """
+        return transactions_df.groupby('product_name').agg({
+            'revenue': 'sum',
+            'customer_id': 'count'
+        })
+    
     def build_affinity_network(
         self,
         rules_df: pd.DataFrame,
         transactions_df: pd.DataFrame,
-        top_n: int = 50
+        top_n: int = 50,
+        product_stats: Optional[pd.DataFrame] = None
     ) -> Dict[str, Any]:
         """
         Build affinity network for visualization
@@ -206,6 +308,8 @@ class AffinityService:
             rules_df: Association rules DataFrame
             transactions_df: Transactions for product stats
             top_n: Number of top rules to include
+            product_stats: Precomputed compute_product_stats(transactions_df),
+                reused across calls on the same transactions
             
         Returns:
             Network data with nodes and links:
@@ -222,53 +326,59 @@ class AffinityService:
         
         # Get top rules
         top_rules = rules_df.head(top_n)
+        antecedents = top_rules['antecedents'].map(self._frozerset_to_string).tolist()
+        consequents = top_rules['consequents'].map(self._frozerset_to_string).tolist()
         
         # Build set of products in rules
-        products = set()
-        for _, rule in top_rules.iterrows():
-            products.add(self._frozerset_to_string(rule['antecedents']))
-            products.add(self._frozerset_to_string(rule['consequents']))
+        products = set(antecedents) | set(consequents)
         
         # Calculate product stats
-        product_stats = transactions_df.groupby('product_name').agg({
-            'revenue': 'sum',
-            'customer_id': 'count'
-        }).reset_index()
-        product_stats.columns = ['product', 'revenue', 'transactions']
+        if product_stats is None:
+            product_stats = self.compute_product_stats(transactions_df)
+        stats_map = product_stats.to_dict('index')
         
         # Get revenue range for color scaling
         max_revenue = product_stats['revenue'].max() if len(product_stats) > 0 else 1
         
         # Create nodes
+        products = list(products)
+        node_stats = [stats_map.get(product) for product in products]
+        revenues = np.array(
+            [stats['revenue'] if stats else 0 for stats in node_stats], dtype=np.float64
+        )
+        colors = self._get_colors_for_values(revenues, max_revenue)
+        
         nodes = []
-        for product in products:
-            stats = product_stats[product_stats['product'] == product]
-            
-            revenue = float(stats['revenue'].iloc[0]) if len(stats) > 0 else 0
-            transactions = int(stats['transactions'].iloc[0]) if len(stats) > 0 else 1
-            
+        for product, stats, color in zip(products, node_stats, colors):
             nodes.append({
                 'id': product,
                 'label': product,
                 'category': 'product',
-                'value': transactions,
-                'color': self._get_color_for_value(revenue, max_revenue)
+                'value': int(stats['customer_id']) if stats else 1,
+                'color': color
             })
         
         # Create links
-        links = []
-        for _, rule in top_rules.iterrows():
-            antecedent = self._frozerset_to_string(rule['antecedents'])
-            consequent = self._frozerset_to_string(rule['consequents'])
-            
-            links.append({
+        lift = top_rules['lift'].to_numpy(dtype=np.float64)
+        strength = np.minimum(lift / 5, 1.0)  # Normalize to 0-1
+        links = [
+            {
                 'source': antecedent,
                 'target': consequent,
-                'strength': min(float(rule['lift']) / 5, 1.0),  # Normalize to 0-1
-                'support': float(rule['support']),
-                'confidence': float(rule['confidence']),
-                'lift': float(rule['lift'])
-            })
+                'strength': link_strength,
+                'support': support,
+                'confidence': confidence,
+                'lift': link_lift
+            }
+            for antecedent, consequent, link_strength, support, confidence, link_lift in zip(
+                antecedents,
+                consequents,
+                strength.tolist(),
+                top_rules['support'].to_numpy(dtype=np.float64).tolist(),
+                top_rules['confidence'].to_numpy(dtype=np.float64).tolist(),
+                lift.tolist()
+            )
+        ]
         
         return {
             'nodes': nodes,
@@ -308,27 +418,28 @@ class AffinityService:
         
         logger.info(f"Suggesting bundles (min_lift={min_lift})")
         
-        bundles = []
-        
-        # Filter high-lift rules
-        high_lift_rules = rules_df[rules_df['lift'] >= min_lift]
+        # Keep the top high-lift rules before formatting any of them
+        high_lift_rules = rules_df[rules_df['lift'] >= min_lift].sort_values(
+            'lift', ascending=False, kind='stable'
+        ).head(max_bundles)
         
-        for _, rule in high_lift_rules.iterrows():
-            antecedent = self._frozerset_to_string(rule['antecedents'])
-            consequent = self._frozerset_to_string(rule['consequents'])
-            
-            bundles.append({
+        return [
+            {
                 'bundle_name': f"{antecedent} + {consequent}",
                 'products': [antecedent, consequent],
-                'affinity_score': float(rule['lift']),
-                'confidence': float(rule['confidence']),
-                'support': float(rule['support']),
-                'estimated_lift': f"{(float(rule['lift']) - 1) * 100:.0f}%"
-            })
-        
-        # Sort by affinity score and return top bundles
-        bundles.sort(key=lambda x: x['affinity_score'], reverse=True)
-        return bundles[:max_bundles]
+                'affinity_score': lift,
+                'confidence': confidence,
+                'support': support,
+                'estimated_lift': f"{(lift - 1) * 100:.0f}%"
+            }
+            for antecedent, consequent, lift, confidence, support in zip(
+                high_lift_rules['antecedents'].map(self._frozerset_to_string).tolist(),
+                high_lift_rules['consequents'].map(self._frozerset_to_string).tolist(),
+                high_lift_rules['lift'].to_numpy(dtype=np.float64).tolist(),
+                high_lift_rules['confidence'].to_numpy(dtype=np.float64).tolist(),
+                high_lift_rules['support'].to_numpy(dtype=np.float64).tolist()
+            )
+        ]
     
     def get_category_affinity(
         self,
@@ -371,28 +482,20 @@ class AffinityService:
     def _frozerset_to_string(self, itemset) -> str:
         """Convert frozenset to clean string"""
         if isinstance(itemset, frozenset):
-            return ', '.join(sorted([str(x) for x in itemset]))
+            return _itemset_label(itemset)
         return str(itemset)
     
-    def _get_color_for_value(
+    def _get_colors_for_values(
         self,
-        value: float,
+        values: np.ndarray,
         max_value: float
-    ) -> str:
-        """Get color based on value percentile"""
+    ) -> List[str]:
+        """Get colors based on each value's share of max_value"""
         if max_value == 0:
-            return '#7000FF'  # Default purple
-        
-        percentile = value / max_value
-        
-        if percentile > 0.75:
-            return '#00F0FF'  # Cyan - high value
-        elif percentile > 0.5:
-            return '#7000FF'  # Purple - medium
-        elif percentile > 0.25:
-            return '#FF00AA'  # Pink - low-medium
-        else:
-            return '#0066FF'  # Blue - low
+            return [self.DEFAULT_COLOR] * len(values)
+        
+        buckets = np.digitize(values / max_value, [0.25, 0.5, 0.75], right=True)
+        return self.COLOR_PALETTE[buckets].tolist()
 
 
 # Convenience function
@@ -7,10 +7,25 @@ Handles data analysis, insights generation, and reporting.
 
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 import json
 
+from utils.helpers import top_k_positions
+
+
+def _trend_stats(revenue: np.ndarray, day_of_week: np.ndarray):
+    """
+    Average growth, average revenue, volatility and weekday totals/counts.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        revenue_growth = revenue[1:] / revenue[:-1] - 1
+    avg_growth = np.nanmean(revenue_growth) if np.any(~np.isnan(revenue_growth)) else np.nan
+    volatility = revenue.std(ddof=1) if len(revenue) > 1 else np.nan
+    day_totals = np.bincount(day_of_week, weights=revenue, minlength=7)
+    day_counts = np.bincount(day_of_week, minlength=7)
+    return avg_growth, revenue.mean(), volatility, day_totals, day_counts
+
 
 class AnalyticsService:
     """
@@ -19,6 +34,19 @@ class AnalyticsService:
     Provides comprehensive analytics and insights generation.
     """
     
+    PERFORMANCE_LABELS = ('Low Performer', 'Medium Performer', 'High Performer')
+    # Bucket index -> label; index -1 (uncategorized) maps to None
+    _PERFORMANCE_CATEGORY_LOOKUP = np.array(PERFORMANCE_LABELS + (None,), dtype=object)
+    
+    # Chart palette: (fill, line) colors per key
+    CHART_COLORS = {
+        'cyan': ('rgba(6, 182, 212, 0.8)', 'rgba(6, 182, 212, 1)'),
+        'red': ('rgba(239, 68, 68, 0.8)', 'rgba(239, 68, 68, 1)'),
+        'amber': ('rgba(245, 158, 11, 0.8)', 'rgba(245, 158, 11, 1)'),
+        'green': ('rgba(16, 185, 129, 0.8)', 'rgba(16, 185, 129, 1)'),
+        'purple': ('rgba(168, 85, 247, 0.8)', 'rgba(168, 85, 247, 1)')
+    }
+    
     def __init__(self):
         """Initialize analytics service."""
         pass
@@ -36,32 +64,33 @@ class AnalyticsService:
         if df.empty:
             return self._empty_analysis()
         
+        # Read each column once and reduce on the NumPy arrays
+        units, price, revenue = self._column_arrays(df, ('units_sold', 'price', 'revenue'))
+        
         # Calculate metrics
         total_products = len(df)
-        total_revenue = df['revenue'].sum()
-        total_units = df['units_sold'].sum()
-        avg_price = df['price'].mean()
-        avg_units = df['units_sold'].mean()
-        
-        # Top and bottom performers
-        top_performer = df.loc[df['units_sold'].idxmax()]
-        bottom_performer = df.loc[df['units_sold'].idxmin()]
-        top_revenue = df.loc[df['revenue'].idxmax()]
-        
-        # Price segmentation
-        price_quartiles = df['price'].quantile([0.25, 0.5, 0.75])
-        
-        # Performance categories - handle edge case where all products have same units
-        try:
-            quantiles = df['units_sold'].quantile([0.33, 0.67])
-            df['performance_category'] = pd.cut(
-                df['units_sold'],
-                bins=[0, quantiles[0.33], quantiles[0.67], float('inf')],
-                labels=['Low Performer', 'Medium Performer', 'High Performer']
-            )
-        except (ValueError, KeyError):
-            # If quantiles cannot be computed, assign all to Medium
-            df['performance_category'] = 'Medium Performer'
+        total_revenue = np.nansum(revenue)
+        total_units = np.nansum(units)
+        avg_price = np.nanmean(price)
+        avg_units = np.nanmean(units)
+        
+        # Top and bottom performers, read from the arrays by position
+        names = df['product_name'].to_numpy()
+        top_units = np.nanargmax(units)
+        bottom_units = np.nanargmin(units)
+        top_revenue = np.nanargmax(revenue)
+        
+        # Price segmentation; Python round keeps exact half-cent rounding
+        low_price, medium_price, high_price = (
+            round(value, 2) for value in np.nanquantile(price, [0.25, 0.5, 0.75]).tolist()
+        )
+        
+        # Performance categories
+        buckets = self._performance_buckets(units)
+        if buckets is None:
+            performance_distribution = {'Medium Performer': total_products}
+        else:
+            performance_distribution = self._performance_distribution(buckets)
         
         return {
             'summary': {
@@ -73,28 +102,49 @@ class AnalyticsService:
             },
             'top_performers': {
                 'by_units': {
-                    'product_name': str(top_performer['product_name']),
-                    'units_sold': int(top_performer['units_sold']),
-                    'price': round(float(top_performer['price']), 2)
+                    'product_name': str(names[top_units]),
+                    'units_sold': int(units[top_units]),
+                    'price': round(float(price[top_units]), 2)
                 },
                 'by_revenue': {
-                    'product_name': str(top_revenue['product_name']),
-                    'revenue': round(float(top_revenue['revenue']), 2)
+                    'product_name': str(names[top_revenue]),
+                    'revenue': round(float(revenue[top_revenue]), 2)
                 }
             },
             'bottom_performers': {
-                'product_name': str(bottom_performer['product_name']),
-                'units_sold': int(bottom_performer['units_sold']),
-                'price': round(float(bottom_performer['price']), 2)
+                'product_name': str(names[bottom_units]),
+                'units_sold': int(units[bottom_units]),
+                'price': round(float(price[bottom_units]), 2)
             },
             'price_segmentation': {
-                'low_price_threshold': round(float(price_quartiles[0.25]), 2),
-                'medium_price_threshold': round(float(price_quartiles[0.5]), 2),
-                'high_price_threshold': round(float(price_quartiles[0.75]), 2)
+                'low_price_threshold': low_price,
+                'medium_price_threshold': medium_price,
+                'high_price_threshold': high_price
             },
-            'performance_distribution': df['performance_category'].value_counts().to_dict()
+            'performance_distribution': performance_distribution
         }
     
+    def categorize_performance(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Get the performance category of each product, using the same buckets
+        as the analysis' performance distribution.
+        
+        Args:
+            df: DataFrame with a units_sold column.
+        
+        Returns:
+            np.ndarray: Category label per row (object dtype), or None for
+            products outside every bucket (units <= 0 or missing).
+        """
+        if df.empty:
+            return np.empty(0, dtype=object)
+        
+        units, = self._column_arrays(df, ('units_sold',))
+        buckets = self._performance_buckets(units)
+        if buckets is None:
+            return np.full(len(units), 'Medium Performer', dtype=object)
+        return self._PERFORMANCE_CATEGORY_LOOKUP[buckets]
+    
     def analyze_trends(self, daily_df: pd.DataFrame) -> Dict[str, Any]:
         """
         Analyze sales trends over time.
@@ -108,37 +158,49 @@ class AnalyticsService:
         if daily_df.empty:
             return {'error': 'No data available for trend analysis'}
         
-        daily_df = daily_df.copy()
-        daily_df['date'] = pd.to_datetime(daily_df['date'])
-        daily_df = daily_df.sort_values('date')
+        dates = daily_df['date']
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            dates = pd.to_datetime(dates, format='ISO8601')
+        
+        revenue = daily_df['revenue'].to_numpy(dtype=np.float64)
+        epoch_days = dates.to_numpy(dtype='datetime64[D]').astype(np.int64)
         
-        # Calculate moving averages
-        daily_df['ma_7'] = daily_df['revenue'].rolling(window=7, min_periods=1).mean()
-        daily_df['ma_30'] = daily_df['revenue'].rolling(window=30, min_periods=1).mean()
+        # Put the two columns in date order without copying the frame;
+        # daily aggregations usually arrive sorted already
+        if not dates.is_monotonic_increasing:
+            order = np.argsort(dates.to_numpy())
+            revenue = revenue[order]
+            epoch_days = epoch_days[order]
         
-        # Calculate growth rate
-        daily_df['revenue_growth'] = daily_df['revenue'].pct_change()
-        avg_growth = daily_df['revenue_growth'].mean()
+        # Growth, volatility and weekday totals; 1970-01-01 was a Thursday (3)
+        day_of_week = (epoch_days + 3) % 7
+        avg_growth, avg_revenue, volatility, day_totals, day_counts = _trend_stats(
+            revenue, day_of_week
+        )
         
         # Identify trend direction
-        if len(daily_df) >= 7:
-            recent_week = daily_df.tail(7)['revenue'].mean()
-            previous_week = daily_df.iloc[-14:-7]['revenue'].mean() if len(daily_df) >= 14 else daily_df.head(7)['revenue'].mean()
+        if len(revenue) >= 7:
+            # The week before the last one, or the first week when there are fewer than 14 days
+            start = max(len(revenue) - 14, 0)
+            recent_week = revenue[-7:].mean()
+            previous_week = revenue[start:start + 7].mean()
             trend = 'increasing' if recent_week > previous_week else 'decreasing'
         else:
             trend = 'insufficient_data'
         
         # Seasonality detection (simplified)
-        daily_df['day_of_week'] = daily_df['date'].dt.dayofweek
-        weekly_pattern = daily_df.groupby('day_of_week')['revenue'].mean().to_dict()
+        days = np.flatnonzero(day_counts)
+        weekly_pattern = dict(zip(
+            days.tolist(), (day_totals[days] / day_counts[days]).tolist()
+        ))
         
         return {
             'trend_direction': trend,
             'avg_daily_growth': round(avg_growth * 100, 2) if pd.notna(avg_growth) else 0,
-            'avg_daily_revenue': round(daily_df['revenue'].mean(), 2),
+            'avg_daily_revenue': round(avg_revenue, 2),
             'peak_day': max(weekly_pattern, key=weekly_pattern.get) if weekly_pattern else None,
             'low_day': min(weekly_pattern, key=weekly_pattern.get) if weekly_pattern else None,
-            'volatility': round(daily_df['revenue'].std(), 2),
+            'volatility': round(volatility, 2) if len(revenue) > 1 else np.nan,
             'data_points': len(daily_df)
         }
     
@@ -152,21 +214,20 @@ class AnalyticsService:
         Returns:
             list: List of recommendations with priority and category.
         """
-        recommendations = []
-        
         if 'error' in analysis:
             return [{'priority': 'high', 'category': 'data', 'recommendation': 'Insufficient data for analysis'}]
         
-        summary = analysis.get('summary', {})
-        top = analysis.get('top_performers', {})
+        recommendations = []
+        by_units = analysis.get('top_performers', {}).get('by_units')
         bottom = analysis.get('bottom_performers', {})
+        total_revenue = analysis.get('summary', {}).get('total_revenue', 0)
         
         # Top performer recommendations
-        if top.get('by_units'):
+        if by_units:
             recommendations.append({
                 'priority': 'high',
                 'category': 'inventory',
-                'recommendation': f"Ensure adequate stock of {top['by_units']['product_name']} - your best seller with {top['by_units']['units_sold']:,} units sold"
+                'recommendation': f"Ensure adequate stock of {by_units['product_name']} - your best seller with {by_units['units_sold']:,} units sold"
             })
         
         # Bottom performer recommendations
@@ -178,15 +239,68 @@ class AnalyticsService:
             })
         
         # Revenue optimization
-        if summary.get('total_revenue', 0) > 0:
+        if total_revenue > 0:
             recommendations.append({
                 'priority': 'medium',
                 'category': 'growth',
-                'recommendation': f"Focus on converting medium performers to high performers to increase total revenue of ${summary['total_revenue']:,.2f}"
+                'recommendation': f"Focus on converting medium performers to high performers to increase total revenue of ${total_revenue:,.2f}"
             })
         
         return recommendations
     
+    def _column_arrays(self, df: pd.DataFrame, columns) -> List[np.ndarray]:
+        """
+        Contiguous float64 arrays for the given columns, read once each.
+        
+        Args:
+            df: Source DataFrame.
+            columns: Column names to extract.
+        
+        Returns:
+            list: One array per column, in the order given.
+        """
+        return [
+            np.ascontiguousarray(df[column].to_numpy(dtype=np.float64))
+            for column in columns
+        ]
+    
+    def _performance_buckets(self, units: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Assign each product a performance bucket, split at the 33rd and 67th
+        units percentiles.
+        
+        Args:
+            units: Units sold per product.
+        
+        Returns:
+            np.ndarray or None: Index into PERFORMANCE_LABELS per product, or -1
+            for products outside every bucket (units <= 0 or missing). None
+            when the bins collapse (e.g. all products have the same units).
+        """
+        low_units, high_units = np.nanquantile(units, [0.33, 0.67])
+        
+        if not 0 < low_units < high_units:
+            return None
+        
+        # Buckets are (0, low], (low, high], (high, inf)
+        buckets = np.searchsorted([low_units, high_units], units, side='left')
+        buckets[~(units > 0)] = -1
+        return buckets
+    
+    def _performance_distribution(self, buckets: np.ndarray) -> Dict[str, int]:
+        """
+        Count products per performance bucket.
+        
+        Args:
+            buckets: Bucket per product from _performance_buckets.
+        
+        Returns:
+            dict: Bucket label -> product count, largest bucket first.
+        """
+        counts = np.bincount(buckets[buckets >= 0], minlength=3).tolist()
+        order = sorted(range(3), key=lambda i: -counts[i])
+        return {self.PERFORMANCE_LABELS[i]: counts[i] for i in order}
+    
     def _empty_analysis(self) -> Dict[str, Any]:
         """Return empty analysis structure."""
         return {
@@ -203,76 +317,119 @@ class AnalyticsService:
             'performance_distribution': {}
         }
     
+    @staticmethod
+    def _chart_columns(
+        names: np.ndarray,
+        units: np.ndarray,
+        positions: np.ndarray
+    ) -> Tuple[List[Any], List[Any]]:
+        """Product names and units sold at the given row positions, as lists."""
+        return names[positions].tolist(), units[positions].tolist()
+    
+    def _bar_chart(
+        self,
+        x: List[Any],
+        y: List[Any],
+        x_col: str,
+        y_col: str,
+        title: str,
+        color: str = 'cyan'
+    ) -> Optional[Dict[str, Any]]:
+        """Plotly bar chart from pre-converted column lists."""
+        if not x:
+            return None
+        
+        fill, line = self.CHART_COLORS[color]
+        return {
+            'data': [{
+                'x': x,
+                'y': y,
+                'type': 'bar',
+                'marker': {
+                    'color': fill,
+                    'line': {
+                        'color': line,
+                        'width': 1
+                    }
+                }
+            }],
+            'layout': {
+                'title': title,
+                'xaxis': {'title': x_col.replace('_', ' ').title()},
+                'yaxis': {'title': y_col.replace('_', ' ').title()}
+            }
+        }
+    
+    def _scatter_chart(
+        self,
+        x: List[Any],
+        y: List[Any],
+        text: List[Any],
+        x_col: str,
+        y_col: str,
+        title: str,
+        color: str = 'purple'
+    ) -> Optional[Dict[str, Any]]:
+        """Plotly labelled scatter plot from pre-converted column lists."""
+        if not x:
+            return None
+        
+        return {
+            'data': [{
+                'x': x,
+                'y': y,
+                'mode': 'markers+text',
+                'text': text,
+                'textposition': 'top center',
+                'type': 'scatter',
+                'marker': {
+                    'size': 12,
+                    'color': self.CHART_COLORS[color][0],
+                    'opacity': 0.7
+                }
+            }],
+            'layout': {
+                'title': title,
+                'xaxis': {'title': x_col.replace('_', ' ').title()},
+                'yaxis': {'title': y_col.replace('_', ' ').title()}
+            }
+        }
+    
     def _generate_chart_data(self, df: pd.DataFrame) -> Dict[str, Any]:
         """Generate basic chart data for frontend."""
         if df.empty:
             return {}
         
+        names = df['product_name'].to_numpy()
+        units = df['units_sold'].to_numpy()
+        
         # Top 10 products by units sold
-        top_products = df.nlargest(10, 'units_sold')
+        top = top_k_positions(units, 10)
+        top_names, top_units = self._chart_columns(names, units, top)
         
         # Bottom 10 products by units sold
-        bottom_products = df.nsmallest(10, 'units_sold')
+        bottom_names, bottom_units = self._chart_columns(
+            names, units, top_k_positions(units, 10, largest=False)
+        )
         
         # High sales but high cost - use revenue/units as proxy for price if not present
-        high_cost_sales = df[df['price'] > df['price'].median()].nlargest(10, 'units_sold')
+        price = df['price'].to_numpy(dtype=np.float64)
+        above_median = price > np.nanmedian(price)
+        high_cost = np.flatnonzero(above_median)
+        high_cost_names, high_cost_units = self._chart_columns(
+            names, units, high_cost[top_k_positions(units[high_cost], 10)]
+        )
         
         # High sales but low cost
-        low_cost_sales = df[df['price'] <= df['price'].median()].nlargest(10, 'units_sold')
-
-        # Create chart data for Plotly
-        def create_bar_chart(data, x_col, y_col, title, color='rgba(6, 182, 212, 0.8)'):
-            if data.empty:
-                return None
-                
-            return {
-                'data': [{
-                    'x': data[x_col].tolist(),
-                    'y': data[y_col].tolist(),
-                    'type': 'bar',
-                    'marker': {
-                        'color': color,
-                        'line': {
-                            'color': color.replace('0.8', '1'),
-                            'width': 1
-                        }
-                    }
-                }],
-                'layout': {
-                    'title': title,
-                    'xaxis': {'title': x_col.replace('_', ' ').title()},
-                    'yaxis': {'title': y_col.replace('_', ' ').title()}
-                }
-            }
+        low_cost = np.flatnonzero(~above_median)
+        low_cost_names, low_cost_units = self._chart_columns(
+            names, units, low_cost[top_k_positions(units[low_cost], 10)]
+        )
 
-        def create_scatter_plot(data, x_col, y_col, title, color='rgba(168, 85, 247, 0.8)'):
-             if data.empty:
-                return None
-                
-             return {
-                'data': [{
-                    'x': data[x_col].tolist(),
-                    'y': data[y_col].tolist(),
-                    'mode': 'markers+text',
-                    'text': data['product_name'].tolist() if 'product_name' in data else None,
-                    'textposition': 'top center',
-                    'type': 'scatter',
-                    'marker': {
-                        'size': 12,
-                        'color': color,
-                        'opacity': 0.7
-                    }
-                }],
-                'layout': {
-                    'title': title,
-                    'xaxis': {'title': x_col.replace('_', ' ').title()},
-                    'yaxis': {'title': y_col.replace('_', ' ').title()}
-                }
-            }
-        
         # Simplified prediction (Prophet-style but just trend-based for now)
+        top_mean_units = units[top].mean()
         prediction_x = [f"Month {i+1}" for i in range(6)]
-        prediction_y = [int(top_products['units_sold'].mean() * (1 + 0.05 * i)) for i in range(6)]
+        prediction_y = (top_mean_units * (1 + 0.05 * np.arange(6))).astype(np.int64).tolist()
         
         prediction_graph = {
             'data': [{
@@ -292,19 +449,19 @@ class AnalyticsService:
         
         return {
             'most_selling': {
-                'graph': create_bar_chart(top_products, 'product_name', 'units_sold', 'Most Selling Products'),
+                'graph': self._bar_chart(top_names, top_units, 'product_name', 'units_sold', 'Most Selling Products'),
                 'note': f'Top 10 products by units sold'
             },
             'low_selling': {
-                'graph': create_bar_chart(bottom_products, 'product_name', 'units_sold', 'Low Selling Products', 'rgba(239, 68, 68, 0.8)'),
+                'graph': self._bar_chart(bottom_names, bottom_units, 'product_name', 'units_sold', 'Low Selling Products', 'red'),
                 'note': f'Bottom 10 products by units sold'
             },
             'high_cost_high_sales': {
-                'graph': create_bar_chart(high_cost_sales, 'product_name', 'units_sold', 'High Cost High Performers', 'rgba(245, 158, 11, 0.8)'),
+                'graph': self._bar_chart(high_cost_names, high_cost_units, 'product_name', 'units_sold', 'High Cost High Performers', 'amber'),
                 'note': 'Premium products with strong market demand'
             },
             'low_cost_high_sales': {
-                'graph': create_bar_chart(low_cost_sales, 'product_name', 'units_sold', 'Value Kings', 'rgba(16, 185, 129, 0.8)'),
+                'graph': self._bar_chart(low_cost_names, low_cost_units, 'product_name', 'units_sold', 'Value Kings', 'green'),
                 'note': 'High-volume low-cost items driving traffic'
             },
             'sales_prediction': {
@@ -312,7 +469,10 @@ class AnalyticsService:
                 'note': 'Advanced trend analysis predicting future demand based on historical velocity'
             },
             'product_report': {
-                'graph': create_scatter_plot(top_products, 'price', 'units_sold', 'Price vs Volume Velocity'),
+                'graph': self._scatter_chart(
+                    price[top].tolist(), top_units, top_names,
+                    'price', 'units_sold', 'Price vs Volume Velocity'
+                ),
                 'note': 'Visualizing the correlation between price points and sales volume'
             }
         }
@@ -6,12 +6,30 @@ Handles user authentication, token generation, and validation.
 """
 
 import jwt
-from datetime import datetime, timedelta
+from jwt.algorithms import get_default_algorithms
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
 from typing import Optional, Dict, Any, Tuple
 from functools import wraps
 from flask import request, jsonify, current_app, g
 
 
+# Decoded token claims shared by all AuthService instances in this process,
+# keyed by a digest of the token bound to the signing secret (raw tokens are
+# never stored). Entries live for at most VERIFY_CACHE_TTL seconds and never
+# past token expiry; the least recently used entry is evicted once full.
+VERIFY_CACHE_TTL = 15
+VERIFY_CACHE_MAX_SIZE = 10_000
+_verify_cache: 'OrderedDict[bytes, Tuple[Dict[str, Any], float]]' = OrderedDict()
+_verify_cache_lock = threading.Lock()
+
+# Longest bearer token accepted before any decoding is attempted
+MAX_TOKEN_BYTES = 8192
+
+
 class AuthService:
     """
     Authentication service for JWT-based auth.
@@ -32,6 +50,11 @@ class AuthService:
         self.access_token_expires = access_token_expires
         self.refresh_token_expires = refresh_token_expires
         self.algorithm = 'HS256'
+        # Reused encoder/decoder and HMAC-ready key, so calls skip per-call
+        # algorithm lookup and key preparation
+        self._jwt = jwt.PyJWT()
+        self._signing_key = get_default_algorithms()[self.algorithm].prepare_key(secret_key)
+        self._cache_key = hashlib.blake2b(secret_key.encode(), digest_size=32).digest()
     
     def generate_tokens(self, user: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -98,7 +121,7 @@ class AuthService:
         Returns:
             str: Encoded JWT token.
         """
-        now = datetime.utcnow()
+        now = int(time.time())
         payload = {
             'user_id': user_id,
             'username': username,
@@ -106,10 +129,10 @@ class AuthService:
             'role': role,
             'token_type': token_type,
             'iat': now,
-            'exp': now + timedelta(seconds=expires_in)
+            'exp': now + expires_in
         }
         
-        return jwt.encode(payload, self.secret_key, algorithm=self.algorithm)
+        return self._jwt.encode(payload, self._signing_key, algorithm=self.algorithm)
     
     def verify_token(self, token: str, token_type: str = 'access') -> Optional[Dict[str, Any]]:
         """
@@ -131,8 +154,9 @@ class AuthService:
                     current_app.logger.warning(f"Attempt to use blacklisted token: {token[:10]}...")
                     return None
 
-            # jwt.decode handles expiration (exp) and type (iat/nbf) validation internally
-            payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+            # jwt.decode validates expiry and requires exp/token_type; no
+            # separate datetime-based expiry check is needed afterwards
+            payload = self._decode_cached(token)
             
             # Verify token type explicitly from our payload structure
             if payload.get('token_type') != token_type:
@@ -151,6 +175,49 @@ class AuthService:
             current_app.logger.error(f"Token verification error: {str(e)}")
             return None
     
+    def _decode_cached(self, token: str) -> Dict[str, Any]:
+        """
+        Decode and verify a token, reusing recently verified claims.
+        
+        Args:
+            token: JWT token string.
+        
+        Returns:
+            dict: Decoded token payload.
+        
+        Raises:
+            jwt.InvalidTokenError: If the token fails verification.
+        """
+        now = time.time()
+        key = self._verify_cache_key(token)
+        with _verify_cache_lock:
+            entry = _verify_cache.get(key)
+            if entry is not None:
+                payload, cached_until = entry
+                if cached_until > now:
+                    _verify_cache.move_to_end(key)
+                    return dict(payload)
+                del _verify_cache[key]
+        
+        payload = self._jwt.decode(
+            token,
+            self._signing_key,
+            algorithms=[self.algorithm],
+            options={'require': ['exp', 'token_type']}
+        )
+        cached_until = min(now + VERIFY_CACHE_TTL, payload['exp'])
+        
+        with _verify_cache_lock:
+            _verify_cache[key] = (payload, cached_until)
+            if len(_verify_cache) > VERIFY_CACHE_MAX_SIZE:
+                _verify_cache.popitem(last=False)
+        
+        return dict(payload)
+    
+    def _verify_cache_key(self, token: str) -> bytes:
+        """Digest of a token, bound to the signing secret, used as its cache key."""
+        return hashlib.blake2b(token.encode(), digest_size=16, key=self._cache_key).digest()
+    
     def refresh_access_token(self, refresh_token: str) -> Optional[Dict[str, Any]]:
         """
         Generate new access token using refresh token.
@@ -189,9 +256,12 @@ class AuthService:
         Returns:
             bool: True if successful.
         """
+        with _verify_cache_lock:
+            _verify_cache.pop(self._verify_cache_key(token), None)
+        
         try:
             # Decode token to get expiration
-            payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm], options={"verify_exp": False})
+            payload = self._jwt.decode(token, self._signing_key, algorithms=[self.algorithm], options={"verify_exp": False})
             expires_at = datetime.fromtimestamp(payload['exp'])
             
             db = current_app.config.get('MONGO_DB')
@@ -245,16 +315,18 @@ def jwt_required(f):
                 }
             }), 401
         
-        # Verify token
-        auth_service = getattr(g, 'auth_service', None)
-        if not auth_service:
-            # Fallback: create service from app config
-            auth_service = AuthService(
-                secret_key=current_app.config['JWT_SECRET_KEY'],
-                access_token_expires=current_app.config.get('JWT_ACCESS_TOKEN_EXPIRES', 900),
-                refresh_token_expires=current_app.config.get('JWT_REFRESH_TOKEN_EXPIRES', 604800)
-            )
+        # Reject oversized or non-JWT-shaped tokens before decoding
+        if len(token) > MAX_TOKEN_BYTES or token.count('.') != 2:
+            return jsonify({
+                'success': False,
+                'error': {
+                    'code': 'TOKEN_INVALID',
+                    'message': 'Invalid or expired token'
+                }
+            }), 401
         
+        # Verify token
+        auth_service = getattr(g, 'auth_service', None) or current_app.extensions['auth_service']
         payload = auth_service.verify_token(token, token_type='access')
         
         if not payload:
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+Behavior Pipeline - Shared Analytics Stages
+
+Runs the shopper behavior stages (RFM, segmentation, basket analysis,
+association rules and sentiment) over one transactions DataFrame and keeps
+every stage output, so sibling endpoints reading the same upload share a
+single computation instead of repeating it.
+
+Example usage:
+    from services.behavior_pipeline import BehaviorPipeline
+
+    pipeline = BehaviorPipeline(transactions)
+    segmented_df, segment_mapping = pipeline.segments(n_clusters=4)
+    rules = pipeline.rules(min_confidence=0.3, min_lift=1.5)
+    artifacts = pipeline.run()
+"""
+
+import pandas as pd
+from dataclasses import dataclass
+from typing import Dict, Any, Callable, List, Tuple
+import threading
+import logging
+
+from services.segmentation_service import SegmentationService
+from services.affinity_service import AffinityService
+from services.sentiment_service import SentimentService
+from utils.cache import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_N_CLUSTERS = 4
+DEFAULT_MIN_SUPPORT = 0.05
+DEFAULT_MIN_CONFIDENCE = 0.3
+DEFAULT_MIN_LIFT = 1.5
+
+# Bump when stage outputs change shape so clients drop stale responses
+PIPELINE_VERSION = 1
+
+
+@dataclass
+class BehaviorArtifacts:
+    """Outputs of every behavior stage at the default parameters"""
+    rfm_df: pd.DataFrame
+    segmented_df: pd.DataFrame
+    segment_mapping: Dict[int, str]
+    basket: pd.DataFrame
+    itemsets: pd.DataFrame
+    rules: pd.DataFrame
+    sentiment_df: pd.DataFrame
+
+
+class BehaviorPipeline:
+    """Lazily computed, memoized behavior analytics stages for one dataset"""
+
+    # Transaction fields read by the stages (RFM, basket, network, sentiment)
+    COLUMNS = [
+        'customer_id', 'product_name', 'category', 'date', 'revenue', 'rating', 'review'
+    ]
+    REVIEW_COLUMN = 'review'
+
+    def __init__(self, transactions: pd.DataFrame):
+        """
+        Args:
+            transactions: Transactions DataFrame from SalesData.get_transactions
+        """
+        self.transactions = transactions
+        self.segmentation_service = SegmentationService()
+        self.affinity_service = AffinityService()
+        self.sentiment_service = SentimentService()
+        self._stages: Dict[Tuple, Any] = {}
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+
+    def _stage(self, key: Tuple, compute: Callable[[], Any]) -> Any:
+        """Return a memoized stage output, computing it once on first use"""
+        with self._lock:
+            if key in self._stages:
+                return self._stages[key]
+        return self._flight.do(key, lambda: self._compute_stage(key, compute))
+
+    def _compute_stage(self, key: Tuple, compute: Callable[[], Any]) -> Any:
+        """Compute and store a stage unless a previous flight already did"""
+        with self._lock:
+            if key in self._stages:
+                return self._stages[key]
+        result = compute()
+        with self._lock:
+            self._stages[key] = result
+        return result
+
+    def rfm(self) -> pd.DataFrame:
+        """RFM scores per customer"""
+        return self._stage(
+            ('rfm',),
+            lambda: self.segmentation_service.compute_rfm_scores(self.transactions)
+        )
+
+    def segments(
+        self,
+        n_clusters: int = DEFAULT_N_CLUSTERS
+    ) -> Tuple[pd.DataFrame, Dict[int, str]]:
+        """Segmented customers and segment mapping"""
+        return self._stage(
+            ('segments', n_clusters),
+            lambda: self.segmentation_service.segment_customers(
+                self.rfm(), n_clusters=n_clusters
+            )
+        )
+
+    def basket(self) -> pd.DataFrame:
+        """Customer x product basket matrix"""
+        return self._stage(
+            ('basket',),
+            lambda: self.affinity_service.create_basket_matrix(self.transactions)
+        )
+
+    def itemsets(self, min_support: float = DEFAULT_MIN_SUPPORT) -> pd.DataFrame:
+        """Frequent itemsets"""
+        return self._stage(
+            ('itemsets', min_support),
+            lambda: self.affinity_service.find_frequent_itemsets(
+                self.basket(), min_support=min_support
+            )
+        )
+
+    def candidate_rules(self, min_support: float = DEFAULT_MIN_SUPPORT) -> pd.DataFrame:
+        """Every association rule from the itemsets, sorted by lift"""
+        return self._stage(
+            ('candidate_rules', min_support),
+            lambda: self.affinity_service.generate_association_rules(
+                self.itemsets(min_support), min_confidence=0.0, min_lift=0.0
+            )
+        )
+
+    def rules(
+        self,
+        min_support: float = DEFAULT_MIN_SUPPORT,
+        min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+        min_lift: float = DEFAULT_MIN_LIFT
+    ) -> pd.DataFrame:
+        """Association rules, sorted by lift"""
+        return self._stage(
+            ('rules', min_support, min_confidence, min_lift),
+            lambda: self._filter_rules(
+                self.candidate_rules(min_support), min_confidence, min_lift
+            )
+        )
+
+    @staticmethod
+    def _filter_rules(
+        candidates: pd.DataFrame,
+        min_confidence: float,
+        min_lift: float
+    ) -> pd.DataFrame:
+        """Candidate rules meeting the confidence and lift thresholds"""
+        if candidates.empty:
+            return candidates
+        rules = candidates[
+            (candidates['confidence'] >= min_confidence) &
+            (candidates['lift'] >= min_lift)
+        ]
+        # Re-sort from generation order so equal-lift rules rank exactly as
+        # when generated at these thresholds directly
+        return rules.sort_index().sort_values('lift', ascending=False)
+
+    def product_stats(self) -> pd.DataFrame:
+        """Revenue and transaction count per product"""
+        return self._stage(
+            ('product_stats',),
+            lambda: self.affinity_service.compute_product_stats(self.transactions)
+        )
+
+    def sentiment(self) -> pd.DataFrame:
+        """Transactions with sentiment scores and labels"""
+        return self._stage(
+            ('sentiment',),
+            lambda: self.sentiment_service.calculate_sentiment_scores(self.transactions)
+        )
+
+    def keywords(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Positive and negative sentiment keywords"""
+        return self._stage(
+            ('keywords',),
+            lambda: self.sentiment_service.extract_keywords(
+                self.transactions, review_column=self.REVIEW_COLUMN
+            )
+        )
+
+    def summary_stats(self) -> Dict[str, int]:
+        """Customer, product and transaction counts"""
+        return self._stage(
+            ('summary_stats',),
+            lambda: {
+                'total_customers': len(self.rfm()),
+                'total_products': int(self.transactions['product_name'].nunique()),
+                'total_transactions': len(self.transactions)
+            }
+        )
+
+    def run(self) -> BehaviorArtifacts:
+        """
+        Compute every stage at the default parameters
+
+        Returns:
+            BehaviorArtifacts with all stage outputs
+        """
+        segmented_df, segment_mapping = self.segments()
+        return BehaviorArtifacts(
+            rfm_df=self.rfm(),
+            segmented_df=segmented_df,
+            segment_mapping=segment_mapping,
+            basket=self.basket(),
+            itemsets=self.itemsets(),
+            rules=self.rules(),
+            sentiment_df=self.sentiment()
+        )
@@ -6,7 +6,8 @@ Handles generation of PDF and Excel reports.
 """
 
 import io
-from typing import Dict, Any, Optional
+import csv
+from typing import Dict, Any, Optional, Iterable, Iterator, List
 from datetime import datetime
 
 
@@ -36,19 +37,45 @@ class ExportService:
         Returns:
             bytes: Excel file content.
         """
+        wb = self._build_excel_workbook(data, include_charts)
+        
+        # Save to bytes
+        output = io.BytesIO()
+        wb.save(output)
+        output.seek(0)
+        
+        return output.read()
+    
+    def save_excel_report(
+        self,
+        data: Dict[str, Any],
+        path: str,
+        include_charts: bool = True
+    ) -> str:
+        """
+        Write Excel report from analytics data to a file.
+        
+        Args:
+            data: Analytics data dictionary.
+            path: Destination file path.
+            include_charts: Whether to include chart data.
+        
+        Returns:
+            str: The destination path.
+        """
+        self._build_excel_workbook(data, include_charts).save(path)
+        return path
+    
+    def _build_excel_workbook(self, data: Dict[str, Any], include_charts: bool):
+        """Build the report workbook from analytics data."""
         try:
-            import pandas as pd
             from openpyxl import Workbook
             from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-            from openpyxl.utils import get_column_letter
         except ImportError:
             raise ImportError("Please install openpyxl: pip install openpyxl")
         
-        # Create workbook
-        wb = Workbook()
-        
-        # Remove default sheet
-        wb.remove(wb.active)
+        # Write-only workbook: rows are streamed out instead of kept as cells
+        wb = Workbook(write_only=True)
         
         # Styles
         header_font = Font(bold=True, color='FFFFFF', size=12)
@@ -60,111 +87,106 @@ class ExportService:
             top=Side(style='thin'),
             bottom=Side(style='thin')
         )
+        styles = (header_font, header_fill, header_alignment, thin_border)
         
         # ==========================================================================
         # Summary Sheet
         # ==========================================================================
-        ws_summary = wb.create_sheet('Summary')
-        ws_summary.append(['ShopSense AI - Analytics Report'])
-        ws_summary.append(['Generated:', datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')])
-        ws_summary.append([])
+        summary_rows = [
+            ['ShopSense AI - Analytics Report'],
+            ['Generated:', datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')],
+            []
+        ]
         
         # KPIs
         if 'kpis' in data:
             kpis = data['kpis']
-            ws_summary.append(['Key Metrics'])
-            ws_summary.append(['Metric', 'Value'])
-            
-            metrics = [
-                ('Total Revenue', f"${kpis.get('total_revenue', 0):,.2f}"),
-                ('Total Units', f"{kpis.get('total_units', 0):,}"),
-                ('Total Products', f"{kpis.get('total_products', 0):,}"),
-                ('Avg Order Value', f"${kpis.get('avg_order_value', 0):,.2f}"),
-                ('Avg Price', f"${kpis.get('avg_price', 0):,.2f}")
-            ]
-            
-            for metric in metrics:
-                ws_summary.append(metric)
+            summary_rows.append(['Key Metrics'])
+            summary_rows.append(['Metric', 'Value'])
+            summary_rows.extend([
+                ['Total Revenue', f"${kpis.get('total_revenue', 0):,.2f}"],
+                ['Total Units', f"{kpis.get('total_units', 0):,}"],
+                ['Total Products', f"{kpis.get('total_products', 0):,}"],
+                ['Avg Order Value', f"${kpis.get('avg_order_value', 0):,.2f}"],
+                ['Avg Price', f"${kpis.get('avg_price', 0):,.2f}"]
+            ])
         
-        ws_summary.append([])
+        summary_rows.append([])
         
         # Recommendations
         if 'analysis' in data and 'recommendations' in data['analysis']:
-            ws_summary.append(['Recommendations'])
-            ws_summary.append(['Priority', 'Category', 'Recommendation'])
+            summary_rows.append(['Recommendations'])
+            summary_rows.append(['Priority', 'Category', 'Recommendation'])
             
             for rec in data['analysis']['recommendations']:
-                ws_summary.append([
+                summary_rows.append([
                     rec.get('priority', '').upper(),
                     rec.get('category', ''),
                     rec.get('recommendation', '')
                 ])
         
-        # Format summary sheet
-        self._format_sheet(ws_summary, header_font, header_fill, header_alignment, thin_border)
+        self._write_sheet(wb, 'Summary', summary_rows, *styles)
         
         # ==========================================================================
         # Products Sheet
         # ==========================================================================
         if 'charts' in data and 'top_products' in data['charts']:
-            ws_products = wb.create_sheet('Products')
-            ws_products.append(['Product Performance'])
-            ws_products.append([])
-            ws_products.append(['Product Name', 'Units Sold', 'Price', 'Revenue'])
+            product_rows = [
+                ['Product Performance'],
+                [],
+                ['Product Name', 'Units Sold', 'Price', 'Revenue']
+            ]
             
             for product in data['charts']['top_products']:
-                ws_products.append([
+                product_rows.append([
                     product.get('product_name', ''),
                     product.get('units_sold', 0),
                     f"${product.get('price', 0):,.2f}",
                     f"${product.get('revenue', 0):,.2f}"
                 ])
             
-            self._format_sheet(ws_products, header_font, header_fill, header_alignment, thin_border)
+            self._write_sheet(wb, 'Products', product_rows, *styles)
         
         # ==========================================================================
         # Trends Sheet
         # ==========================================================================
         if 'charts' in data and 'time_series' in data['charts']:
-            ws_trends = wb.create_sheet('Trends')
-            ws_trends.append(['Sales Trends'])
-            ws_trends.append([])
-            ws_trends.append(['Date', 'Units Sold', 'Revenue'])
+            trend_rows = [
+                ['Sales Trends'],
+                [],
+                ['Date', 'Units Sold', 'Revenue']
+            ]
             
             for trend in data['charts']['time_series']:
-                ws_trends.append([
+                trend_rows.append([
                     trend.get('date', ''),
                     trend.get('units_sold', 0),
                     f"${trend.get('revenue', 0):,.2f}"
                 ])
             
-            self._format_sheet(ws_trends, header_font, header_fill, header_alignment, thin_border)
+            self._write_sheet(wb, 'Trends', trend_rows, *styles)
         
         # ==========================================================================
         # Forecast Sheet
         # ==========================================================================
         if 'charts' in data and 'forecast' in data['charts']:
-            ws_forecast = wb.create_sheet('Forecast')
-            ws_forecast.append(['Sales Forecast (30 Days)'])
-            ws_forecast.append([])
-            ws_forecast.append(['Date', 'Predicted Revenue', 'Lower Bound', 'Upper Bound'])
+            forecast_rows = [
+                ['Sales Forecast (30 Days)'],
+                [],
+                ['Date', 'Predicted Revenue', 'Lower Bound', 'Upper Bound']
+            ]
             
             for forecast in data['charts']['forecast']:
-                ws_forecast.append([
+                forecast_rows.append([
                     forecast.get('date', ''),
                     f"${forecast.get('predicted_revenue', 0):,.2f}",
                     f"${forecast.get('lower_bound', 0):,.2f}" if forecast.get('lower_bound') else 'N/A',
                     f"${forecast.get('upper_bound', 0):,.2f}" if forecast.get('upper_bound') else 'N/A'
                 ])
             
-            self._format_sheet(ws_forecast, header_font, header_fill, header_alignment, thin_border)
-        
-        # Save to bytes
-        output = io.BytesIO()
-        wb.save(output)
-        output.seek(0)
+            self._write_sheet(wb, 'Forecast', forecast_rows, *styles)
         
-        return output.read()
+        return wb
     
     def generate_csv_export(
         self,
@@ -193,40 +215,90 @@ class ExportService:
         
         return output.read()
     
-    def _format_sheet(self, ws, header_font, header_fill, header_alignment, thin_border):
+    def stream_csv(
+        self,
+        rows: Iterable[Iterable[Any]],
+        header: List[str],
+        chunk_rows: int = 1000
+    ) -> Iterator[str]:
+        """
+        Stream CSV text in chunks without building the whole file.
+        
+        Args:
+            rows: Iterable of row value sequences in header order.
+            header: Column names.
+            chunk_rows: Rows written per yielded chunk.
+        
+        Yields:
+            str: CSV text, starting with the header line.
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow(header)
+        
+        pending = 0
+        for row in rows:
+            writer.writerow(row)
+            pending += 1
+            if pending >= chunk_rows:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+                pending = 0
+        
+        yield buffer.getvalue()
+    
+    def _write_sheet(
+        self,
+        wb,
+        title: str,
+        rows: List[List[Any]],
+        header_font,
+        header_fill,
+        header_alignment,
+        thin_border
+    ) -> None:
         """
-        Apply formatting to worksheet.
+        Append a formatted worksheet to a write-only workbook.
+        
+        Write-only sheets cannot be revisited, so column widths are computed
+        from the rows up front and every cell is styled as it is written.
         
         Args:
-            ws: OpenPyXL worksheet.
+            wb: Write-only OpenPyXL workbook.
+            title: Sheet title.
+            rows: Sheet rows; the first row is styled as the header.
             header_font: Font style for headers.
             header_fill: Fill style for headers.
             header_alignment: Alignment for headers.
             thin_border: Border style for cells.
         """
-        # Format headers
-        for cell in ws[1]:
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-        
-        # Format data rows
-        for row in ws.iter_rows(min_row=2, max_row=ws.max_row, min_col=1, max_col=ws.max_column):
-            for cell in row:
-                cell.border = thin_border
-        
-        # Auto-adjust column widths
-        for column in ws.columns:
-            max_length = 0
-            column_letter = get_column_letter(column[0].column)
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.utils import get_column_letter
+        
+        ws = wb.create_sheet(title)
+        
+        # Pad rows to a rectangle so every column cell is styled
+        n_cols = max(len(row) for row in rows)
+        padded = [list(row) + [None] * (n_cols - len(row)) for row in rows]
+        
+        # Auto-adjust column widths (must be set before the first row)
+        for index, column in enumerate(zip(*padded), start=1):
+            max_length = max(len(str(value)) for value in column)
+            ws.column_dimensions[get_column_letter(index)].width = min(max_length + 2, 50)
+        
+        for row_index, row in enumerate(padded):
+            cells = []
+            for value in row:
+                cell = WriteOnlyCell(ws, value=value)
+                if row_index == 0:
+                    cell.font = header_font
+                    cell.fill = header_fill
+                    cell.alignment = header_alignment
+                else:
+                    cell.border = thin_border
+                cells.append(cell)
+            ws.append(cells)
 
 
 # Singleton instance
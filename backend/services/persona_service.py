@@ -19,7 +19,6 @@ import pandas as pd
 import numpy as np
 from typing import Dict, Any, List, Optional
 import logging
-import random
 
 logger = logging.getLogger(__name__)
 
@@ -58,8 +57,7 @@ class PersonaService:
         Args:
             random_seed: Random seed for reproducibility
         """
-        random.seed(random_seed)
-        np.random.seed(random_seed)
+        self.random_seed = random_seed
     
     def generate_personas(
         self,
@@ -81,6 +79,8 @@ class PersonaService:
         logger.info(f"Generating personas for {len(segment_mapping)} segments")
         
         personas = []
+        # Seeded per call so names are reproducible and instances can be shared
+        rng = np.random.RandomState(self.random_seed)
         
         for segment_id, segment_name in segment_mapping.items():
             segment_customers = segmented_customers[
@@ -100,7 +100,8 @@ class PersonaService:
                 segment_id=segment_id,
                 segment_name=segment_name,
                 demo_data=demo_data,
-                rfm_data=segment_customers
+                rfm_data=segment_customers,
+                rng=rng
             )
             
             personas.append(persona)
@@ -116,7 +117,8 @@ class PersonaService:
         segment_id: int,
         segment_name: str,
         demo_data: Optional[pd.DataFrame],
-        rfm_data: pd.DataFrame
+        rfm_data: pd.DataFrame,
+        rng: Optional[np.random.RandomState] = None
     ) -> Dict[str, Any]:
         """Create a single persona"""
         
@@ -125,7 +127,7 @@ class PersonaService:
             segment_name, 
             ['Customer Chris', 'Shopper Sharon', 'Buyer Bob']
         )
-        name = np.random.choice(names)
+        name = (rng or np.random).choice(names)
         
         # Calculate demographics
         if demo_data is not None and not demo_data.empty:
@@ -18,7 +18,7 @@ Example usage:
 
 import pandas as pd
 import numpy as np
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
 from sklearn.preprocessing import StandardScaler
 from typing import Dict, Any, List, Tuple, Optional
 from datetime import datetime, timedelta
@@ -26,6 +26,48 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, cache=True)
+    def _rfm_reduce(starts, ends, dates, amounts):
+        """
+        Per-customer last purchase, spend and purchase count
+
+        Rows must be sorted by customer; customer i owns rows starts[i]:ends[i].
+        Spend uses compensated summation and skips NaN, matching pandas sum.
+        """
+        n = starts.shape[0]
+        last = np.empty(n, np.int64)
+        total = np.zeros(n, np.float64)
+        count = np.zeros(n, np.int64)
+
+        for i in prange(n):
+            latest = np.iinfo(np.int64).min
+            acc = 0.0
+            comp = 0.0
+            valid = 0
+            for j in range(starts[i], ends[i]):
+                if dates[j] > latest:
+                    latest = dates[j]
+                amount = amounts[j]
+                if not np.isnan(amount):
+                    y = amount - comp
+                    t = acc + y
+                    comp = t - acc - y
+                    acc = t
+                    valid += 1
+            last[i] = latest
+            total[i] = acc
+            count[i] = valid
+
+        return last, total, count
+
 
 class SegmentationService:
     """Customer segmentation using RFM and clustering"""
@@ -42,6 +84,12 @@ class SegmentationService:
         'lost': 'Lost Customers'
     }
     
+    # Above this many customers, cluster with MiniBatchKMeans instead of full KMeans
+    MINIBATCH_THRESHOLD = 10_000
+    
+    # Below this many transactions the Numba RFM kernel is not worth dispatching
+    NUMBA_MIN_ROWS = 100_000
+    
     def __init__(self, random_state: int = 42):
         """
         Initialize segmentation service
@@ -50,7 +98,6 @@ class SegmentationService:
             random_state: Random seed for reproducibility
         """
         self.random_state = random_state
-        self.scaler = StandardScaler()
     
     def compute_rfm_scores(
         self,
@@ -87,14 +134,7 @@ class SegmentationService:
             transactions_df['date'] = pd.to_datetime(transactions_df['date'])
 
         # Aggregate by customer
-        rfm = transactions_df.groupby('customer_id').agg({
-            'date': lambda x: (reference_date - x.max()).days,
-            'revenue': ['sum', 'count']
-        })
-
-        # Flatten column names
-        rfm.columns = ['recency', 'monetary', 'frequency']
-        rfm = rfm.reset_index()
+        rfm = self._aggregate_rfm(transactions_df, reference_date)
 
         # Calculate RFM quintile scores (1-5)
         # For recency, lower is better (recent customers are more valuable)
@@ -130,6 +170,54 @@ class SegmentationService:
         logger.info(f"Computed RFM scores for {len(rfm)} customers")
         return rfm
     
+    def _aggregate_rfm(
+        self,
+        transactions_df: pd.DataFrame,
+        reference_date: datetime
+    ) -> pd.DataFrame:
+        """
+        Reduce transactions to recency, monetary and frequency per customer
+
+        Args:
+            transactions_df: Transactions with a datetime 'date' column
+            reference_date: Date for recency calculation
+
+        Returns:
+            DataFrame with customer_id, recency, monetary, frequency,
+            sorted by customer_id
+        """
+        if NUMBA_AVAILABLE and len(transactions_df) >= self.NUMBA_MIN_ROWS:
+            codes, customers = pd.factorize(transactions_df['customer_id'], sort=True)
+            order = np.argsort(codes, kind='stable')
+            order = order[codes[order] >= 0]
+            codes = codes[order]
+
+            dates = transactions_df['date'].to_numpy(dtype='datetime64[ns]')[order]
+            revenue = transactions_df['revenue']
+            amounts = revenue.to_numpy(dtype=np.float64)[order]
+
+            bounds = np.searchsorted(codes, np.arange(len(customers) + 1))
+            last, monetary, frequency = _rfm_reduce(
+                bounds[:-1], bounds[1:], dates.view(np.int64), amounts
+            )
+            last = pd.DatetimeIndex(last.view('datetime64[ns]'))
+            if pd.api.types.is_integer_dtype(revenue.dtype):
+                monetary = monetary.astype(revenue.dtype)
+        else:
+            grouped = transactions_df.groupby('customer_id')
+            last_series = grouped['date'].max()
+            customers = last_series.index
+            last = pd.DatetimeIndex(last_series)
+            monetary = grouped['revenue'].sum().to_numpy()
+            frequency = grouped['revenue'].count().to_numpy()
+
+        return pd.DataFrame({
+            'customer_id': np.asarray(customers),
+            'recency': (pd.Timestamp(reference_date) - last).days.to_numpy(),
+            'monetary': monetary,
+            'frequency': frequency
+        })
+    
     def segment_customers(
         self,
         rfm_df: pd.DataFrame,
@@ -156,16 +244,24 @@ class SegmentationService:
         features = features.replace([np.inf, -np.inf], np.nan)
         features = features.fillna(features.median())
         
-        # Scale features
-        scaled_features = self.scaler.fit_transform(features)
+        # Scale features (fresh scaler per call so the service stays stateless)
+        scaled_features = StandardScaler().fit_transform(features)
         
-        # Apply K-Means
-        kmeans = KMeans(
-            n_clusters=n_clusters,
-            random_state=self.random_state,
-            n_init=10,
-            max_iter=300
-        )
+        # Apply K-Means (mini-batch for large customer bases)
+        if len(features) > self.MINIBATCH_THRESHOLD:
+            kmeans = MiniBatchKMeans(
+                n_clusters=n_clusters,
+                random_state=self.random_state,
+                batch_size=1024,
+                n_init=3
+            )
+        else:
+            kmeans = KMeans(
+                n_clusters=n_clusters,
+                random_state=self.random_state,
+                n_init=10,
+                max_iter=300
+            )
         rfm_df = rfm_df.copy()
         rfm_df['segment_id'] = kmeans.fit_predict(scaled_features)
         
@@ -6,7 +6,7 @@ This module implements sentiment analysis using:
 1. Rating-based sentiment scoring
 2. Distribution analysis
 3. Category-level sentiment breakdown
-4. Keyword extraction (future NLP enhancement)
+4. Keyword extraction (lexicon scan over review text)
 
 Example usage:
     from services.sentiment_service import SentimentService
@@ -22,9 +22,42 @@ import numpy as np
 from typing import Dict, Any, List, Optional
 from collections import Counter
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 
+# Keyword lexicons with their sentiment weight
+POSITIVE_LEXICON = {
+    'quality': 0.85,
+    'comfortable': 0.92,
+    'fast shipping': 0.88,
+    'great value': 0.87,
+    'highly recommend': 0.95,
+    'perfect fit': 0.90,
+    'excellent': 0.93,
+    'love it': 0.96
+}
+
+NEGATIVE_LEXICON = {
+    'expensive': -0.65,
+    'sizing issues': -0.72,
+    'slow delivery': -0.68,
+    'poor quality': -0.85,
+    'disappointed': -0.78,
+    'not as described': -0.80
+}
+
+
+def _compile_lexicon(words: List[str]) -> re.Pattern:
+    """Compile a lexicon into one alternation, longest phrases first"""
+    alternatives = sorted((re.escape(w) for w in words), key=len, reverse=True)
+    return re.compile(r'\b(?:' + '|'.join(alternatives) + r')\b')
+
+
+# One pass over the text finds every lexicon hit; 'poor quality' is matched
+# by the combined pattern before the shorter 'quality' can claim it
+_LEXICON_PATTERN = _compile_lexicon(list(POSITIVE_LEXICON) + list(NEGATIVE_LEXICON))
+
 
 class SentimentService:
     """Sentiment analysis for reviews and ratings"""
@@ -318,7 +351,7 @@ class SentimentService:
         """
         logger.info("Extracting sentiment keywords")
         
-        # If review text is available, use NLP (future enhancement)
+        # If review text is available, count keywords in it
         if review_column and review_column in transactions_df.columns:
             return self._extract_keywords_from_text(
                 transactions_df, review_column
@@ -376,12 +409,32 @@ class SentimentService:
         review_column: str
     ) -> Dict[str, List[Dict[str, Any]]]:
         """
-        Extract keywords from review text using NLP
-        Future enhancement with TextBlob or similar
+        Count lexicon keywords in review text
+
+        All reviews are joined into one lowercase buffer and scanned once
+        with a precompiled pattern, instead of tokenizing row by row.
+        Falls back to the rating-based keywords when no text matches.
         """
-        # Placeholder for future NLP implementation
-        logger.info("Text-based keyword extraction not yet implemented")
-        return self.extract_keywords(df)
+        reviews = df[review_column].dropna()
+        buffer = '\n'.join(reviews.astype(str).tolist()).lower()
+        counts = Counter(_LEXICON_PATTERN.findall(buffer))
+        
+        if not counts:
+            logger.info("No lexicon keywords found in review text")
+            return self.extract_keywords(df)
+        
+        def ranked(lexicon: Dict[str, float]) -> List[Dict[str, Any]]:
+            hits = [
+                {'word': word, 'count': counts[word], 'sentiment': weight}
+                for word, weight in lexicon.items()
+                if counts[word] > 0
+            ]
+            return sorted(hits, key=lambda k: k['count'], reverse=True)
+        
+        return {
+            'positive_keywords': ranked(POSITIVE_LEXICON),
+            'negative_keywords': ranked(NEGATIVE_LEXICON)
+        }
     
     def get_sentiment_gauge_data(
         self,
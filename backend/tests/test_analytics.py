@@ -46,6 +46,24 @@ class TestAnalyticsService:
         assert result['summary']['total_units'] == 500
         assert 'top_performers' in result
         assert 'bottom_performers' in result
+
+    def test_analyze_product_performance_keeps_input(self, analytics_service, sample_product_df):
+        """Test product performance analysis leaves the caller's frame untouched."""
+        original = sample_product_df.copy()
+        result = analytics_service.analyze_product_performance(sample_product_df)
+
+        pd.testing.assert_frame_equal(sample_product_df, original)
+        assert sum(result['performance_distribution'].values()) == 4
+
+    def test_categorize_performance(self, analytics_service, sample_product_df):
+        """Test performance categories are returned per product row."""
+        categories = analytics_service.categorize_performance(sample_product_df)
+        result = analytics_service.analyze_product_performance(sample_product_df)
+        
+        assert 'performance_categories' not in result
+        assert categories.tolist() == [
+            'Medium Performer', 'High Performer', 'Medium Performer', 'Low Performer'
+        ]
     
     def test_analyze_product_performance_empty(self, analytics_service):
         """Test product performance analysis with empty data."""
@@ -64,6 +82,17 @@ class TestAnalyticsService:
         assert 'data_points' in result
         assert result['data_points'] == 30
     
+    def test_analyze_trends_average_revenue(self, analytics_service):
+        """Test average daily revenue matches a plain mean, rounded to cents."""
+        daily_df = pd.DataFrame({
+            'date': pd.date_range(start='2024-01-01', periods=2, freq='D'),
+            'units_sold': [0, 3],
+            'revenue': [0.0, 7.35]
+        })
+        result = analytics_service.analyze_trends(daily_df)
+        
+        assert result['avg_daily_revenue'] == round(np.array([0.0, 7.35]).mean(), 2) == 3.68
+    
     def test_analyze_trends_empty(self, analytics_service):
         """Test trend analysis with empty data."""
         empty_df = pd.DataFrame(columns=['date', 'units_sold', 'revenue'])
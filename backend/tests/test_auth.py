@@ -149,3 +149,49 @@ class TestAuthProtected:
         assert response.status_code == 401
         assert data['success'] is False
         assert 'TOKEN_INVALID' in data['error']['code']
+    
+    def test_get_current_user_oversized_token(self, client, db):
+        """Test getting current user with an oversized token."""
+        response = client.get(
+            '/api/v1/auth/me',
+            headers={'Authorization': 'Bearer ' + 'a.b.' + 'c' * 9000}
+        )
+        
+        data = response.get_json()
+        
+        assert response.status_code == 401
+        assert data['success'] is False
+        assert 'TOKEN_INVALID' in data['error']['code']
+
+
+class TestEmailValidation:
+    """Test the table-driven email validator."""
+    
+    @pytest.mark.parametrize('email', [
+        'user@example.com',
+        'first.last+tag@sub.example.org',
+        'a_b%c-d@my-host.io',
+    ])
+    def test_valid_emails(self, email):
+        """Test well-formed addresses are accepted."""
+        from routes.auth import validate_email
+        
+        assert validate_email(email) is True
+    
+    @pytest.mark.parametrize('email', [
+        '',
+        'not-an-email',
+        '@example.com',
+        'user@.com',
+        'user@example.c',
+        'user@example.c0m',
+        'user@@example.com',
+        'us er@example.com',
+        'usér@example.com',
+        'user@example.com\n',
+    ])
+    def test_invalid_emails(self, email):
+        """Test malformed addresses are rejected."""
+        from routes.auth import validate_email
+        
+        assert validate_email(email) is False
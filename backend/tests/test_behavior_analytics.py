@@ -28,6 +28,7 @@ from services.affinity_service import AffinityService
 from services.sentiment_service import SentimentService
 from services.persona_service import PersonaService
 from services.recommendation_service import RecommendationService
+from services.behavior_pipeline import BehaviorPipeline
 
 
 # =============================================================================
@@ -248,7 +249,15 @@ class TestAffinityService:
         
         assert basket is not None
         assert len(basket) > 0
-    
+
+    def test_create_basket_matrix_is_sparse(self, affinity_service, sample_transactions):
+        """Test basket cells are stored sparsely, one per purchased pair"""
+        basket = affinity_service.create_basket_matrix(sample_transactions)
+        pairs = sample_transactions[['customer_id', 'product_name']].drop_duplicates()
+
+        assert all(isinstance(dtype, pd.SparseDtype) for dtype in basket.dtypes)
+        assert basket.sparse.to_coo().nnz == len(pairs)
+
     def test_find_frequent_itemsets(self, affinity_service, sample_transactions):
         """Test frequent itemset mining"""
         basket = affinity_service.create_basket_matrix(sample_transactions)
@@ -374,6 +383,20 @@ class TestSentimentService:
         if len(with_reviews) > 0:
             keywords = sentiment_service.extract_keywords(with_reviews)
             assert keywords is not None
+    
+    def test_extract_keywords_counts_review_text(self, sentiment_service):
+        """Test keyword counts come from review text when a column is given"""
+        reviews = pd.DataFrame({'review': [
+            'Poor quality, very disappointed',
+            'Excellent quality! Love it',
+            None
+        ]})
+        keywords = sentiment_service.extract_keywords(reviews, review_column='review')
+        
+        positive = {k['word']: k['count'] for k in keywords['positive_keywords']}
+        negative = {k['word']: k['count'] for k in keywords['negative_keywords']}
+        assert positive == {'quality': 1, 'excellent': 1, 'love it': 1}
+        assert negative == {'poor quality': 1, 'disappointed': 1}
 
 
 # =============================================================================
@@ -662,6 +685,75 @@ class TestEdgeCases:
         assert rfm_df is not None
 
 
+# =============================================================================
+# TestBehaviorPipeline Tests
+# =============================================================================
+
+class TestBehaviorPipeline:
+    """Test BehaviorPipeline stage sharing"""
+    
+    def test_stages_are_memoized(self, sample_transactions):
+        """Test repeated stage calls reuse the first result"""
+        pipeline = BehaviorPipeline(sample_transactions)
+        
+        assert pipeline.basket() is pipeline.basket()
+        assert pipeline.itemsets() is pipeline.itemsets()
+        assert pipeline.rules() is pipeline.rules()
+    
+    def test_stage_params_are_keyed(self, sample_transactions):
+        """Test different parameters produce separate stage outputs"""
+        pipeline = BehaviorPipeline(sample_transactions)
+        
+        assert pipeline.itemsets(0.05) is not pipeline.itemsets(0.1)
+        assert pipeline.rules(min_lift=1.5) is not pipeline.rules(min_lift=2.0)
+
+    def test_rule_thresholds_share_candidates(self, sample_transactions):
+        """Test threshold variants filter one rule generation"""
+        pipeline = BehaviorPipeline(sample_transactions)
+        original = pipeline.affinity_service.generate_association_rules
+        calls = []
+
+        def counting_rules(*args, **kwargs):
+            calls.append(1)
+            return original(*args, **kwargs)
+
+        pipeline.affinity_service.generate_association_rules = counting_rules
+        rules = pipeline.rules(min_confidence=0.3, min_lift=1.5)
+        pipeline.rules(min_confidence=0.5, min_lift=2.0)
+
+        direct = original(pipeline.itemsets(), min_confidence=0.3, min_lift=1.5)
+        assert len(calls) == 1
+        assert rules.reset_index(drop=True).equals(direct.reset_index(drop=True))
+
+    def test_concurrent_calls_compute_once(self, sample_transactions):
+        """Test concurrent requests for a stage share one computation"""
+        import threading
+        import time
+        
+        pipeline = BehaviorPipeline(sample_transactions)
+        original = pipeline.affinity_service.create_basket_matrix
+        calls = []
+        
+        def slow_basket(*args, **kwargs):
+            calls.append(1)
+            time.sleep(0.1)
+            return original(*args, **kwargs)
+        
+        pipeline.affinity_service.create_basket_matrix = slow_basket
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(pipeline.basket()))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert len(calls) == 1
+        assert all(result is results[0] for result in results)
+
+
 # =============================================================================
 # Run Tests
 # =============================================================================
@@ -22,7 +22,7 @@ class TestSecurityConfig:
         
         # Clear cached config
         import security_config
-        security_config._config = None
+        security_config.reset_security_config()
         
         with pytest.raises(EnvironmentError):
             from security_config import get_security_config
@@ -42,7 +42,7 @@ class TestSecurityConfig:
         
         # Clear cached config
         import security_config
-        security_config._config = None
+        security_config.reset_security_config()
         
         with pytest.raises(EnvironmentError):
             from security_config import get_security_config
@@ -56,7 +56,7 @@ class TestSecurityConfig:
         
         # Clear cached config
         import security_config
-        security_config._config = None
+        security_config.reset_security_config()
         
         from security_config import get_security_config
         config = get_security_config()
@@ -75,7 +75,7 @@ class TestSecurityConfig:
         
         # Clear cached config
         import security_config
-        security_config._config = None
+        security_config.reset_security_config()
         
         with pytest.raises(EnvironmentError):
             from security_config import get_security_config
@@ -4,6 +4,6 @@ Utilities package containing helper functions.
 """
 
 from .validators import validate_csv_format, validate_file_upload
-from .helpers import generate_upload_id, format_response
+from .helpers import generate_upload_id, format_response, ojsonify
 
-__all__ = ['validate_csv_format', 'validate_file_upload', 'generate_upload_id', 'format_response']
+__all__ = ['validate_csv_format', 'validate_file_upload', 'generate_upload_id', 'format_response', 'ojsonify']
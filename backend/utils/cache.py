@@ -29,6 +29,7 @@ import json
 import threading
 from typing import Any, Optional, Callable, Dict, Tuple
 from functools import wraps
+from concurrent.futures import Future
 import logging
 
 logger = logging.getLogger(__name__)
@@ -170,6 +171,39 @@ class InMemoryCache:
             self.cleanup_expired()
 
 
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait and receive the same result (or exception).
+    """
+    
+    def __init__(self):
+        self._calls: Dict[Any, Future] = {}
+        self._lock = threading.Lock()
+    
+    def do(self, key: Any, fn: Callable[[], Any]) -> Any:
+        """Run fn for key unless an identical call is already in flight"""
+        with self._lock:
+            future = self._calls.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._calls[key] = future
+        
+        if owner:
+            try:
+                future.set_result(fn())
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    del self._calls[key]
+        
+        return future.result()
+
+
 # Global cache instance
 cache = InMemoryCache(max_size=1000)
 
@@ -8,7 +8,24 @@ Provides utility functions used across the application.
 import uuid
 from datetime import datetime
 from typing import Any, Dict, Optional
-from flask import jsonify
+from flask import jsonify, current_app
+import numpy as np
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+if ORJSON_AVAILABLE:
+    # Datetimes go through Flask's default so the wire format is unchanged
+    ORJSON_OPTIONS = (
+        orjson.OPT_SERIALIZE_NUMPY
+        | orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_SORT_KEYS
+        | orjson.OPT_PASSTHROUGH_DATETIME
+    )
 
 
 def generate_upload_id() -> str:
@@ -63,6 +80,54 @@ def format_response(
     return jsonify(response), status_code
 
 
+def ojsonify(obj: Any, status: int = 200):
+    """
+    Serialize a response body with orjson, falling back to jsonify.
+    
+    Args:
+        obj: JSON-serializable response body.
+        status: HTTP status code.
+    
+    Returns:
+        Flask Response.
+    """
+    if not ORJSON_AVAILABLE:
+        response = jsonify(obj)
+        response.status_code = status
+        return response
+    
+    return current_app.response_class(
+        orjson.dumps(obj, default=current_app.json.default, option=ORJSON_OPTIONS),
+        status=status,
+        mimetype='application/json'
+    )
+
+
+def top_k_positions(values: np.ndarray, k: int, largest: bool = True) -> np.ndarray:
+    """
+    Positions of the k largest (or smallest) values, like nlargest/nsmallest.
+    
+    Uses a partial sort; ties at the cutoff keep their original order.
+    
+    Args:
+        values: 1-D array to select from.
+        k: Number of positions to return.
+        largest: Select the largest values if True, else the smallest.
+    
+    Returns:
+        np.ndarray: Row positions in ranked order.
+    """
+    keys = -values if largest else values
+    if len(keys) > k:
+        cutoff = np.partition(keys, k - 1)[k - 1]
+        strict = np.flatnonzero(keys < cutoff)
+        ties = np.flatnonzero(keys == cutoff)[:k - len(strict)]
+        positions = np.concatenate([strict, ties])
+    else:
+        positions = np.arange(len(keys))
+    return positions[np.argsort(keys[positions], kind='stable')]
+
+
 def parse_date(date_string: str, formats: list = None) -> Optional[datetime]:
     """
     Parse date string with multiple format support.